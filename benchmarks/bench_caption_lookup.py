@@ -0,0 +1,95 @@
+"""
+基准测试：PDFImageExtractor caption 匹配的逐块扫描实现 vs 按页排序 + 二分查找的索引实现
+
+用法：
+    python benchmarks/bench_caption_lookup.py [--images N] [--blocks N] [--seed N]
+
+生成一个密集页面（大量小图片 + 文本块，部分文本块是 caption），
+对每张图片分别运行两种实现，检查结果一致并输出耗时。
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到 sys.path
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from src.services.pdf_image_extractor import PDFImageExtractor, _CaptionIndex
+
+
+def reference_find_caption(extractor: PDFImageExtractor, blocks, image_block) -> str:
+    """建索引之前的逐块扫描实现（仅用于对比）"""
+    img_x0, img_y0, img_x1, img_y1 = image_block.get("bbox", (0, 0, 0, 0))
+    caption_candidates = []
+    for block in blocks:
+        if block["type"] != 0:
+            continue
+        text_x0, text_y0, text_x1, text_y1 = block.get("bbox", (0, 0, 0, 0))
+        is_below = text_y0 >= img_y1
+        vertical_distance = text_y0 - img_y1 if is_below else float('inf')
+        if not is_below or vertical_distance > 50:
+            continue
+        horizontal_overlap = min(img_x1, text_x1) - max(img_x0, text_x0)
+        image_width = img_x1 - img_x0
+        overlap_ratio = horizontal_overlap / image_width if image_width > 0 else 0
+        if overlap_ratio < 0.5:
+            continue
+        text = extractor._extract_text_from_block(block)
+        if not text.strip():
+            continue
+        text_lower = text.lower()
+        if not any(kw in text_lower for kw in ["figure", "fig.", "图", "table", "表", "图表"]):
+            continue
+        caption_candidates.append({"text": text, "distance": vertical_distance})
+    if caption_candidates:
+        return min(caption_candidates, key=lambda x: x["distance"])["text"].strip()
+    return ""
+
+
+def make_page(num_images: int, num_blocks: int, rng: random.Random):
+    """合成页面 blocks：小图片网格 + 随机文本块（约 1/3 是 caption）"""
+    blocks = []
+    for i in range(num_blocks):
+        x0, y0 = rng.uniform(0, 500), rng.uniform(0, 820)
+        text = f"Figure {i}: panel {i}" if rng.random() < 0.33 else f"body text line {i}"
+        blocks.append({"type": 0, "bbox": (x0, y0, x0 + rng.uniform(40, 200), y0 + 10),
+                       "lines": [{"spans": [{"text": text}]}]})
+    for _ in range(num_images):
+        x0, y0 = rng.uniform(0, 540), rng.uniform(0, 780)
+        blocks.append({"type": 1, "bbox": (x0, y0, x0 + 50, y0 + 40), "image": b""})
+    return blocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="caption 匹配：逐块扫描 vs 排序 + 二分索引")
+    parser.add_argument("--images", type=int, default=400)
+    parser.add_argument("--blocks", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    extractor = PDFImageExtractor(tempfile.mkdtemp(prefix="bench_caption_"))
+    blocks = make_page(args.images, args.blocks, random.Random(args.seed))
+    images = [block for block in blocks if block["type"] == 1]
+
+    start = time.perf_counter()
+    expected = [reference_find_caption(extractor, blocks, image) for image in images]
+    reference = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = _CaptionIndex(blocks, extractor._extract_text_from_block)
+    actual = [extractor._find_caption_for_image(blocks, image, caption_index=index) for image in images]
+    indexed = time.perf_counter() - start
+
+    print(f"页面: {len(images)} 张图片, {args.blocks} 个文本块, 匹配到 caption {sum(1 for c in actual if c)} 张")
+    print(f"逐块扫描:        {reference * 1000:.1f} ms")
+    print(f"排序 + 二分索引: {indexed * 1000:.1f} ms（加速 {reference / indexed:.1f}x，结果{'一致' if expected == actual else '不一致'}）")
+
+
+if __name__ == "__main__":
+    main()
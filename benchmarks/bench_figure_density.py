@@ -0,0 +1,179 @@
+"""
+基准测试：_detect_figure_region_by_density 的逐条带循环实现 vs NumPy 向量化实现
+
+用法：
+    python benchmarks/bench_figure_density.py [--drawings N] [--captions N] [--seed N]
+
+生成带大量矢量对象（默认 12000 个，相当于密集散点图/折线图）的合成页面，
+对多个 caption 位置分别运行两种实现，检查结果一致并输出耗时。
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import fitz  # PyMuPDF
+import numpy as np
+
+# 添加项目根目录到 sys.path
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from src.services.pdf_figure_extractor_v2 import PDFFigureExtractorV2
+
+
+def reference_detect(page, caption_bbox, drawings, text_blocks):
+    """向量化之前的逐条带循环实现（仅用于对比）"""
+    page_width = page.rect.width
+    caption_y_top = caption_bbox['y1']
+
+    drawings_above = [d for d in drawings if d['rect'][3] < caption_y_top]
+    text_blocks_above = [b for b in text_blocks
+                         if b.get("type") == 0 and b["bbox"][3] < caption_y_top]
+    if not drawings_above:
+        return None
+
+    closest_drawing_y = max(d['rect'][3] for d in drawings_above)
+    scan_top = 0
+    scan_bottom = caption_y_top - (caption_y_top - closest_drawing_y)
+    if scan_bottom <= scan_top:
+        scan_bottom = caption_y_top
+
+    stripe_height = 10
+    num_stripes = int((scan_bottom - scan_top) / stripe_height) + 1
+    drawing_density = np.zeros(num_stripes)
+    text_density = np.zeros(num_stripes)
+
+    for d in drawings_above:
+        rect = d['rect']
+        if rect[3] > scan_bottom or rect[1] < scan_top:
+            continue
+        start = max(0, min(int((rect[1] - scan_top) / stripe_height), num_stripes - 1))
+        end = max(0, min(int((rect[3] - scan_top) / stripe_height), num_stripes - 1))
+        area = (rect[2] - rect[0]) * (rect[3] - rect[1])
+        for i in range(start, end + 1):
+            drawing_density[i] += area
+
+    for block in text_blocks_above:
+        bbox = block["bbox"]
+        if bbox[3] > scan_bottom or bbox[1] < scan_top:
+            continue
+        start = max(0, min(int((bbox[1] - scan_top) / stripe_height), num_stripes - 1))
+        end = max(0, min(int((bbox[3] - scan_top) / stripe_height), num_stripes - 1))
+        chars = sum(len(span.get("text", ""))
+                    for line in block.get("lines", [])
+                    for span in line.get("spans", []))
+        for i in range(start, end + 1):
+            text_density[i] += chars
+
+    if drawing_density.max() > 0:
+        drawing_density = drawing_density / drawing_density.max()
+    if text_density.max() > 0:
+        text_density = text_density / text_density.max()
+    figure_score = drawing_density - 0.5 * text_density
+
+    threshold = 0.1
+    bottom = -1
+    for i in range(num_stripes - 1, -1, -1):
+        if figure_score[i] > threshold:
+            bottom = i
+            break
+
+    margin = 5
+    if bottom == -1:
+        return fitz.Rect(
+            max(0, min(d['rect'][0] for d in drawings_above) - margin),
+            max(0, min(d['rect'][1] for d in drawings_above) - margin),
+            min(page_width, max(d['rect'][2] for d in drawings_above) + margin),
+            min(caption_y_top - 5, max(d['rect'][3] for d in drawings_above) + margin)
+        )
+
+    top = bottom
+    for i in range(bottom - 1, -1, -1):
+        if figure_score[i] > threshold:
+            top = i
+        elif i > 2 and all(figure_score[j] <= threshold for j in range(i - 2, i + 1)):
+            break
+
+    y_top = scan_top + top * stripe_height
+    y_bottom = scan_top + (bottom + 1) * stripe_height
+    relevant = [d for d in drawings_above
+                if d['rect'][1] >= y_top and d['rect'][3] <= y_bottom + 20] or drawings_above
+    min_x = min(d['rect'][0] for d in relevant)
+    max_x = max(d['rect'][2] for d in relevant)
+    if max_x - min_x < (caption_bbox['x2'] - caption_bbox['x1']) * 0.6:
+        min_x, max_x = 70, page_width - 70
+
+    return fitz.Rect(
+        max(0, min_x - margin),
+        max(0, y_top - margin),
+        min(page_width, max_x + margin),
+        min(caption_y_top - 5, y_bottom + margin)
+    )
+
+
+def make_page_objects(rng: random.Random, num_drawings: int):
+    """合成页面内容：两个密集矢量图 + 若干正文段落"""
+    drawings = []
+    regions = [(80, 90, 530, 330), (80, 420, 530, 660)]
+    for i in range(num_drawings):
+        x0, y0, x1, y1 = regions[i % len(regions)]
+        x = rng.uniform(x0, x1 - 4)
+        y = rng.uniform(y0, y1 - 4)
+        drawings.append({"rect": fitz.Rect(x, y, x + rng.uniform(0.5, 4), y + rng.uniform(0, 4))})
+
+    text_blocks = []
+    for y in (40, 350, 680):
+        text = "Lorem ipsum dolor sit amet " * 6
+        text_blocks.append({
+            "type": 0,
+            "bbox": (60, y, 550, y + 30),
+            "lines": [{"spans": [{"text": text}]}],
+        })
+    return drawings, text_blocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Figure 区域密度检测：循环 vs 向量化")
+    parser.add_argument("--drawings", type=int, default=12000)
+    parser.add_argument("--captions", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    doc = fitz.open()
+    page = doc.new_page(width=612, height=792)
+    drawings, text_blocks = make_page_objects(rng, args.drawings)
+    extractor = PDFFigureExtractorV2(tempfile.mkdtemp())
+
+    captions = []
+    for _ in range(args.captions):
+        y = rng.uniform(150, 760)
+        captions.append({'x1': 90, 'y1': y, 'x2': 520, 'y2': y + 10})
+
+    start = time.perf_counter()
+    expected = [reference_detect(page, c, drawings, text_blocks) for c in captions]
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = [extractor._detect_figure_region_by_density(page, c, drawings, text_blocks) for c in captions]
+    vector_time = time.perf_counter() - start
+
+    mismatches = sum(
+        1 for a, b in zip(expected, actual)
+        if (a is None) != (b is None) or (a is not None and max(abs(p - q) for p, q in zip(a, b)) > 1e-6)
+    )
+
+    print(f"绘图对象: {len(drawings)}，caption 数: {len(captions)}\n")
+    print(f"循环实现:   {loop_time * 1000 / len(captions):.1f} ms / caption")
+    print(f"向量化实现: {vector_time * 1000 / len(captions):.1f} ms / caption")
+    print(f"加速比:     {loop_time / vector_time:.1f}x")
+    print(f"结果不一致: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+基准测试：每次请求新建 httpx.AsyncClient vs 共享连接池客户端
+
+用法：
+    python benchmarks/bench_http_pool.py [请求数] [--handshake-ms 毫秒] [--url URL]
+
+默认启动一个本地 HTTP/1.1 服务器，新连接建立时额外等待 --handshake-ms 毫秒，
+模拟经代理访问远端时 TCP + TLS 握手的往返延迟；统计两种模式下新建的连接数和总耗时。
+指定 --url 时改为请求真实地址（例如 https://export.arxiv.org/api/query?id_list=2410.04618），
+只统计耗时。
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+# 添加项目根目录到 sys.path
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from src.services.http_clients import close_http_clients, get_http_client
+
+BODY = b"ok" * 512
+
+
+class LocalServer:
+    """最小的 keep-alive HTTP 服务器，记录建立的连接数"""
+
+    def __init__(self, handshake_ms: float):
+        self.handshake = handshake_ms / 1000
+        self.connections = 0
+        self.server = None
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        await asyncio.sleep(self.handshake)
+        try:
+            while True:
+                request = await reader.readuntil(b"\r\n\r\n")
+                if not request:
+                    break
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\n"
+                    b"Content-Length: " + str(len(BODY)).encode() + b"\r\n\r\n" + BODY
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/api/query"
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def run_fresh(url: str, requests: int) -> float:
+    """旧方式：每次请求新建客户端"""
+    start = time.perf_counter()
+    for _ in range(requests):
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            response = await client.get(url)
+            response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def run_shared(url: str, requests: int) -> float:
+    """新方式：共享连接池客户端"""
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = await get_http_client("web").get(url)
+        response.raise_for_status()
+    elapsed = time.perf_counter() - start
+    await close_http_clients()
+    return elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="HTTP 连接池基准测试")
+    parser.add_argument("requests", type=int, nargs="?", default=20)
+    parser.add_argument("--handshake-ms", type=float, default=50.0)
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server = LocalServer(args.handshake_ms)
+        url = await server.start()
+        print(f"本地服务器: {url}（模拟握手 {args.handshake_ms:.0f} ms）")
+    print(f"请求数: {args.requests}\n")
+
+    print(f"{'模式':<10}{'耗时':>10}{'平均/请求':>12}{'新建连接':>10}")
+    for name, runner in (("fresh", run_fresh), ("shared", run_shared)):
+        before = server.connections if server else 0
+        elapsed = await runner(url, args.requests)
+        opened = f"{server.connections - before}" if server else "-"
+        print(f"{name:<10}{elapsed:>9.3f}s{elapsed / args.requests * 1000:>10.1f}ms{opened:>10}")
+
+    if server:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
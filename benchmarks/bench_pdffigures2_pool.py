@@ -0,0 +1,104 @@
+"""
+基准测试：PDFFigures2 冷启动（每篇 `java -jar`）vs 常驻 JVM 池
+
+用法：
+    python benchmarks/bench_pdffigures2_pool.py [PDF 路径 ...] [--rounds N]
+
+未指定 PDF 时生成若干合成论文页（带矢量图和 caption）。
+需要 Java 11+ 和 pdffigures2/pdffigures2.jar。
+输出每篇论文的冷启动耗时、常驻池首次（含 JVM 启动）和预热后的耗时。
+"""
+
+import argparse
+import asyncio
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+# 添加项目根目录到 sys.path
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from src.services.pdf_figure_extractor_v2 import PDFFigureExtractorV2
+from src.services.pdffigures2_pool import PDFFigures2Pool
+
+
+def make_pdf(path: Path, pages: int = 8):
+    """生成合成论文：每页一段正文、一个矢量图和 Figure caption"""
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(
+            fitz.Rect(50, 50, 550, 200),
+            "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 12,
+            fontsize=9,
+        )
+        for i in range(20):
+            page.draw_rect(fitz.Rect(100 + i * 15, 250, 110 + i * 15, 250 + i * 8), color=(0, 0, 1), fill=(0.6, 0.7, 1))
+        page.insert_text((100, 450), f"Figure {page_num + 1}: Synthetic bar chart number {page_num + 1}.", fontsize=9)
+    doc.save(str(path))
+    doc.close()
+
+
+async def bench_pool(jar: Path, pdfs, output_dir: Path, rounds: int):
+    pool = PDFFigures2Pool(jar, max_workers=1)
+    timings = []
+    try:
+        for _ in range(rounds):
+            for pdf in pdfs:
+                start = time.perf_counter()
+                await pool.extract(str(pdf), output_dir)
+                timings.append(time.perf_counter() - start)
+    finally:
+        await pool.close()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDFFigures2 冷启动 vs 常驻 JVM 池")
+    parser.add_argument("pdfs", nargs="*")
+    parser.add_argument("--rounds", type=int, default=2)
+    args = parser.parse_args()
+
+    if shutil.which("java") is None:
+        print("未找到 java，跳过")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        pdfs = [Path(p) for p in args.pdfs]
+        if not pdfs:
+            for i in range(3):
+                pdfs.append(tmp / f"synthetic_{i}.pdf")
+                make_pdf(pdfs[-1])
+
+        extractor = PDFFigureExtractorV2(str(tmp / "cold"), "archive")
+        if not extractor.pdffigures2_jar.exists():
+            print(f"PDFFigures2 JAR 不存在: {extractor.pdffigures2_jar}，跳过")
+            return
+
+        cold = []
+        for _ in range(args.rounds):
+            for pdf in pdfs:
+                start = time.perf_counter()
+                extractor._run_pdffigures2(str(pdf))
+                cold.append(time.perf_counter() - start)
+
+        warm = asyncio.run(bench_pool(extractor.pdffigures2_jar, pdfs, tmp / "warm", args.rounds))
+
+    print(f"PDF 数: {len(pdfs)}，轮数: {args.rounds}\n")
+    print(f"冷启动（每篇 java -jar）: 平均 {sum(cold) / len(cold):.2f}s")
+    print(f"常驻池首次（含 JVM 启动）: {warm[0]:.2f}s")
+    if len(warm) > 1:
+        rest = warm[1:]
+        print(f"常驻池预热后:           平均 {sum(rest) / len(rest):.2f}s")
+        print(f"预热后加速比:           {sum(cold) / len(cold) / (sum(rest) / len(rest)):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
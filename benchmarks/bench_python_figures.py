@@ -0,0 +1,114 @@
+"""
+基准测试：纯 Python 全文 Figure/Table 提取 vs PDFFigures2
+
+用法：
+    python benchmarks/bench_python_figures.py [PDF 路径 ...] [--pages N] [--workers N] [--profile NAME]
+
+未指定 PDF 时生成若干合成论文（每页一个矢量图 + Figure caption、一个表格 + Table caption）。
+纯 Python 方法分别以单进程和多进程运行；安装了 Java 且 pdffigures2.jar 存在时，
+同一批 PDF 再用 PDFFigures2（常驻 JVM 池）提取一遍，对比耗时和提取数量。
+"""
+
+import argparse
+import asyncio
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+# 添加项目根目录到 sys.path
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from src.services.paper_document import PaperDocument
+from src.services.pdf_figure_extractor_v2 import PDFFigureExtractorV2
+from src.services.pdffigures2_pool import close_pdffigures2_pools
+
+
+def make_pdf(path: Path, pages: int):
+    """生成合成论文：每页正文、一个矢量柱状图 + Figure caption、一个表格 + Table caption"""
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(
+            fitz.Rect(50, 40, 550, 90),
+            "Lorem ipsum dolor sit amet, as Figure 1 shows, consectetur adipiscing elit. " * 3,
+            fontsize=9,
+        )
+        for i in range(20):
+            page.draw_rect(fitz.Rect(100 + i * 15, 110, 110 + i * 15, 110 + i * 8), color=(0, 0, 1), fill=(0.6, 0.7, 1))
+        page.insert_text((100, 300), f"Figure {page_num + 1}: Synthetic bar chart number {page_num + 1}.", fontsize=9)
+        page.insert_text((100, 400), f"Table {page_num + 1}: Synthetic results number {page_num + 1}.", fontsize=9)
+        for row in range(6):
+            page.draw_rect(fitz.Rect(90, 415 + row * 20, 520, 430 + row * 20), fill=(0.9, 0.9, 0.9))
+            page.insert_text((100, 426 + row * 20), f"method {row}    0.{row}1    0.{row}2    0.{row}3", fontsize=8)
+        page.insert_textbox(fitz.Rect(50, 560, 550, 760), "Body text continues here. " * 30, fontsize=9)
+    doc.save(str(path))
+    doc.close()
+
+
+def bench_python(pdfs, output_root: Path, workers: int, profile: str):
+    timings, counts = [], []
+    for index, pdf in enumerate(pdfs):
+        extractor = PDFFigureExtractorV2(str(output_root / f"{index}"), profile)
+        with PaperDocument(str(pdf)) as document:
+            start = time.perf_counter()
+            figures = extractor._extract_all_figures_python(document, max_workers=workers)
+            timings.append(time.perf_counter() - start)
+        counts.append(len(figures))
+    return timings, counts
+
+
+async def bench_pdffigures2(pdfs, output_root: Path, profile: str):
+    timings, counts = [], []
+    try:
+        for index, pdf in enumerate(pdfs):
+            extractor = PDFFigureExtractorV2(str(output_root / f"{index}"), profile)
+            start = time.perf_counter()
+            figures, _ = await extractor.extract_async(str(pdf))
+            timings.append(time.perf_counter() - start)
+            counts.append(len(figures))
+    finally:
+        await close_pdffigures2_pools()
+    return timings, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="纯 Python Figure 提取 vs PDFFigures2")
+    parser.add_argument("pdfs", nargs="*")
+    parser.add_argument("--pages", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--profile", default="archive")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        pdfs = [Path(p) for p in args.pdfs]
+        if not pdfs:
+            for i in range(3):
+                pdfs.append(tmp / f"synthetic_{i}.pdf")
+                make_pdf(pdfs[-1], args.pages)
+
+        serial, counts = bench_python(pdfs, tmp / "python_serial", 1, args.profile)
+        parallel, _ = bench_python(pdfs, tmp / "python_parallel", args.workers, args.profile)
+
+        print(f"PDF 数: {len(pdfs)}，渲染配置: {args.profile}\n")
+        print(f"纯 Python（单进程）:      平均 {sum(serial) / len(serial):.2f}s，提取 {sum(counts)} 个")
+        print(f"纯 Python（{args.workers} 进程）:      平均 {sum(parallel) / len(parallel):.2f}s")
+
+        jar = PDFFigureExtractorV2(str(tmp / "probe")).pdffigures2_jar
+        if shutil.which("java") is None or not jar.exists():
+            print("PDFFigures2:             未找到 java 或 JAR，跳过")
+            return
+
+        timings, pdffigures2_counts = asyncio.run(bench_pdffigures2(pdfs, tmp / "pdffigures2", args.profile))
+        print(f"PDFFigures2（常驻 JVM）:  平均 {sum(timings) / len(timings):.2f}s，提取 {sum(pdffigures2_counts)} 个"
+              f"（首篇含 JVM 启动 {timings[0]:.2f}s）")
+
+
+if __name__ == "__main__":
+    main()
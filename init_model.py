@@ -35,6 +35,11 @@ MODEL_CONFIGS = {
         "models": {
             "tool": "gpt-5-mini",      # 轻量化模型
             "reason": "gpt-5",          # 复杂推理模型
+        },
+        # 各 prompt 槽位的 token 预算（见 src/services/prompt_budget.py）
+        "prompt_budgets": {
+            "metadata": {"pdf_excerpt": 1500, "xiaohongshu": 1000},
+            "digest": {"pdf_excerpt": 8000, "xiaohongshu": 2000},
         }
     },
     "deepseek": {
@@ -44,6 +49,11 @@ MODEL_CONFIGS = {
         "models": {
             "tool": "deepseek-chat",    # 轻量化模型
             "reason": "deepseek-chat",  # 复杂推理模型（DeepSeek 只有一个模型）
+        },
+        # 上下文窗口较小（64K），论文正文预算更保守
+        "prompt_budgets": {
+            "metadata": {"pdf_excerpt": 1500, "xiaohongshu": 1000},
+            "digest": {"pdf_excerpt": 6000, "xiaohongshu": 2000},
         }
     }
 }
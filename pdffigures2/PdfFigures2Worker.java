@@ -0,0 +1,51 @@
+import java.io.BufferedReader;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.lang.reflect.Method;
+import java.nio.charset.StandardCharsets;
+import java.util.Arrays;
+
+/**
+ * PDFFigures2 常驻 worker（由 src/services/pdffigures2_pool.py 启动）
+ *
+ * 启动方式（Java 11+ 单文件源码启动）：
+ *     java -Xmx1g -cp pdffigures2.jar PdfFigures2Worker.java
+ *
+ * 协议（UTF-8，按行）：
+ *     启动完成后输出  READY
+ *     stdin 每行一个任务：  任务ID \t 参数1 \t 参数2 ...（参数与 FigureExtractorBatchCli 命令行相同）
+ *     每个任务完成后输出：  DONE \t 任务ID   或   ERROR \t 任务ID \t 错误信息
+ *
+ * PDFFigures2 自身的日志输出被重定向到 stderr，stdout 只用于协议。
+ */
+public class PdfFigures2Worker {
+    public static void main(String[] args) throws Exception {
+        PrintStream protocol = new PrintStream(new FileOutputStream(FileDescriptor.out), true, "UTF-8");
+        System.setOut(System.err);
+
+        Method cli = Class.forName("org.allenai.pdffigures2.FigureExtractorBatchCli")
+            .getMethod("main", String[].class);
+
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        protocol.println("READY");
+
+        String line;
+        while ((line = in.readLine()) != null) {
+            if (line.isEmpty()) {
+                continue;
+            }
+            String[] parts = line.split("\t");
+            String jobId = parts[0];
+            String[] cliArgs = Arrays.copyOfRange(parts, 1, parts.length);
+            try {
+                cli.invoke(null, (Object) cliArgs);
+                protocol.println("DONE\t" + jobId);
+            } catch (Throwable t) {
+                Throwable cause = t.getCause() != null ? t.getCause() : t;
+                protocol.println("ERROR\t" + jobId + "\t" + String.valueOf(cause).replace('\n', ' '));
+            }
+        }
+    }
+}
@@ -0,0 +1,170 @@
+"""
+Figure 渲染配置模块
+
+功能：
+1. 预定义的渲染配置（render profile）：
+   - archive：300 DPI PNG（原样存档，与 PDFFigures2 输出一致）
+   - notion：WebP（未安装 Pillow 时退回 JPEG），宽度不超过 1600px，用于上传 Notion
+   - thumbnail：JPEG，宽度不超过 400px
+2. 按 Figure 的物理尺寸（PDF 点）计算渲染缩放，直接渲染到目标像素数，而不是先按 300 DPI 渲染再缩小
+3. 把 PDF 页面区域渲染并编码为配置指定的格式
+
+环境变量 FIGURE_RENDER_PROFILE 指定论文处理流程和提取器默认使用的配置（默认 notion；
+无效的值在导入时警告并退回默认配置）。
+"""
+
+import importlib.util
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+import fitz  # PyMuPDF
+
+logger = logging.getLogger(__name__)
+
+# 论文处理流程默认使用的配置
+DEFAULT_RENDER_PROFILE = "notion"
+
+# WebP 编码需要 Pillow（可选依赖），PNG / JPEG 由 PyMuPDF 直接编码
+HAS_PILLOW = importlib.util.find_spec("PIL") is not None
+
+FORMAT_EXTENSIONS = {"png": ".png", "jpeg": ".jpg", "webp": ".webp"}
+
+
+@dataclass(frozen=True)
+class RenderProfile:
+    """单个渲染配置"""
+    name: str
+    format: str                        # png / jpeg / webp
+    dpi: int = 300                     # 最大渲染 DPI
+    max_width: Optional[int] = None    # 最大像素宽度（None 表示只受 DPI 限制）
+    quality: int = 85                  # JPEG / WebP 质量
+
+    @property
+    def output_format(self) -> str:
+        """实际输出格式（WebP 在没有 Pillow 时退回 JPEG）"""
+        if self.format == "webp" and not HAS_PILLOW:
+            return "jpeg"
+        return self.format
+
+    @property
+    def extension(self) -> str:
+        return FORMAT_EXTENSIONS[self.output_format]
+
+    @property
+    def uses_pdffigures2_render(self) -> bool:
+        """PDFFigures2 自带的 PNG 渲染结果可以直接使用（无需重新渲染）"""
+        return self.output_format == "png" and self.max_width is None
+
+    def to_metadata(self) -> Dict:
+        """记录到 extraction_metadata.json 的配置信息"""
+        return {
+            "name": self.name,
+            "format": self.output_format,
+            "dpi": self.dpi,
+            "max_width": self.max_width,
+            "quality": self.quality if self.output_format != "png" else None,
+        }
+
+
+RENDER_PROFILES: Dict[str, RenderProfile] = {
+    "archive": RenderProfile(name="archive", format="png", dpi=300),
+    "notion": RenderProfile(name="notion", format="webp", dpi=300, max_width=1600, quality=82),
+    "thumbnail": RenderProfile(name="thumbnail", format="jpeg", dpi=150, max_width=400, quality=70),
+}
+
+
+# 无效的 FIGURE_RENDER_PROFILE 只警告一次
+_env_profile_warned = False
+
+
+def _env_render_profile() -> str:
+    """
+    环境变量 FIGURE_RENDER_PROFILE 指定的配置名称
+
+    未知的名称不会让论文处理流程中途失败，而是退回默认配置并记录一次警告。
+    """
+    global _env_profile_warned
+    name = os.getenv("FIGURE_RENDER_PROFILE", DEFAULT_RENDER_PROFILE)
+    if name in RENDER_PROFILES:
+        return name
+    if not _env_profile_warned:
+        _env_profile_warned = True
+        logger.warning(
+            f"⚠️ 未知的 FIGURE_RENDER_PROFILE: {name}（可选: {', '.join(RENDER_PROFILES)}），"
+            f"使用默认配置 {DEFAULT_RENDER_PROFILE}"
+        )
+    return DEFAULT_RENDER_PROFILE
+
+
+def get_render_profile(name: Optional[str] = None) -> RenderProfile:
+    """
+    获取渲染配置
+
+    Args:
+        name: 配置名称；None 表示读取环境变量 FIGURE_RENDER_PROFILE（默认 notion，无效时退回默认并警告）
+
+    Raises:
+        ValueError: 显式传入了未知的配置名称
+    """
+    name = name or _env_render_profile()
+    if name not in RENDER_PROFILES:
+        raise ValueError(f"未知的渲染配置: {name}（可选: {', '.join(RENDER_PROFILES)}）")
+    return RENDER_PROFILES[name]
+
+
+# 启动时校验一次环境变量（无效时在这里就给出警告，而不是等到处理论文时）
+_env_render_profile()
+
+
+def render_zoom(clip: fitz.Rect, profile: RenderProfile) -> float:
+    """
+    按 Figure 物理宽度计算缩放倍数：不超过配置的 DPI，且渲染宽度不超过 max_width
+
+    Args:
+        clip: Figure 区域（PDF 点，1pt = 1/72 inch）
+        profile: 渲染配置
+    """
+    zoom = profile.dpi / 72
+    if profile.max_width and clip.width > 0:
+        zoom = min(zoom, profile.max_width / clip.width)
+    return zoom
+
+
+def render_clip(page: fitz.Page, clip: fitz.Rect, profile: RenderProfile, dst_stem: Path) -> Dict:
+    """
+    渲染页面区域并按配置编码保存
+
+    Args:
+        page: fitz 页面
+        clip: 渲染区域（PDF 点）
+        profile: 渲染配置
+        dst_stem: 输出路径（不含扩展名），例如 images_dir / "Figure1"
+
+    Returns:
+        {"path", "filename", "format", "pixel_width", "pixel_height", "bytes"}
+    """
+    zoom = render_zoom(clip, profile)
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, alpha=False)
+
+    dst_path = Path(dst_stem).with_suffix(profile.extension)
+    output_format = profile.output_format
+    if output_format == "webp":
+        from PIL import Image
+        image = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+        image.save(dst_path, "WEBP", quality=profile.quality, method=4)
+    elif output_format == "jpeg":
+        pix.save(str(dst_path), output="jpeg", jpg_quality=profile.quality)
+    else:
+        pix.save(str(dst_path), output="png")
+
+    return {
+        "path": str(dst_path),
+        "filename": dst_path.name,
+        "format": output_format,
+        "pixel_width": pix.width,
+        "pixel_height": pix.height,
+        "bytes": dst_path.stat().st_size,
+    }
@@ -0,0 +1,193 @@
+"""
+共享 HTTP 客户端模块
+
+功能：
+1. 进程级客户端注册表：每个上游（arXiv、Notion、出版商网页、PDF 下载）一个长期存在的 httpx.AsyncClient，
+   连接池保持 keep-alive，后续请求复用已建立的 TCP + TLS 连接
+2. 代理 transport 只在创建客户端时构建一次（读取 http_proxy）
+3. 安装了 h2 时可启用 HTTP/2（环境变量 HTTP2_ENABLED=1）
+4. 按主机限制并发请求数（流式响应在关闭前一直占用名额）
+
+httpx 的连接绑定在创建它的事件循环上，事件循环变化（例如多次 asyncio.run）时自动重建客户端，
+旧循环上的客户端交给旧循环关闭（旧循环已停止时记录警告）。
+"""
+
+import asyncio
+import importlib.util
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Tuple
+
+import httpx
+
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+BROWSER_USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+)
+
+
+@dataclass(frozen=True)
+class UpstreamConfig:
+    """单个上游的客户端配置"""
+    timeout: float = 30.0
+    max_connections: int = 10            # 连接池总连接数
+    max_keepalive_connections: int = 5   # 空闲时保留的连接数
+    keepalive_expiry: float = 60.0       # 空闲连接保留时间（秒）
+    per_host_concurrency: int = 4        # 每个主机同时进行的请求数
+    follow_redirects: bool = False
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+# 各上游的配置
+UPSTREAMS: Dict[str, UpstreamConfig] = {
+    # arXiv API 要求低频访问，限制并发
+    "arxiv": UpstreamConfig(timeout=30.0, max_connections=4, per_host_concurrency=2),
+    # Notion API 平均限速约 3 请求/秒
+    "notion": UpstreamConfig(timeout=60.0, max_connections=6, per_host_concurrency=3),
+    # 出版商网页（Nature、IEEE、ACM 等）
+    "web": UpstreamConfig(
+        timeout=30.0,
+        follow_redirects=True,
+        headers={"User-Agent": BROWSER_USER_AGENT},
+    ),
+    # PDF 下载（大文件，超时更长）
+    "pdf": UpstreamConfig(timeout=60.0, max_connections=8, per_host_concurrency=4, follow_redirects=True),
+}
+
+# name → (事件循环, 客户端)
+_clients: Dict[str, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+
+
+def http2_available() -> bool:
+    """是否启用 HTTP/2（需要安装 h2，并设置 HTTP2_ENABLED=1）"""
+    enabled = os.getenv("HTTP2_ENABLED", "0").lower() in ("1", "true", "yes")
+    return enabled and importlib.util.find_spec("h2") is not None
+
+
+class _HostLimitedStream(httpx.AsyncByteStream):
+    """响应体包装：关闭时释放主机并发名额"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, semaphore: asyncio.Semaphore):
+        self._stream = stream
+        self._semaphore = semaphore
+        self._released = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._semaphore.release()
+
+
+class HostLimitedTransport(httpx.AsyncBaseTransport):
+    """按主机限制并发请求数的 transport 包装"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, per_host_concurrency: int):
+        self._transport = transport
+        self._per_host = per_host_concurrency
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _semaphore_for(self, host: str) -> asyncio.Semaphore:
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self._per_host)
+        return self._semaphores[host]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        semaphore = self._semaphore_for(request.url.host)
+        await semaphore.acquire()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            semaphore.release()
+            raise
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_HostLimitedStream(response.stream, semaphore),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def _build_client(config: UpstreamConfig) -> httpx.AsyncClient:
+    """按配置创建客户端（代理 transport 在这里构建一次）"""
+    proxy = os.getenv('http_proxy')
+    limits = httpx.Limits(
+        max_connections=config.max_connections,
+        max_keepalive_connections=config.max_keepalive_connections,
+        keepalive_expiry=config.keepalive_expiry,
+    )
+    transport = httpx.AsyncHTTPTransport(proxy=proxy, limits=limits, http2=http2_available())
+    return httpx.AsyncClient(
+        timeout=config.timeout,
+        follow_redirects=config.follow_redirects,
+        headers=config.headers,
+        transport=HostLimitedTransport(transport, config.per_host_concurrency),
+    )
+
+
+def _discard_stale_client(name: str, client_loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient):
+    """
+    丢弃绑定在其他事件循环上的客户端
+
+    原事件循环仍在运行时把 aclose() 提交到该循环执行；已关闭时无法再在其上关闭连接，
+    只能记录日志（连接随客户端被垃圾回收时释放）。
+    """
+    if client.is_closed:
+        return
+    if not client_loop.is_closed() and client_loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.aclose(), client_loop)
+        logger.debug("🌐 事件循环已变化，关闭旧循环上的 HTTP 客户端", upstream=name)
+    else:
+        logger.warning("⚠️ 事件循环已变化，旧循环已停止，丢弃其上未关闭的 HTTP 客户端", upstream=name)
+
+
+def get_http_client(name: str) -> httpx.AsyncClient:
+    """
+    获取上游对应的共享客户端（调用方不要关闭它）
+
+    Args:
+        name: 上游名称（UPSTREAMS 的键）
+
+    Returns:
+        当前事件循环上的共享 httpx.AsyncClient
+    """
+    if name not in UPSTREAMS:
+        raise ValueError(f"未知的上游: {name}")
+
+    loop = asyncio.get_running_loop()
+    cached = _clients.get(name)
+    if cached is not None:
+        cached_loop, client = cached
+        if cached_loop is loop and not client.is_closed:
+            return client
+        if cached_loop is not loop:
+            _discard_stale_client(name, cached_loop, client)
+
+    client = _build_client(UPSTREAMS[name])
+    _clients[name] = (loop, client)
+    logger.debug("🌐 创建共享 HTTP 客户端", upstream=name, http2=http2_available())
+    return client
+
+
+async def close_http_clients():
+    """关闭所有共享客户端（应用退出时调用；其他事件循环上的客户端见 _discard_stale_client）"""
+    loop = asyncio.get_running_loop()
+    for name, (client_loop, client) in list(_clients.items()):
+        if client_loop is loop:
+            await client.aclose()
+        else:
+            _discard_stale_client(name, client_loop, client)
+        del _clients[name]
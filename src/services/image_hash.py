@@ -0,0 +1,258 @@
+"""
+图片感知哈希模块
+
+功能：
+1. 用 NumPy 计算 dHash（相邻像素亮度差）和 pHash（32x32 DCT 低频系数），各 64 位
+2. 直接按 PDF 页面区域渲染小尺寸灰度图计算哈希（延迟渲染时无需先生成图片文件）
+3. 合并同一篇论文中的近似重复图片（重复的 logo、teaser 等只保留第一次出现）
+4. 全库图片哈希索引：同一张图片在多篇论文 / 多个版本中只渲染、保存、上传一次
+
+两个哈希的汉明距离都不超过 DUPLICATE_MAX_DISTANCE 时视为近似重复。
+"""
+
+import json
+import logging
+import os
+import uuid
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from .figure_render import HAS_PILLOW
+
+logger = logging.getLogger(__name__)
+
+# 哈希边长（8x8 = 64 位）
+HASH_SIZE = 8
+
+# pHash 先缩放到 (HASH_SIZE * PHASH_HIGHFREQ_FACTOR)² 再做 DCT
+PHASH_HIGHFREQ_FACTOR = 4
+
+# 计算哈希时渲染的灰度图最短边（像素）
+HASH_RENDER_SIZE = 64
+
+# 近似重复的最大汉明距离（dHash 和 pHash 都需满足）
+DUPLICATE_MAX_DISTANCE = 6
+
+
+def _resize(gray: np.ndarray, rows: int, cols: int) -> np.ndarray:
+    """按区域均值把灰度图缩放到 rows x cols（尺寸不足时先按最近邻放大）"""
+    h, w = gray.shape
+    if h < rows:
+        gray = gray[np.arange(rows) * h // rows]
+        h = rows
+    if w < cols:
+        gray = gray[:, np.arange(cols) * w // cols]
+        w = cols
+
+    row_starts = np.arange(rows) * h // rows
+    col_starts = np.arange(cols) * w // cols
+    sums = np.add.reduceat(np.add.reduceat(gray, row_starts, axis=0), col_starts, axis=1)
+    counts = np.outer(np.diff(row_starts, append=h), np.diff(col_starts, append=w))
+    return sums / counts
+
+
+def _pack_bits(bits: np.ndarray) -> int:
+    """布尔矩阵 → 整数（按行优先，第一位为最高位）"""
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+@lru_cache(maxsize=4)
+def _dct_matrix(n: int) -> np.ndarray:
+    """n 阶正交 DCT-II 矩阵"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.sqrt(2 / n) * np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+def dhash(gray: np.ndarray, hash_size: int = HASH_SIZE) -> int:
+    """dHash：缩放到 hash_size x (hash_size + 1)，比较水平相邻像素"""
+    small = _resize(gray, hash_size, hash_size + 1)
+    return _pack_bits(small[:, 1:] > small[:, :-1])
+
+
+def phash(gray: np.ndarray, hash_size: int = HASH_SIZE) -> int:
+    """pHash：缩放到 32x32 做二维 DCT，低频 8x8 系数与其中位数比较"""
+    n = hash_size * PHASH_HIGHFREQ_FACTOR
+    dct = _dct_matrix(n)
+    coefficients = (dct @ _resize(gray, n, n) @ dct.T)[:hash_size, :hash_size]
+    return _pack_bits(coefficients > np.median(coefficients))
+
+
+def _pixmap_gray(pix: fitz.Pixmap) -> np.ndarray:
+    """Pixmap → 二维 float 灰度数组"""
+    if pix.n - pix.alpha != 1 or pix.alpha:
+        pix = fitz.Pixmap(fitz.csGRAY, pix)
+    rows = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)
+    return rows[:, :pix.width].astype(np.float64)
+
+
+def _hashes(gray: np.ndarray) -> Dict[str, str]:
+    return {"phash": f"{phash(gray):016x}", "dhash": f"{dhash(gray):016x}"}
+
+
+def region_hashes(page: fitz.Page, clip: fitz.Rect) -> Dict[str, str]:
+    """
+    渲染页面区域的小尺寸灰度图并计算哈希
+
+    Returns:
+        {"phash": "16 位十六进制", "dhash": "16 位十六进制"}
+    """
+    zoom = HASH_RENDER_SIZE / max(1.0, min(clip.width, clip.height))
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, colorspace=fitz.csGRAY, alpha=False)
+    return _hashes(_pixmap_gray(pix))
+
+
+def file_hashes(path: str) -> Dict[str, str]:
+    """计算图片文件的哈希（PNG / JPEG 由 PyMuPDF 解码，WebP 需要 Pillow）"""
+    if Path(path).suffix.lower() == ".webp":
+        if not HAS_PILLOW:
+            raise ValueError(f"解码 WebP 需要 Pillow: {path}")
+        from PIL import Image
+        with Image.open(path) as image:
+            gray = np.asarray(image.convert("L"), dtype=np.float64)
+        return _hashes(gray)
+    return _hashes(_pixmap_gray(fitz.Pixmap(str(path))))
+
+
+def hamming_distances(hashes: np.ndarray, value: int) -> np.ndarray:
+    """hashes（uint64 数组）中每个哈希与 value 的汉明距离"""
+    return np.bitwise_count(hashes ^ np.uint64(value))
+
+
+def _hash_arrays(items: List[Dict]):
+    return (
+        np.array([int(item["phash"], 16) for item in items], dtype=np.uint64),
+        np.array([int(item["dhash"], 16) for item in items], dtype=np.uint64),
+    )
+
+
+def _nearest(phashes: np.ndarray, dhashes: np.ndarray, item: Dict, max_distance: int) -> Optional[int]:
+    """phashes / dhashes 中与 item 近似重复且距离最小的下标，没有返回 None"""
+    if not len(phashes):
+        return None
+    p_dist = hamming_distances(phashes, int(item["phash"], 16))
+    d_dist = hamming_distances(dhashes, int(item["dhash"], 16))
+    candidates = np.flatnonzero((p_dist <= max_distance) & (d_dist <= max_distance))
+    if not len(candidates):
+        return None
+    return int(candidates[np.argmin(p_dist[candidates] + d_dist[candidates])])
+
+
+def collapse_duplicates(figures: List[Dict], max_distance: int = DUPLICATE_MAX_DISTANCE) -> List[Dict]:
+    """
+    合并近似重复的图片：按列表顺序保留第一次出现，重复项记录到保留项的 "duplicates" 中
+
+    没有哈希的图片原样保留。
+
+    Returns:
+        去重后的图片列表（重复项被移除）
+    """
+    unique: List[Dict] = []
+    hashed: List[Dict] = []
+    phashes = np.empty(0, dtype=np.uint64)
+    dhashes = np.empty(0, dtype=np.uint64)
+
+    for fig in figures:
+        if not fig.get("phash") or not fig.get("dhash"):
+            unique.append(fig)
+            continue
+
+        index = _nearest(phashes, dhashes, fig, max_distance)
+        if index is None:
+            unique.append(fig)
+            hashed.append(fig)
+            phashes, dhashes = _hash_arrays(hashed)
+            continue
+
+        canonical = hashed[index]
+        canonical.setdefault("duplicates", []).append({
+            "fig_type": fig.get("fig_type"),
+            "fig_name": fig.get("fig_name"),
+            "page": fig.get("page"),
+            "caption": fig.get("caption", ""),
+        })
+        logger.info(
+            f"🔁 {fig.get('fig_type')} {fig.get('fig_name')} 与 "
+            f"{canonical.get('fig_type')} {canonical.get('fig_name')} 近似重复，已合并"
+        )
+
+    return unique
+
+
+class ImageHashIndex:
+    """
+    全库图片哈希索引（JSON 文件）
+
+    每个条目：
+        {"phash", "dhash", "path": 已保存的图片文件, "file_upload_id": Notion 上传 ID（可选）}
+
+    同一张图片（论文重复收录、不同版本、多个小红书帖子）再次出现时，
+    直接复用已有的图片文件和 Notion 上传结果。
+    """
+
+    def __init__(self, index_path: Path, max_distance: int = DUPLICATE_MAX_DISTANCE):
+        """
+        初始化索引
+
+        Args:
+            index_path: 索引文件路径
+            max_distance: 近似重复的最大汉明距离
+        """
+        self.index_path = Path(index_path)
+        self.max_distance = max_distance
+        self.entries: List[Dict] = []
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f).get("entries", [])
+            except (OSError, ValueError) as e:
+                logger.warning(f"图片哈希索引读取失败，重新建立: {e}")
+        self._phashes, self._dhashes = _hash_arrays(self.entries)
+
+    def find(self, hashes: Dict) -> Optional[Dict]:
+        """查找近似重复的条目（距离最近的一个），没有返回 None"""
+        index = _nearest(self._phashes, self._dhashes, hashes, self.max_distance)
+        return None if index is None else self.entries[index]
+
+    def find_file(self, hashes: Dict, suffix: str) -> Optional[Path]:
+        """查找扩展名为 suffix 且文件仍存在的近似重复图片"""
+        entry = self.find(hashes)
+        if entry is None or not entry.get("path"):
+            return None
+        path = Path(entry["path"])
+        if path.suffix.lower() != suffix.lower() or not path.exists():
+            return None
+        return path
+
+    def add(self, hashes: Dict, **fields) -> Dict:
+        """登记图片（已有近似重复条目时更新该条目），返回条目"""
+        entry = self.find(hashes)
+        if entry is None:
+            entry = {"phash": hashes["phash"], "dhash": hashes["dhash"]}
+            self.entries.append(entry)
+            self._phashes, self._dhashes = _hash_arrays(self.entries)
+        entry.update({key: value for key, value in fields.items() if value is not None})
+        return entry
+
+    def remove(self, hashes: Dict) -> Optional[Dict]:
+        """删除近似重复的条目（例如 Notion 已不接受其 file_upload_id），返回被删除的条目"""
+        index = _nearest(self._phashes, self._dhashes, hashes, self.max_distance)
+        if index is None:
+            return None
+        entry = self.entries.pop(index)
+        self._phashes, self._dhashes = _hash_arrays(self.entries)
+        return entry
+
+    def save(self):
+        """原子写入索引文件"""
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.parent / f".{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"entries": self.entries}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.index_path)
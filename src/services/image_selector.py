@@ -5,12 +5,18 @@
 1. 评估论文中每张图片的重要性
 2. 根据 caption 和文章内容选择关键图片
 3. 返回精选的图片列表（通常 3-8 张最重要的图片）
+
+评分是向量化的：所有图片的特征（面积、caption 长度、页码位置、关键词权重）组成一个 NumPy 矩阵一次算完，
+关键词用一个预编译正则匹配。
 """
 
 import logging
-from typing import List, Dict, Tuple
+import re
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 
@@ -55,18 +61,103 @@ class ImageSelector:
         'figure': 0.5,  # 没有更多信息时
     }
 
-    def __init__(self, max_images: int = 6):
+    # 所有关键词合成一个预编译正则（关键词之间没有相互包含，一次扫描即可找出全部关键词）
+    KEYWORD_PATTERN = re.compile("|".join(re.escape(kw) for kw in CRITICAL_KEYWORDS))
+
+    # 面积分档（像素面积下界, 分数），从大到小匹配
+    AREA_TIERS = ((1000000, 3.0), (500000, 2.5), (300000, 1.5), (100000, 0.5), (0, 0.1))
+
+    # PDF 点面积 → 300 DPI 像素面积（PDFFigureExtractorV2 的 width/height 是 PDF 点）
+    PDF_POINT_AREA_SCALE = (300 / 72) ** 2
+
+    # caption 长度分档
+    CAPTION_LENGTH_TIERS = ((60, 1.0), (40, 0.7), (20, 0.3))
+
+    # 页码位置分档（页码 / 总页数的上界, 分数）：论文早期通常有重要的概述和架构图
+    PAGE_TIERS = ((0.2, 1.5), (0.35, 1.0), (0.6, 0.5))
+
+    def __init__(self, max_images: int = 6, area_scale: float = 1.0):
         """
         初始化图片选择器
 
         Args:
             max_images: 最多选择多少张图片（默认 6 张）
+            area_scale: width * height 换算为像素面积的系数（尺寸为像素时为 1）
         """
         self.max_images = max_images
+        self.area_scale = area_scale
+
+    @classmethod
+    def for_pdf_figures(cls, max_images: int = 6) -> "ImageSelector":
+        """用于 PDFFigureExtractorV2 记录（尺寸为 PDF 点）的选择器：面积按 300 DPI 换算为像素后分档"""
+        return cls(max_images, area_scale=cls.PDF_POINT_AREA_SCALE)
+
+    def keyword_weight(self, caption: str) -> float:
+        """caption 中出现的关键词的最高权重（没有关键词为 0）"""
+        return max((self.CRITICAL_KEYWORDS[kw] for kw in self.KEYWORD_PATTERN.findall(caption)), default=0.0)
+
+    def feature_matrix(self, images: List[Dict], total_pages: Optional[int] = None) -> np.ndarray:
+        """
+        构建特征矩阵，每行一张图片：[像素面积, caption 长度, 页码, 总页数, 关键词权重]
+
+        Args:
+            images: 图片信息列表（caption / page / width / height）
+            total_pages: 论文总页数（None 时使用每张图片的 total_pages 字段，默认 20）
+        """
+        captions = [(img.get('caption') or '').lower() for img in images]
+        return np.array([
+            [
+                (img.get('width') or 0) * (img.get('height') or 0) * self.area_scale,
+                len(caption),
+                img.get('page', 999),
+                total_pages or img.get('total_pages', 20),
+                self.keyword_weight(caption),
+            ]
+            for img, caption in zip(images, captions)
+        ], dtype=np.float64).reshape(len(images), 5)
+
+    def score_images(self, images: List[Dict], total_pages: Optional[int] = None) -> np.ndarray:
+        """
+        一次性为所有图片评分（综合考虑：caption、图片大小、页码位置）
+
+        Returns:
+            重要性评分数组 (0-10)，顺序与 images 一致
+        """
+        features = self.feature_matrix(images, total_pages)
+        area, caption_length, page, pages, keyword = features.T
+        has_caption = caption_length > 0
+
+        # 优先级 1：图片大小（大图通常更重要；没有尺寸信息不加分）
+        score = np.select(
+            [area > lower for lower, _ in self.AREA_TIERS],
+            [points for _, points in self.AREA_TIERS],
+            default=0.0
+        )
+
+        # 优先级 2：Caption 内容分析（基础分 + 最高权重关键词 + 详细程度）
+        score += np.where(has_caption, 0.5 + keyword, 0.0)
+        score += np.select(
+            [caption_length > lower for lower, _ in self.CAPTION_LENGTH_TIERS],
+            [points for _, points in self.CAPTION_LENGTH_TIERS],
+            default=0.0
+        )
+
+        # 优先级 3：页码位置
+        score += np.select(
+            [page <= pages * upper for upper, _ in self.PAGE_TIERS],
+            [points for _, points in self.PAGE_TIERS],
+            default=0.0
+        )
+
+        # 优先级 4：防止重复采样
+        # 同一页面的多张小图片（可能是网格式布局）降低评分
+        score = np.where((area < 100000) & ~has_caption, score * 0.5, score)
+
+        return np.minimum(score, 10.0)  # 最高分 10 分
 
     def score_image(self, image: Dict) -> float:
         """
-        为单张图片评分（综合考虑：caption、图片大小、页码位置）
+        为单张图片评分
 
         Args:
             image: 图片信息字典，包含：
@@ -78,74 +169,19 @@ class ImageSelector:
         Returns:
             重要性评分 (0-10)
         """
-        caption = image.get('caption', '').lower()
-        filename = image.get('filename', '').lower()
-        width = image.get('width', 0)
-        height = image.get('height', 0)
-
-        score = 0.0
-
-        # 优先级 1：图片大小（大图通常更重要）
-        if width and height:
-            area = width * height
-            if area > 1000000:  # 非常大的图 (>1000x1000)
-                score += 3.0
-            elif area > 500000:  # 大图 (>700x700)
-                score += 2.5
-            elif area > 300000:  # 中大图
-                score += 1.5
-            elif area > 100000:  # 中等图
-                score += 0.5
-            else:
-                # 小图片（通常是装饰或不重要的）
-                score += 0.1
-
-        # 优先级 2：Caption 内容分析
-        if caption:
-            score += 0.5  # 有 caption 的基础分
-
-            # 根据 caption 中的关键词加分
-            has_critical_keyword = False
-            for keyword, weight in self.CRITICAL_KEYWORDS.items():
-                if keyword in caption:
-                    score += weight
-                    has_critical_keyword = True
-                    break  # 每张图片只算一个最高权重关键词
-
-            # 根据 caption 长度评估详细程度
-            caption_length = len(caption)
-            if caption_length > 60:  # 长 caption = 重要内容
-                score += 1.0
-            elif caption_length > 40:
-                score += 0.7
-            elif caption_length > 20:
-                score += 0.3
-
-        # 优先级 3：页码位置
-        page = image.get('page', 999)
-        total_pages = image.get('total_pages', 20)
+        return float(self.score_images([image])[0])
 
-        # 论文早期通常有重要的概述和架构图
-        if page <= total_pages * 0.2:  # 前 20%
-            score += 1.5
-        elif page <= total_pages * 0.35:  # 前 35%（通常是方法章节）
-            score += 1.0
-        elif page <= total_pages * 0.6:  # 中间（方法和结果）
-            score += 0.5
-
-        # 优先级 4：防止重复采样
-        # 同一页面的多张小图片（可能是网格式布局）降低评分
-        if area < 100000 and caption == "":  # 小图且无 caption
-            score *= 0.5  # 减半
-
-        return min(score, 10.0)  # 最高分 10 分
-
-    def select_images(self, images: List[Dict]) -> Tuple[List[Dict], List[float]]:
+    def select_images(
+        self,
+        images: List[Dict],
+        total_pages: Optional[int] = None
+    ) -> Tuple[List[Dict], List[float]]:
         """
         从图片列表中选择最重要的图片
 
         Args:
             images: 所有提取的图片列表
+            total_pages: 论文总页数（可选）
 
         Returns:
             (选中的图片列表, 对应的评分列表)
@@ -156,33 +192,16 @@ class ImageSelector:
 
         logger.info(f"📷 开始评分 {len(images)} 张图片...")
 
-        # 为每张图片评分
-        scored_images = []
-        for i, img in enumerate(images):
-            score = self.score_image(img)
-            scored_images.append((img, score))
-            logger.debug(f"  图片 {i+1}: {img.get('filename', 'unknown')} -> 评分 {score:.2f}")
-
-        # 按评分排序（从高到低）
-        scored_images.sort(key=lambda x: x[1], reverse=True)
-
-        # 选择前 N 张
-        selected = scored_images[:self.max_images]
-
-        # 按原始顺序重新排列（保持在论文中的顺序）
-        selected_dict = {img['filename']: score for img, score in selected}
-        selected_in_order = [
-            img for img in images
-            if img['filename'] in selected_dict
-        ]
+        scores = self.score_images(images, total_pages)
 
-        selected_scores = [selected_dict[img['filename']] for img in selected_in_order]
+        # 按评分选择前 N 张（同分保持原始顺序），再按原始顺序排列（保持在论文中的顺序）
+        top = np.sort(np.argsort(-scores, kind="stable")[:self.max_images])
+        selected_in_order = [images[i] for i in top]
+        selected_scores = [float(scores[i]) for i in top]
 
         logger.info(
-            f"✅ 选择了 {len(selected_in_order)} 张关键图片",
-            total_images=len(images),
-            selected_count=len(selected_in_order),
-            top_3_scores=[f"{score:.2f}" for score, _ in sorted([(s, i) for i, s in enumerate(selected_scores)], reverse=True)[:3]]
+            f"✅ 选择了 {len(selected_in_order)}/{len(images)} 张关键图片，"
+            f"最高评分: {', '.join(f'{score:.2f}' for score in sorted(selected_scores, reverse=True)[:3])}"
         )
 
         return selected_in_order, selected_scores
@@ -207,12 +226,10 @@ class ImageSelector:
         if max_images:
             self.max_images = max_images
 
-        # 增加总页数信息（如果有的话）
+        # 总页数信息（没有时以最大页码估计）
         total_pages = max(img.get('page', 0) for img in images) if images else 20
-        for img in images:
-            img['total_pages'] = total_pages
 
-        selected, scores = self.select_images(images)
+        selected, scores = self.select_images(images, total_pages)
 
         # 如果有 digest_content，可以进行进一步的匹配
         # （当前版本使用简单评分，后续可以加入 LLM 匹配）
@@ -12,7 +12,8 @@ import json
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 import logging
-import httpx
+
+from .http_clients import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -83,58 +84,58 @@ class NotionImageUploader:
         logger.info(f"📤 开始上传图片: {image_filename} ({file_size} bytes)")
 
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                # Step 1: 创建 file upload 对象
-                logger.debug("Step 1: 创建 file upload 对象")
-                create_response = await client.post(
-                    f"{self.base_url}/file_uploads",
-                    headers=self.headers,
-                    json={
-                        "filename": image_filename,
-                        "content_type": content_type,
-                    }
+            client = get_http_client("notion")
+            # Step 1: 创建 file upload 对象
+            logger.debug("Step 1: 创建 file upload 对象")
+            create_response = await client.post(
+                f"{self.base_url}/file_uploads",
+                headers=self.headers,
+                json={
+                    "filename": image_filename,
+                    "content_type": content_type,
+                }
+            )
+            create_response.raise_for_status()
+            upload_data = create_response.json()
+
+            file_upload_id = upload_data.get("id")
+            if not file_upload_id:
+                raise ValueError("创建 file upload 失败：未获得 ID")
+
+            logger.debug(f"File upload ID: {file_upload_id}")
+
+            # Step 2: 上传文件内容
+            logger.debug("Step 2: 上传文件内容")
+            with open(image_path, "rb") as f:
+                send_response = await client.post(
+                    f"{self.base_url}/file_uploads/{file_upload_id}/send",
+                    headers={
+                        "Authorization": f"Bearer {self.notion_integration_secret}",
+                        "Notion-Version": "2022-06-28",
+                    },
+                    files={"file": (image_filename, f, content_type)}
                 )
-                create_response.raise_for_status()
-                upload_data = create_response.json()
-
-                file_upload_id = upload_data.get("id")
-                if not file_upload_id:
-                    raise ValueError("创建 file upload 失败：未获得 ID")
-
-                logger.debug(f"File upload ID: {file_upload_id}")
-
-                # Step 2: 上传文件内容
-                logger.debug("Step 2: 上传文件内容")
-                with open(image_path, "rb") as f:
-                    send_response = await client.post(
-                        f"{self.base_url}/file_uploads/{file_upload_id}/send",
-                        headers={
-                            "Authorization": f"Bearer {self.notion_integration_secret}",
-                            "Notion-Version": "2022-06-28",
-                        },
-                        files={"file": (image_filename, f, content_type)}
-                    )
-                    send_response.raise_for_status()
+                send_response.raise_for_status()
 
-                logger.debug("文件内容上传成功")
+            logger.debug("文件内容上传成功")
 
-                # Step 3: 获取最终状态
-                logger.debug("Step 3: 获取最终状态")
-                status_response = await client.get(
-                    f"{self.base_url}/file_uploads/{file_upload_id}",
-                    headers=self.headers
-                )
-                status_response.raise_for_status()
-                final_data = status_response.json()
+            # Step 3: 获取最终状态
+            logger.debug("Step 3: 获取最终状态")
+            status_response = await client.get(
+                f"{self.base_url}/file_uploads/{file_upload_id}",
+                headers=self.headers
+            )
+            status_response.raise_for_status()
+            final_data = status_response.json()
 
-                status = final_data.get("status", "unknown")
-                logger.info(f"✅ 图片上传成功: {image_filename} (ID: {file_upload_id}, status: {status})")
+            status = final_data.get("status", "unknown")
+            logger.info(f"✅ 图片上传成功: {image_filename} (ID: {file_upload_id}, status: {status})")
 
-                return {
-                    "file_upload_id": file_upload_id,
-                    "status": status,
-                    "filename": image_filename,
-                }
+            return {
+                "file_upload_id": file_upload_id,
+                "status": status,
+                "filename": image_filename,
+            }
 
         except Exception as e:
             logger.error(f"❌ 图片上传失败: {e}")
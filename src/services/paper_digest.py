@@ -14,16 +14,27 @@ Digest Agent Core - 论文整理核心 Agent（作为 sub-agent）
 import asyncio
 import os
 import sys
+import tempfile
 from pathlib import Path
-from typing import Annotated
+from typing import Annotated, Optional
 import json
-import httpx
 import fitz  # PyMuPDF
 import time
 
 from agents import Agent, function_tool, Runner
 from openai import AsyncOpenAI
 from ..utils.logger import get_logger
+from .pdf_text import PaperText, sha256_file
+from .paper_sections import build_section_excerpt, detect_sections, scale_section_budgets
+from .prompt_budget import (
+    fit_prompt_slots,
+    get_prompt_budgets,
+    get_token_counter,
+    log_prompt_tokens,
+    truncate_for_model,
+)
+from .paper_document import PaperDocument
+from .http_clients import get_http_client
 
 # 导入模型
 import sys
@@ -47,9 +58,27 @@ PDF_DIR = PROJECT_ROOT / "paper_digest" / "pdfs"  # 保持PDF在原位置
 OUTPUT_DIR.mkdir(exist_ok=True)
 PDF_DIR.mkdir(exist_ok=True)
 
+# Figures/Tables 延迟渲染：提取时只检测区域，digest 生成后只渲染实际引用的图片（FIGURE_LAZY_RENDER=0 关闭）
+FIGURE_LAZY_RENDER = os.getenv("FIGURE_LAZY_RENDER", "1") == "1"
+
+# 论文整理 prompt 中最多列出的 Figures/Tables 数（按重要性评分预筛选，0 表示不筛选）
+FIGURE_PREFILTER_TOP_K = int(os.getenv("FIGURE_PREFILTER_TOP_K", "8"))
+
+# 元数据提取使用的页数（标题页 + 摘要）
+METADATA_PAGES = 2
+
+# 识别出的章节数不少于该值时，论文整理 prompt 按章节分配预算
+MIN_SECTIONS_FOR_BUDGET = 3
+
+# 论文整理 prompt 中标题/作者部分的 token 预算
+PREAMBLE_TOKENS = 300
+
 # 全局变量
 _openai_client = None
 _current_paper = {}
+_pdf_store = None
+_text_cache = None
+_image_hash_index = None
 
 
 def _init_digest_globals(openai_client):
@@ -139,77 +168,69 @@ async def _fetch_arxiv_journal_ref(arxiv_id: str) -> dict:
         # ArXiv API 查询（使用 HTTPS，支持自动重定向）
         api_url = f"https://export.arxiv.org/api/query?id_list={arxiv_id}"
 
-        proxy = os.getenv('http_proxy')
-        mounts = None
-        if proxy:
-            mounts = {
-                "http://": httpx.AsyncHTTPTransport(proxy=proxy),
-                "https://": httpx.AsyncHTTPTransport(proxy=proxy),
+        client = get_http_client("arxiv")
+        response = await client.get(api_url)
+        response.raise_for_status()
+
+        # 解析 XML 响应
+        import xml.etree.ElementTree as ET
+        root = ET.fromstring(response.content)
+
+        # 查找论文条目
+        ns = {'atom': 'http://www.w3.org/2005/Atom'}
+        entries = root.findall('atom:entry', ns)
+
+        if entries:
+            entry = entries[0]
+
+            # 获取 journal-ref（发表期刊/会议）
+            journal_ref_elem = entry.find('{http://arxiv.org/schemas/atom}journal-ref')
+            journal_ref = journal_ref_elem.text if journal_ref_elem is not None else None
+
+            # 获取 comments（也可能包含发表信息，如 "ACL 2025"）
+            comments_elem = entry.find('{http://arxiv.org/schemas/atom}comment')
+            comments = comments_elem.text if comments_elem is not None else None
+
+            # 获取发布日期
+            published_elem = entry.find('atom:published', ns)
+            published = published_elem.text if published_elem is not None else None
+
+            # 获取作者
+            authors = []
+            for author_elem in entry.findall('atom:author', ns):
+                name_elem = author_elem.find('atom:name', ns)
+                if name_elem is not None:
+                    authors.append(name_elem.text)
+
+            result = {
+                "journal_ref": journal_ref,
+                "comments": comments,
+                "published_date": published[:10] if published else None,  # 提取日期部分
+                "authors": authors
             }
 
-        async with httpx.AsyncClient(timeout=30.0, mounts=mounts) as client:
-            response = await client.get(api_url)
-            response.raise_for_status()
-
-            # 解析 XML 响应
-            import xml.etree.ElementTree as ET
-            root = ET.fromstring(response.content)
-
-            # 查找论文条目
-            ns = {'atom': 'http://www.w3.org/2005/Atom'}
-            entries = root.findall('atom:entry', ns)
-
-            if entries:
-                entry = entries[0]
-
-                # 获取 journal-ref（发表期刊/会议）
-                journal_ref_elem = entry.find('{http://arxiv.org/schemas/atom}journal-ref')
-                journal_ref = journal_ref_elem.text if journal_ref_elem is not None else None
-
-                # 获取 comments（也可能包含发表信息，如 "ACL 2025"）
-                comments_elem = entry.find('{http://arxiv.org/schemas/atom}comment')
-                comments = comments_elem.text if comments_elem is not None else None
-
-                # 获取发布日期
-                published_elem = entry.find('atom:published', ns)
-                published = published_elem.text if published_elem is not None else None
-
-                # 获取作者
-                authors = []
-                for author_elem in entry.findall('atom:author', ns):
-                    name_elem = author_elem.find('atom:name', ns)
-                    if name_elem is not None:
-                        authors.append(name_elem.text)
-
-                result = {
-                    "journal_ref": journal_ref,
-                    "comments": comments,
-                    "published_date": published[:10] if published else None,  # 提取日期部分
-                    "authors": authors
-                }
-
-                # 优先级：journal-ref > comments > 无
-                if journal_ref:
-                    logger.info(
-                        "✅ ArXiv 查询成功，找到实际发表信息（来自 journal-ref）",
-                        arxiv_id=arxiv_id,
-                        journal_ref=journal_ref[:100],
-                        published_date=published[:10] if published else None
-                    )
-                elif comments:
-                    # 从 comments 中提取发表会议/期刊信息
-                    logger.info(
-                        "✅ ArXiv 查询成功，在 comments 中找到发表信息",
-                        arxiv_id=arxiv_id,
-                        comments=comments[:100]
-                    )
-                else:
-                    logger.info(
-                        "ℹ️ ArXiv 上该论文未记录最终发表信息（可能是预印本）",
-                        arxiv_id=arxiv_id
-                    )
+            # 优先级：journal-ref > comments > 无
+            if journal_ref:
+                logger.info(
+                    "✅ ArXiv 查询成功，找到实际发表信息（来自 journal-ref）",
+                    arxiv_id=arxiv_id,
+                    journal_ref=journal_ref[:100],
+                    published_date=published[:10] if published else None
+                )
+            elif comments:
+                # 从 comments 中提取发表会议/期刊信息
+                logger.info(
+                    "✅ ArXiv 查询成功，在 comments 中找到发表信息",
+                    arxiv_id=arxiv_id,
+                    comments=comments[:100]
+                )
+            else:
+                logger.info(
+                    "ℹ️ ArXiv 上该论文未记录最终发表信息（可能是预印本）",
+                    arxiv_id=arxiv_id
+                )
 
-                return result
+            return result
 
         logger.warning(f"⚠️ ArXiv API 未返回论文数据", arxiv_id=arxiv_id)
         return {"journal_ref": None}
@@ -219,49 +240,40 @@ async def _fetch_arxiv_journal_ref(arxiv_id: str) -> dict:
         return {"journal_ref": None}
 
 
-@function_tool
-async def extract_paper_metadata(
-    xiaohongshu_content: Annotated[str, "小红书帖子内容（可选）"] = "",
-    pdf_content: Annotated[str, "PDF的文本内容"] = "",
-    pdf_metadata: Annotated[str, "PDF的元数据（JSON格式）"] = ""
-) -> str:
+async def _run_metadata_extraction(
+    xiaohongshu_content: str,
+    pdf_excerpt: str,
+    pdf_metadata: str
+) -> dict:
     """
-    从 PDF 和小红书内容中提取所有论文信息（一次 LLM 调用）
+    调用 LLM 提取论文元数据，并用 ArXiv API 校正 venue / 发布日期
 
-    参数:
-        xiaohongshu_content: 小红书帖子内容（可选）
-        pdf_content: PDF 文本内容
+    Args:
+        xiaohongshu_content: 小红书帖子内容
+        pdf_excerpt: PDF 前几页文本
         pdf_metadata: PDF 元数据 (JSON格式)
 
-    返回:
-        JSON格式的完整论文信息，包括：
-        - title: 论文英文标题
-        - authors: 作者列表（数组）
-        - publication_date: 发表日期（YYYY-MM-DD）
-        - venue: 期刊/会议名称
-        - abstract: 摘要
-        - affiliations: 机构
-        - keywords: 关键词列表（数组）
-        - doi: DOI
-        - arxiv_id: ArXiv ID
-        - project_page: 项目主页
-        - other_resources: 其他资源
+    Returns:
+        提取到的元数据字典
     """
-    global _openai_client, _current_paper
-    start_time = time.time()
+    # 各槽位按模型的 token 预算截断（init_model.MODEL_CONFIGS["prompt_budgets"]）
+    slots = fit_prompt_slots("metadata", {
+        "pdf_excerpt": pdf_excerpt,
+        "xiaohongshu": xiaohongshu_content,
+    })
+    pdf_excerpt = slots["pdf_excerpt"]
+    xiaohongshu_content = slots["xiaohongshu"]
 
-    try:
-        logger.info("📚 开始提取论文元数据（LLM 调用 1/2）")
-        prompt = f"""你是论文信息提取专家。请从以下内容中提取完整的论文信息。
+    prompt = f"""你是论文信息提取专家。请从以下内容中提取完整的论文信息。
 
 # PDF 元数据
 {pdf_metadata}
 
-# PDF 内容（前5000字）
-{pdf_content[:5000] if pdf_content else "[未提供]"}
+# PDF 内容（前{METADATA_PAGES}页）
+{pdf_excerpt if pdf_excerpt else "[未提供]"}
 
 # 小红书内容（参考）
-{xiaohongshu_content[:2000] if xiaohongshu_content else "[未提供]"}
+{xiaohongshu_content if xiaohongshu_content else "[未提供]"}
 
 请提取以下信息，必须返回 JSON 格式：
 
@@ -287,64 +299,205 @@ async def extract_paper_metadata(
 5. 如果信息不足，使用 null 值
 """
 
-        # 使用 Agent 替代直接的 LLM 调用
-        metadata_extraction_agent = Agent(
-            name="metadata_extraction_agent",
-            instructions="你是专业的论文信息提取专家。你必须准确完整地提取论文的所有元数据。请严格按照用户的要求，以 JSON 格式返回提取的信息。",
-            model=get_tool_model(),
-        )
+    log_prompt_tokens("metadata", prompt)
+
+    # 使用 Agent 替代直接的 LLM 调用
+    metadata_extraction_agent = Agent(
+        name="metadata_extraction_agent",
+        instructions="你是专业的论文信息提取专家。你必须准确完整地提取论文的所有元数据。请严格按照用户的要求，以 JSON 格式返回提取的信息。",
+        model=get_tool_model(),
+    )
+
+    result = await Runner.run(
+        starting_agent=metadata_extraction_agent,
+        input=prompt,
+        max_turns=1
+    )
+
+    # 提取Agent返回的文本内容
+    response_text = result.final_output if hasattr(result, 'final_output') else str(result)
+
+    # 尝试解析 JSON（可能包含在 markdown 代码块中）
+    if "```json" in response_text:
+        response_text = response_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in response_text:
+        response_text = response_text.split("```")[1].split("```")[0].strip()
+
+    extracted_info = json.loads(response_text)
+
+    # 验证必填字段
+    if not extracted_info.get("title"):
+        extracted_info["title"] = "Unknown Paper"
+
+    # 🔍 如果有 ArXiv ID，从 ArXiv API 获取准确的 journal-ref 和 comments（真实发表信息）
+    arxiv_id = extracted_info.get("arxiv_id")
+    if arxiv_id:
+        arxiv_data = await _fetch_arxiv_journal_ref(arxiv_id)
+        if arxiv_data.get("journal_ref"):
+            # 优先使用 ArXiv 的 journal-ref（最准确的发表信息）
+            extracted_info["venue"] = arxiv_data["journal_ref"]
+            logger.info(
+                "🎯 使用 ArXiv journal-ref 作为 venue（准确的发表信息）",
+                venue=arxiv_data["journal_ref"][:100]
+            )
+        elif arxiv_data.get("comments"):
+            # 如果没有 journal-ref，检查 comments 字段（可能包含 "ACL 2025" 这样的信息）
+            extracted_info["venue"] = arxiv_data["comments"]
+            logger.info(
+                "🎯 使用 ArXiv comments 中的信息作为 venue",
+                comments=arxiv_data["comments"][:100]
+            )
+        elif arxiv_data.get("published_date"):
+            # 如果没有 journal-ref 和 comments，至少用 ArXiv 上的发布日期
+            if not extracted_info.get("publication_date") or extracted_info["publication_date"] == "null":
+                extracted_info["publication_date"] = arxiv_data["published_date"]
+                logger.info(
+                    "📅 使用 ArXiv 发布日期作为 publication_date",
+                    publication_date=arxiv_data["published_date"]
+                )
 
-        result = await Runner.run(
-            starting_agent=metadata_extraction_agent,
-            input=prompt,
-            max_turns=1
-        )
+    return extracted_info
 
-        # 提取Agent返回的文本内容
-        response_text = result.final_output if hasattr(result, 'final_output') else str(result)
 
-        # 尝试解析 JSON（可能包含在 markdown 代码块中）
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0].strip()
+async def _prefetch_metadata_from_head(
+    head: bytes,
+    total_size,
+    pdf_url: str,
+    xiaohongshu_content: str
+):
+    """
+    PDF 下载过程中，用已收到的头部字节解析前几页并提前提取元数据
+
+    非线性化 PDF 的 xref 表和页树在文件末尾，仅靠头部无法打开；
+    此时用 Range 请求单独取回文件尾部，与头部拼成稀疏文件再解析。
+    仍然解析失败时返回 None，extract_paper_metadata 会回退到常规流程。
+    """
+    pdf_excerpt = await asyncio.to_thread(_read_pdf_head_text, head)
+
+    if len(pdf_excerpt.strip()) < 200 and total_size and total_size > len(head):
+        from .pdf_download import fetch_tail
+        try:
+            tail = await fetch_tail(get_http_client("pdf"), pdf_url, total_size)
+        except Exception as e:
+            logger.info(f"ℹ️ 获取 PDF 尾部失败: {e}")
+            tail = None
+        if tail:
+            pdf_excerpt = await asyncio.to_thread(_read_pdf_head_text, head, tail, total_size)
 
-        extracted_info = json.loads(response_text)
+    if len(pdf_excerpt.strip()) < 200:
+        logger.info("ℹ️ PDF 头部无法解析出首页文本，跳过提前提取元数据")
+        return None
 
-        # 验证必填字段
-        if not extracted_info.get("title"):
-            extracted_info["title"] = "Unknown Paper"
+    logger.info("⚡ 已收到 PDF 首页，提前提取元数据（与剩余下载并行）", excerpt_length=len(pdf_excerpt))
+    return await _run_metadata_extraction(xiaohongshu_content, pdf_excerpt, "")
 
-        _current_paper.update(extracted_info)
 
-        # 🔍 如果有 ArXiv ID，从 ArXiv API 获取准确的 journal-ref 和 comments（真实发表信息）
-        arxiv_id = extracted_info.get("arxiv_id")
-        if arxiv_id:
-            arxiv_data = await _fetch_arxiv_journal_ref(arxiv_id)
-            if arxiv_data.get("journal_ref"):
-                # 优先使用 ArXiv 的 journal-ref（最准确的发表信息）
-                extracted_info["venue"] = arxiv_data["journal_ref"]
-                logger.info(
-                    "🎯 使用 ArXiv journal-ref 作为 venue（准确的发表信息）",
-                    venue=arxiv_data["journal_ref"][:100]
-                )
-                _current_paper["venue"] = arxiv_data["journal_ref"]
-            elif arxiv_data.get("comments"):
-                # 如果没有 journal-ref，检查 comments 字段（可能包含 "ACL 2025" 这样的信息）
-                extracted_info["venue"] = arxiv_data["comments"]
-                logger.info(
-                    "🎯 使用 ArXiv comments 中的信息作为 venue",
-                    comments=arxiv_data["comments"][:100]
-                )
-                _current_paper["venue"] = arxiv_data["comments"]
-            elif arxiv_data.get("published_date"):
-                # 如果没有 journal-ref 和 comments，至少用 ArXiv 上的发布日期
-                if not extracted_info.get("publication_date") or extracted_info["publication_date"] == "null":
-                    extracted_info["publication_date"] = arxiv_data["published_date"]
-                    logger.info(
-                        "📅 使用 ArXiv 发布日期作为 publication_date",
-                        publication_date=arxiv_data["published_date"]
-                    )
+def _discard_metadata_prefetch(pdf_path: Optional[str] = None):
+    """
+    取消并丢弃下载阶段的元数据预取任务
+
+    指定 pdf_path 时，只丢弃不属于该 PDF 的预取（同一文件的预取仍可复用）。
+    """
+    prefetch = _current_paper.get("metadata_prefetch")
+    if prefetch is None or (pdf_path is not None and prefetch["pdf_path"] == pdf_path):
+        return
+    _current_paper.pop("metadata_prefetch", None)
+    prefetch["task"].cancel()
+
+
+def _read_pdf_head_text(head: bytes, tail: bytes = b"", total_size: int = 0) -> str:
+    """
+    从 PDF 的部分字节中提取前几页文本
+
+    只有头部时直接从内存打开（PyMuPDF 会尝试修复不完整的文件）；
+    同时有尾部时写成稀疏临时文件（中间未下载的部分不占磁盘）再打开。
+    """
+    tmp_path = None
+    try:
+        if tail:
+            fd, tmp_path = tempfile.mkstemp(suffix=".pdf")
+            with os.fdopen(fd, 'wb') as f:
+                f.write(head)
+                f.seek(total_size - len(tail))
+                f.write(tail)
+            doc = fitz.open(tmp_path)
+        else:
+            doc = fitz.open(stream=head, filetype="pdf")
+        with doc:
+            end = min(METADATA_PAGES, doc.page_count)
+            return str(PaperText.from_pages([doc[i].get_text() for i in range(end)]))
+    except Exception:
+        return ""
+    finally:
+        if tmp_path:
+            os.unlink(tmp_path)
+
+
+@function_tool
+async def extract_paper_metadata(
+    xiaohongshu_content: Annotated[str, "小红书帖子内容（可选）"] = "",
+    pdf_content: Annotated[str, "PDF的文本内容"] = "",
+    pdf_metadata: Annotated[str, "PDF的元数据（JSON格式）"] = ""
+) -> str:
+    """
+    从 PDF 和小红书内容中提取所有论文信息（一次 LLM 调用）
+
+    参数:
+        xiaohongshu_content: 小红书帖子内容（可选）
+        pdf_content: PDF 文本内容
+        pdf_metadata: PDF 元数据 (JSON格式)
+
+    返回:
+        JSON格式的完整论文信息，包括：
+        - title: 论文英文标题
+        - authors: 作者列表（数组）
+        - publication_date: 发表日期（YYYY-MM-DD）
+        - venue: 期刊/会议名称
+        - abstract: 摘要
+        - affiliations: 机构
+        - keywords: 关键词列表（数组）
+        - doi: DOI
+        - arxiv_id: ArXiv ID
+        - project_page: 项目主页
+        - other_resources: 其他资源
+    """
+    global _openai_client, _current_paper
+    start_time = time.time()
+
+    try:
+        logger.info("📚 开始提取论文元数据（LLM 调用 1/2）")
+
+        # 如果下载阶段已经用 PDF 首页提前提取了元数据，直接使用其结果
+        # （预取必须属于当前论文的 PDF，且基于相同的小红书内容，否则丢弃）
+        extracted_info = None
+        prefetch = _current_paper.pop("metadata_prefetch", None)
+        if prefetch is not None:
+            if (
+                prefetch["pdf_path"] != _current_paper.get("pdf_path")
+                or prefetch["pdf_url"] != _current_paper.get("pdf_url")
+                or prefetch["xiaohongshu_content"] != xiaohongshu_content
+            ):
+                prefetch["task"].cancel()
+                logger.info("ℹ️ 提前提取的元数据与当前论文或输入不一致，重新提取")
+            else:
+                try:
+                    extracted_info = await prefetch["task"]
+                except Exception as e:
+                    logger.warning(f"⚠️ 提前提取元数据失败: {e}，重新提取")
+                if extracted_info:
+                    logger.info("♻️ 使用下载阶段提前提取的元数据")
+
+        if not extracted_info:
+            # 元数据只需要标题页：优先从已读取的全文对象中切出前几页（按 token 预算截断）
+            paper_text = _current_paper.get("pdf_content")
+            if isinstance(paper_text, PaperText):
+                pdf_excerpt = paper_text.pages(0, METADATA_PAGES)
+            else:
+                pdf_excerpt = pdf_content
+
+            extracted_info = await _run_metadata_extraction(xiaohongshu_content, pdf_excerpt, pdf_metadata)
+
+        _current_paper.update(extracted_info)
 
         # 如果 PDF 已下载但标题不一致，重新整理文件
         old_pdf_path = _current_paper.get("pdf_path")
@@ -356,6 +509,10 @@ async def extract_paper_metadata(
 
             # 如果路径不同，说明下载时使用的是错误的标题
             if old_path != expected_path:
+                # 后台图片提取仍在读取旧路径的 PDF，先等待其完成
+                figure_extraction = _current_paper.get("figure_extraction")
+                if figure_extraction is not None and Path(figure_extraction["pdf_path"]) == old_path:
+                    await asyncio.wait([figure_extraction["task"]])
                 try:
                     logger.info(
                         "📁 检测到标题不一致，重新整理 PDF 文件",
@@ -370,6 +527,11 @@ async def extract_paper_metadata(
                     import shutil
                     shutil.move(str(old_path), str(expected_path))
 
+                    # 已提取的图片随 PDF 一起移到新目录
+                    if figure_extraction is not None and Path(figure_extraction["pdf_path"]) == old_path:
+                        figure_extraction["pdf_path"] = str(expected_path)
+                        await _relocate_figure_extraction(expected_path.parent)
+
                     # 删除旧目录（如果为空）
                     try:
                         if old_path.parent != expected_path.parent:
@@ -377,8 +539,10 @@ async def extract_paper_metadata(
                     except:
                         pass  # 目录不为空，忽略
 
-                    # 更新全局变量中的路径
+                    # 更新全局变量中的路径（已打开的 PDF 会话不受移动影响，只更新记录的路径）
                     _current_paper["pdf_path"] = str(expected_path)
+                    if _current_paper.get("pdf_document") is not None:
+                        _current_paper["pdf_document"].pdf_path = str(expected_path)
 
                     logger.info("✅ PDF 文件已重新整理到正确路径")
 
@@ -452,56 +616,48 @@ async def search_arxiv_pdf(
         query = urllib.parse.quote(paper_title)
         api_url = f"https://export.arxiv.org/api/query?search_query=ti:{query}&max_results=3"
 
-        proxy = os.getenv('http_proxy')
-        mounts = None
-        if proxy:
-            mounts = {
-                "http://": httpx.AsyncHTTPTransport(proxy=proxy),
-                "https://": httpx.AsyncHTTPTransport(proxy=proxy),
-            }
+        client = get_http_client("arxiv")
+        response = await client.get(api_url)
+        response.raise_for_status()
 
-        async with httpx.AsyncClient(timeout=30.0, mounts=mounts) as client:
-            response = await client.get(api_url)
-            response.raise_for_status()
-
-            # 解析 XML 响应
-            import xml.etree.ElementTree as ET
-            root = ET.fromstring(response.content)
-
-            # 查找第一个匹配的论文
-            ns = {'atom': 'http://www.w3.org/2005/Atom'}
-            entries = root.findall('atom:entry', ns)
-
-            if entries:
-                entry = entries[0]
-                # 获取 arXiv ID
-                arxiv_id_elem = entry.find('atom:id', ns)
-                if arxiv_id_elem is not None:
-                    arxiv_id_full = arxiv_id_elem.text
-                    # 提取 ID 部分（例如：http://arxiv.org/abs/2410.04618 -> 2410.04618）
-                    arxiv_id = arxiv_id_full.split('/abs/')[-1]
-                    pdf_url = f"https://arxiv.org/pdf/{arxiv_id}.pdf"
-
-                    # 获取标题确认
-                    title_elem = entry.find('atom:title', ns)
-                    found_title = title_elem.text.strip() if title_elem is not None else "Unknown"
-
-                    elapsed = time.time() - start_time
-                    logger.info(
-                        "✅ arXiv 搜索成功",
-                        arxiv_id=arxiv_id,
-                        found_title=found_title[:100],
-                        elapsed_time=f"{elapsed:.2f}s"
-                    )
+        # 解析 XML 响应
+        import xml.etree.ElementTree as ET
+        root = ET.fromstring(response.content)
+
+        # 查找第一个匹配的论文
+        ns = {'atom': 'http://www.w3.org/2005/Atom'}
+        entries = root.findall('atom:entry', ns)
+
+        if entries:
+            entry = entries[0]
+            # 获取 arXiv ID
+            arxiv_id_elem = entry.find('atom:id', ns)
+            if arxiv_id_elem is not None:
+                arxiv_id_full = arxiv_id_elem.text
+                # 提取 ID 部分（例如：http://arxiv.org/abs/2410.04618 -> 2410.04618）
+                arxiv_id = arxiv_id_full.split('/abs/')[-1]
+                pdf_url = f"https://arxiv.org/pdf/{arxiv_id}.pdf"
 
-                    return json.dumps({
-                        "success": True,
-                        "pdf_url": pdf_url,
-                        "arxiv_id": arxiv_id,
-                        "arxiv_abs_url": f"https://arxiv.org/abs/{arxiv_id}",
-                        "found_title": found_title,
-                        "message": f"✅ 在 arXiv 找到论文！（耗时 {elapsed:.2f}s）\nPDF: {pdf_url}\narXiv ID: {arxiv_id}"
-                    }, ensure_ascii=False, indent=2)
+                # 获取标题确认
+                title_elem = entry.find('atom:title', ns)
+                found_title = title_elem.text.strip() if title_elem is not None else "Unknown"
+
+                elapsed = time.time() - start_time
+                logger.info(
+                    "✅ arXiv 搜索成功",
+                    arxiv_id=arxiv_id,
+                    found_title=found_title[:100],
+                    elapsed_time=f"{elapsed:.2f}s"
+                )
+
+                return json.dumps({
+                    "success": True,
+                    "pdf_url": pdf_url,
+                    "arxiv_id": arxiv_id,
+                    "arxiv_abs_url": f"https://arxiv.org/abs/{arxiv_id}",
+                    "found_title": found_title,
+                    "message": f"✅ 在 arXiv 找到论文！（耗时 {elapsed:.2f}s）\nPDF: {pdf_url}\narXiv ID: {arxiv_id}"
+                }, ensure_ascii=False, indent=2)
 
         # 未找到
         elapsed = time.time() - start_time
@@ -548,121 +704,106 @@ async def extract_paper_info_from_webpage(
     try:
         logger.info("🔍 开始从网页提取论文信息", url=webpage_url[:100])
 
-        proxy = os.getenv('http_proxy')
-        mounts = None
-        if proxy:
-            mounts = {
-                "http://": httpx.AsyncHTTPTransport(proxy=proxy),
-                "https://": httpx.AsyncHTTPTransport(proxy=proxy),
-            }
+        client = get_http_client("web")
+        response = await client.get(webpage_url)
+        response.raise_for_status()
 
-        async with httpx.AsyncClient(
-            timeout=30.0,
-            follow_redirects=True,
-            mounts=mounts,
-            headers={
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-        ) as client:
-            response = await client.get(webpage_url)
-            response.raise_for_status()
+        html_content = response.text
 
-            html_content = response.text
+        # 使用 BeautifulSoup 解析 HTML（如果可用）
+        try:
+            from bs4 import BeautifulSoup
+            soup = BeautifulSoup(html_content, 'html.parser')
+
+            # 提取标题
+            title = None
+            title_selectors = [
+                'h1.c-article-title',  # Nature
+                'h1[class*="article-title"]',
+                'h1[class*="ArticleTitle"]',
+                'meta[name="citation_title"]',
+                'meta[property="og:title"]',
+                'title',
+            ]
 
-            # 使用 BeautifulSoup 解析 HTML（如果可用）
-            try:
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(html_content, 'html.parser')
-
-                # 提取标题
-                title = None
-                title_selectors = [
-                    'h1.c-article-title',  # Nature
-                    'h1[class*="article-title"]',
-                    'h1[class*="ArticleTitle"]',
-                    'meta[name="citation_title"]',
-                    'meta[property="og:title"]',
-                    'title',
-                ]
-
-                for selector in title_selectors:
-                    if selector.startswith('meta'):
-                        elem = soup.find('meta', attrs={'name': selector.split('[name="')[1].rstrip('"]')}) or \
-                               soup.find('meta', attrs={'property': selector.split('[property="')[1].rstrip('"]')})
-                        if elem and elem.get('content'):
-                            title = elem.get('content')
-                            break
-                    else:
-                        elem = soup.select_one(selector)
-                        if elem:
-                            title = elem.get_text(strip=True)
-                            break
-
-                # 提取PDF链接
-                pdf_url = None
-                pdf_patterns = [
-                    r'href="([^"]*\.pdf)"',
-                    r'data-track-action="download pdf"[^>]*href="([^"]*)"',
-                    r'href="([^"]*/pdf/[^"]*)"',
-                ]
-
-                for pattern in pdf_patterns:
-                    import re
-                    matches = re.findall(pattern, html_content, re.IGNORECASE)
-                    if matches:
-                        pdf_url = matches[0]
-                        # 处理相对URL
-                        if pdf_url.startswith('/'):
-                            from urllib.parse import urljoin
-                            pdf_url = urljoin(webpage_url, pdf_url)
+            for selector in title_selectors:
+                if selector.startswith('meta'):
+                    elem = soup.find('meta', attrs={'name': selector.split('[name="')[1].rstrip('"]')}) or \
+                           soup.find('meta', attrs={'property': selector.split('[property="')[1].rstrip('"]')})
+                    if elem and elem.get('content'):
+                        title = elem.get('content')
+                        break
+                else:
+                    elem = soup.select_one(selector)
+                    if elem:
+                        title = elem.get_text(strip=True)
                         break
 
-                elapsed = time.time() - start_time
+            # 提取PDF链接
+            pdf_url = None
+            pdf_patterns = [
+                r'href="([^"]*\.pdf)"',
+                r'data-track-action="download pdf"[^>]*href="([^"]*)"',
+                r'href="([^"]*/pdf/[^"]*)"',
+            ]
 
-                if title:
-                    logger.info(
-                        "✅ 网页信息提取成功",
-                        title=title[:100],
-                        has_pdf=bool(pdf_url),
-                        elapsed_time=f"{elapsed:.2f}s"
-                    )
+            for pattern in pdf_patterns:
+                import re
+                matches = re.findall(pattern, html_content, re.IGNORECASE)
+                if matches:
+                    pdf_url = matches[0]
+                    # 处理相对URL
+                    if pdf_url.startswith('/'):
+                        from urllib.parse import urljoin
+                        pdf_url = urljoin(webpage_url, pdf_url)
+                    break
 
-                    return json.dumps({
-                        "success": True,
-                        "title": title,
-                        "pdf_url": pdf_url,
-                        "webpage_url": webpage_url,
-                        "message": f"✅ 提取到论文标题：{title[:100]}" +
-                                 (f"\n找到PDF链接：{pdf_url}" if pdf_url else "\n未找到直接PDF链接，将使用标题搜索")
-                    }, ensure_ascii=False, indent=2)
-                else:
-                    return json.dumps({
-                        "success": False,
-                        "error": "无法从网页提取论文标题"
-                    }, ensure_ascii=False, indent=2)
+            elapsed = time.time() - start_time
 
-            except ImportError:
-                # BeautifulSoup 不可用，使用简单的正则提取
-                import re
-                title_match = re.search(r'<title>([^<]+)</title>', html_content, re.IGNORECASE)
-                title = title_match.group(1) if title_match else None
-
-                pdf_match = re.search(r'href="([^"]*\.pdf)"', html_content, re.IGNORECASE)
-                pdf_url = pdf_match.group(1) if pdf_match else None
-
-                if title:
-                    return json.dumps({
-                        "success": True,
-                        "title": title,
-                        "pdf_url": pdf_url,
-                        "webpage_url": webpage_url,
-                        "message": f"✅ 提取到论文信息（基础模式）"
-                    }, ensure_ascii=False, indent=2)
-                else:
-                    return json.dumps({
-                        "success": False,
-                        "error": "无法提取论文信息"
-                    }, ensure_ascii=False, indent=2)
+            if title:
+                logger.info(
+                    "✅ 网页信息提取成功",
+                    title=title[:100],
+                    has_pdf=bool(pdf_url),
+                    elapsed_time=f"{elapsed:.2f}s"
+                )
+
+                return json.dumps({
+                    "success": True,
+                    "title": title,
+                    "pdf_url": pdf_url,
+                    "webpage_url": webpage_url,
+                    "message": f"✅ 提取到论文标题：{title[:100]}" +
+                             (f"\n找到PDF链接：{pdf_url}" if pdf_url else "\n未找到直接PDF链接，将使用标题搜索")
+                }, ensure_ascii=False, indent=2)
+            else:
+                return json.dumps({
+                    "success": False,
+                    "error": "无法从网页提取论文标题"
+                }, ensure_ascii=False, indent=2)
+
+        except ImportError:
+            # BeautifulSoup 不可用，使用简单的正则提取
+            import re
+            title_match = re.search(r'<title>([^<]+)</title>', html_content, re.IGNORECASE)
+            title = title_match.group(1) if title_match else None
+
+            pdf_match = re.search(r'href="([^"]*\.pdf)"', html_content, re.IGNORECASE)
+            pdf_url = pdf_match.group(1) if pdf_match else None
+
+            if title:
+                return json.dumps({
+                    "success": True,
+                    "title": title,
+                    "pdf_url": pdf_url,
+                    "webpage_url": webpage_url,
+                    "message": f"✅ 提取到论文信息（基础模式）"
+                }, ensure_ascii=False, indent=2)
+            else:
+                return json.dumps({
+                    "success": False,
+                    "error": "无法提取论文信息"
+                }, ensure_ascii=False, indent=2)
 
     except Exception as e:
         elapsed = time.time() - start_time
@@ -701,39 +842,51 @@ async def download_pdf_from_url(
         # 使用新的目录结构：paper_digest/pdfs/{Paper_Title}/paper.pdf
         local_path = _get_paper_pdf_path(paper_title)
 
-        # 下载 PDF
-        proxy = os.getenv('http_proxy')
-        mounts = None
-        if proxy:
-            mounts = {
-                "http://": httpx.AsyncHTTPTransport(proxy=proxy),
-                "https://": httpx.AsyncHTTPTransport(proxy=proxy),
+        # 收到 PDF 头部后立即在后台提取元数据，与剩余下载并行（LLM 往返被下载时间覆盖）
+        # 预取记录所属的 PDF 和所用的小红书内容，extract_paper_metadata 只复用匹配的结果
+        _discard_metadata_prefetch()
+
+        xiaohongshu_content = _current_paper.get("raw_content", "")
+
+        def on_head(head: bytes, total_size):
+            _current_paper["metadata_prefetch"] = {
+                "task": asyncio.create_task(
+                    _prefetch_metadata_from_head(head, total_size, pdf_url, xiaohongshu_content)
+                ),
+                "pdf_url": pdf_url,
+                "pdf_path": str(local_path),
+                "xiaohongshu_content": xiaohongshu_content,
             }
 
-        async with httpx.AsyncClient(
-            timeout=60.0,
-            follow_redirects=True,
-            mounts=mounts
-        ) as client:
-            response = await client.get(pdf_url)
-            response.raise_for_status()
+        # 流式下载到内容寻址存储，再硬链接到论文目录
+        store = _get_pdf_store()
+        client = get_http_client("pdf")
+        download = await store.fetch(client, pdf_url, on_head=on_head)
 
-            with open(local_path, 'wb') as f:
-                f.write(response.content)
+        store.materialize(download["path"], local_path)
+
+        # PDF 已落盘：后台启动 Figures/Tables 提取，与读取全文、元数据提取并行
+        document = await _open_paper_document(str(local_path))
+        await _start_figure_extraction(str(local_path), document)
 
         # 读取 PDF 内容
         logger.info("📖 开始读取 PDF 内容")
-        pdf_content, pdf_metadata = _read_pdf_file(str(local_path))
+        pdf_content, pdf_metadata = await asyncio.to_thread(
+            _read_pdf_file, str(local_path), download["sha256"], document
+        )
 
         _current_paper["pdf_path"] = str(local_path)
         _current_paper["pdf_url"] = pdf_url
+        _current_paper["pdf_sha256"] = download["sha256"]
         _current_paper["pdf_content"] = pdf_content
         _current_paper["pdf_metadata"] = pdf_metadata
 
         elapsed = time.time() - start_time
         logger.info(
             "✅ PDF 下载并读取成功",
-            file_size=f"{len(response.content) / 1024 / 1024:.2f}MB",
+            file_size=f"{download['size'] / 1024 / 1024:.2f}MB",
+            from_cache=download["from_cache"],
+            resumed=f"{download.get('resumed_bytes', 0) / 1024 / 1024:.2f}MB",
             pages=pdf_metadata.get("pages", 0),
             content_length=len(pdf_content),
             elapsed_time=f"{elapsed:.2f}s"
@@ -749,6 +902,8 @@ async def download_pdf_from_url(
         }, ensure_ascii=False, indent=2)
 
     except Exception as e:
+        # 下载失败：预取的元数据不能留给之后读取的其他 PDF
+        _discard_metadata_prefetch()
         elapsed = time.time() - start_time
         logger.error(
             "❌ PDF 下载失败",
@@ -780,9 +935,18 @@ async def read_local_pdf(
     try:
         logger.info("📖 开始读取本地 PDF", pdf_path=pdf_path)
 
-        pdf_content, pdf_metadata = _read_pdf_file(pdf_path)
+        # 之前下载的其他 PDF 的元数据预取不再适用
+        _discard_metadata_prefetch(pdf_path)
+
+        pdf_sha256 = await asyncio.to_thread(sha256_file, pdf_path)
+        document = await _open_paper_document(pdf_path)
+        if PDF_DIR.resolve() in Path(pdf_path).resolve().parents:
+            # 已在论文目录中的 PDF：后台启动 Figures/Tables 提取
+            await _start_figure_extraction(pdf_path, document)
+        pdf_content, pdf_metadata = await asyncio.to_thread(_read_pdf_file, pdf_path, pdf_sha256, document)
 
         _current_paper["pdf_path"] = pdf_path
+        _current_paper["pdf_sha256"] = pdf_sha256
         _current_paper["pdf_content"] = pdf_content
         _current_paper["pdf_metadata"] = pdf_metadata
 
@@ -818,6 +982,259 @@ async def read_local_pdf(
         }, ensure_ascii=False, indent=2)
 
 
+async def _start_figure_extraction(pdf_path: str, document: PaperDocument):
+    """
+    PDF 落盘后立即在后台提取 Figures/Tables
+
+    提取任务（PDFFigures2 常驻 JVM + 线程中的渲染）与元数据提取等后续步骤并行，
+    generate_paper_digest 只等待其结果。图片保存在 PDF 所在论文目录的 extracted_images/。
+    """
+    from .figure_render import get_render_profile
+    from .pdf_figure_extractor_v2 import PDFFigureExtractorV2
+
+    await _cancel_figure_extraction()
+    images_dir = Path(pdf_path).parent / "extracted_images"
+    extractor = PDFFigureExtractorV2(str(images_dir), get_render_profile().name, lazy_render=FIGURE_LAZY_RENDER)
+    _current_paper["figure_extraction"] = {
+        "pdf_path": str(pdf_path),
+        "images_dir": str(images_dir),
+        "task": asyncio.create_task(extractor.extract_async(str(pdf_path), document=document)),
+    }
+    logger.info("🖼️  已在后台启动 Figures/Tables 提取", images_dir=str(images_dir))
+
+
+async def _cancel_figure_extraction():
+    """
+    取消上一篇论文尚未完成的后台图片提取，并等待其结束
+
+    线程中的渲染无法中断（提取器在线程结束后才结束被取消的任务），
+    等待后才能安全地关闭它使用的 PDF 会话、复用它的 extracted_images/ 目录。
+    """
+    record = _current_paper.pop("figure_extraction", None)
+    if record is not None and not record["task"].done():
+        record["task"].cancel()
+        await asyncio.wait([record["task"]])
+
+
+async def _relocate_figure_extraction(new_paper_dir: Path):
+    """
+    论文目录因标题修正而变化时，等待后台图片提取完成，再把 extracted_images/ 一并移到新目录
+
+    PDFFigures2 按路径读取 PDF，必须在提取结束后才能移动文件。
+    """
+    record = _current_paper.get("figure_extraction")
+    if record is None:
+        return
+    try:
+        images, _ = await record["task"]
+    except Exception as e:
+        logger.warning(f"后台图片提取失败: {e}")
+        return
+
+    old_dir = Path(record["images_dir"])
+    new_dir = new_paper_dir / "extracted_images"
+    if old_dir == new_dir or not old_dir.exists() or (new_dir.exists() and any(new_dir.iterdir())):
+        return
+
+    import shutil
+    if new_dir.exists():
+        new_dir.rmdir()
+    shutil.move(str(old_dir), str(new_dir))
+    record["images_dir"] = str(new_dir)
+
+    # 更新图片路径和 extraction_metadata.json
+    for img in images:
+        img["local_path"] = str(new_dir / img["filename"])
+    metadata_path = new_dir / "extraction_metadata.json"
+    if metadata_path.exists():
+        with open(metadata_path, 'r') as f:
+            metadata = json.load(f)
+        metadata["items"] = images
+        with open(metadata_path, 'w') as f:
+            json.dump(metadata, f, indent=2)
+
+    logger.info("📁 已将提取的图片移到新的论文目录", images_dir=str(new_dir))
+
+
+async def _await_figure_extraction(pdf_path: str, paper_title: str):
+    """
+    获取 Figures/Tables 提取结果
+
+    已在后台启动时等待其完成；否则（例如论文目录之外的本地 PDF）现在提取。
+
+    Returns:
+        (images, images_dir)
+    """
+    record = _current_paper.get("figure_extraction")
+    if record is not None and Path(record["pdf_path"]) == Path(pdf_path):
+        if not record["task"].done():
+            logger.info("⏳ 等待后台 Figures/Tables 提取完成")
+        images, _ = await record["task"]
+        return images, Path(record["images_dir"])
+
+    from .figure_render import get_render_profile
+    from .pdf_figure_extractor_v2 import PDFFigureExtractorV2
+
+    # 将图片保存到论文特定目录：paper_digest/pdfs/{Paper_Title}/extracted_images/
+    images_dir = _get_paper_images_dir(paper_title)
+
+    # 复用下载/读取阶段打开的 PDF 会话（页文本、绘图对象不再重复解析）
+    document = _current_paper.get("pdf_document")
+    if document is not None and Path(document.pdf_path) != Path(pdf_path):
+        document = None
+
+    # PDFFigures2 在常驻 JVM 池中运行（不再每篇论文冷启动一次 JVM）
+    extractor = PDFFigureExtractorV2(str(images_dir), get_render_profile().name, lazy_render=FIGURE_LAZY_RENDER)
+    images, _ = await extractor.extract_async(pdf_path, document=document)
+    return images, images_dir
+
+
+async def _render_referenced_figures(markdown_content: str):
+    """
+    延迟渲染模式下，只渲染 Markdown 中实际引用的 Figures/Tables
+
+    图片引用包括 <figure><img src=".../Figure1.webp"> 和 ![...](path/Figure1.webp)。
+    """
+    import re
+    from .figure_render import get_render_profile
+    from .pdf_figure_extractor_v2 import PDFFigureExtractorV2
+
+    images = _current_paper.get("extracted_images") or []
+    pending = [img for img in images if not img.get("rendered", True)]
+    pdf_path = _current_paper.get("pdf_path")
+    if not pending or not pdf_path:
+        return
+
+    referenced = set(re.findall(r'<img src="[^"]*?/([^/"]+)"', markdown_content))
+    referenced.update(Path(path).name for path in re.findall(r'!\[[^\]]*\]\(([^)]+)\)', markdown_content))
+    selected = [img for img in pending if img["filename"] in referenced]
+    if not selected:
+        return
+
+    document = _current_paper.get("pdf_document")
+    if document is not None and Path(document.pdf_path) != Path(pdf_path):
+        document = None
+
+    # 全库哈希索引中已有的同一张图片（其他论文 / 其他版本）直接复用，不再渲染
+    index = _get_image_hash_index()
+    reuse = {}
+    for img in selected:
+        if img.get("phash"):
+            existing = index.find_file(img, Path(img["filename"]).suffix)
+            if existing is not None and existing != Path(img["local_path"]):
+                reuse[img["filename"]] = str(existing)
+
+    extractor = PDFFigureExtractorV2(_current_paper["images_dir"], get_render_profile().name, lazy_render=True)
+    await asyncio.to_thread(extractor.render_figures, pdf_path, selected, document, reuse)
+    _register_rendered_images(selected)
+    logger.info(
+        "🖼️  已渲染 digest 引用的图片",
+        rendered=len(selected) - len(reuse),
+        reused=len(reuse),
+        skipped=len(pending) - len(selected)
+    )
+
+
+def _register_rendered_images(images: list):
+    """把已渲染的图片登记到全库哈希索引（之后的论文遇到同一张图片时直接复用）"""
+    index = _get_image_hash_index()
+    registered = 0
+    for img in images:
+        if img.get("phash") and img.get("rendered", True) and Path(img["local_path"]).exists():
+            index.add(img, path=img["local_path"])
+            registered += 1
+    if registered:
+        index.save()
+
+
+def _attached_upload_ids(blocks: list) -> set:
+    """Notion blocks 中引用的 file_upload ID"""
+    return {
+        block["image"]["file_upload"].get("id")
+        for block in blocks
+        if block.get("type") == "image" and block.get("image", {}).get("type") == "file_upload"
+    }
+
+
+def _record_image_uploads(upload_records: list, blocks: list):
+    """
+    页面创建成功后，把本次新上传且已附加到页面的 file_upload_id 登记到全库哈希索引
+
+    Notion 会让未附加到页面的上传过期，因此只能在页面创建成功后登记。
+    """
+    index = _get_image_hash_index()
+    attached = _attached_upload_ids(blocks)
+    recorded = 0
+    for record in upload_records:
+        if not record["reused"] and record["file_upload_id"] in attached:
+            index.add(record["hashes"], path=record["path"], file_upload_id=record["file_upload_id"])
+            recorded += 1
+    if recorded:
+        index.save()
+
+
+def _forget_image_uploads(upload_records: list):
+    """Notion 拒绝了复用的 file_upload_id：从全库哈希索引中删除对应条目"""
+    index = _get_image_hash_index()
+    removed = 0
+    for record in upload_records:
+        if record["reused"] and index.remove(record["hashes"]) is not None:
+            removed += 1
+    if removed:
+        index.save()
+
+
+def _paper_disk_usage(paper_dir: Path) -> dict:
+    """
+    统计论文目录的磁盘占用（字节）
+
+    Returns:
+        {"pdf": PDF 文件, "images": extracted_images/ 中的图片和元数据,
+         "temp": 残留的 PDFFigures2 临时目录, "other": 其他文件, "total": 合计}
+    """
+    usage = {"pdf": 0, "images": 0, "temp": 0, "other": 0}
+    for path in paper_dir.rglob("*"):
+        if not path.is_file():
+            continue
+        size = path.stat().st_size
+        parts = path.relative_to(paper_dir).parts
+        if "_pdffigures2_temp" in parts:
+            usage["temp"] += size
+        elif parts[0] == "extracted_images":
+            usage["images"] += size
+        elif path.suffix.lower() == ".pdf":
+            usage["pdf"] += size
+        else:
+            usage["other"] += size
+    usage["total"] = sum(usage.values())
+    return usage
+
+
+async def _open_paper_document(pdf_path: str) -> PaperDocument:
+    """
+    为当前论文打开共享的 PDF 会话（关闭之前的会话，文件可能已被重新下载）
+
+    之前的后台图片提取可能仍在使用旧会话，先取消并等待其结束再关闭。
+    """
+    await _cancel_figure_extraction()
+    previous = _current_paper.get("pdf_document")
+    if previous is not None:
+        previous.close()
+
+    document = PaperDocument(pdf_path)
+    _current_paper["pdf_document"] = document
+    return document
+
+
+def _get_pdf_store():
+    """获取内容寻址的 PDF 存储（paper_digest/pdfs/_store/）"""
+    global _pdf_store
+    if _pdf_store is None:
+        from .pdf_download import PDFStore
+        _pdf_store = PDFStore(PDF_DIR / "_store")
+    return _pdf_store
+
+
 def _get_paper_directory(paper_title: str) -> Path:
     """
     为每篇论文创建独立的目录
@@ -870,57 +1287,94 @@ def _get_paper_images_dir(paper_title: str) -> Path:
     return images_dir
 
 
-def _read_pdf_file(pdf_path: str):
-    """读取 PDF 文件内容和元数据（内部函数）"""
-    doc = fitz.open(pdf_path)
-    total_pages = doc.page_count
-
-    # 提取元数据
-    metadata = doc.metadata
-    metadata_dict = {
-        "title": metadata.get("title", ""),
-        "author": metadata.get("author", ""),
-        "subject": metadata.get("subject", ""),
-        "keywords": metadata.get("keywords", ""),
-        "creator": metadata.get("creator", ""),
-        "producer": metadata.get("producer", ""),
-        "creationDate": metadata.get("creationDate", ""),
-        "modDate": metadata.get("modDate", ""),
-        "pages": total_pages,
-    }
+def _get_text_cache():
+    """获取 PDF 页文本缓存（paper_digest/pdfs/_text_cache/）"""
+    global _text_cache
+    if _text_cache is None:
+        from .pdf_text import PageTextCache
+        _text_cache = PageTextCache(PDF_DIR / "_text_cache")
+    return _text_cache
 
-    # 分批读取全部内容（每次10页）
-    PAGES_PER_BATCH = 10
-    all_pdf_text = []
-    current_page = 0
 
-    while current_page < total_pages:
-        end_page = min(current_page + PAGES_PER_BATCH, total_pages)
-        batch_text = ""
+def _get_image_hash_index():
+    """获取全库图片哈希索引（paper_digest/pdfs/_image_hash_index.json）"""
+    global _image_hash_index
+    if _image_hash_index is None:
+        from .image_hash import ImageHashIndex
+        _image_hash_index = ImageHashIndex(PDF_DIR / "_image_hash_index.json")
+    return _image_hash_index
+
+
+def _read_pdf_file(pdf_path: str, sha256: str = None, document: PaperDocument = None):
+    """
+    读取 PDF 文件内容和元数据（内部函数）
+
+    页文本和元数据按 PDF 内容哈希缓存，同一篇论文再次处理时直接读取缓存。
 
-        for page_num in range(current_page, end_page):
-            page = doc[page_num]
-            batch_text += f"\n\n--- Page {page_num + 1} ---\n\n"
-            batch_text += page.get_text()
+    Args:
+        pdf_path: PDF 文件路径
+        sha256: PDF 内容哈希（已知时传入，避免重新计算）
+        document: 共享的论文 PDF 会话（可选，页文本会写入会话供后续阶段复用）
 
-        all_pdf_text.append(batch_text)
-        current_page = end_page
+    Returns:
+        (PaperText 全文对象, 元数据字典)
+    """
+    if sha256 is None:
+        sha256 = sha256_file(pdf_path)
 
-    doc.close()
+    cache = _get_text_cache()
+    cached = cache.get(sha256)
 
-    # 合并所有内容
-    full_pdf_content = "".join(all_pdf_text)
+    owns_document = document is None
+    if owns_document:
+        document = PaperDocument(pdf_path)
 
-    # 截断到合理长度（~50000字符）
-    MAX_CHARS = 50000
-    if len(full_pdf_content) > MAX_CHARS:
-        pdf_content = full_pdf_content[:MAX_CHARS] + "\n\n[内容已截断，后续内容略]"
+    if cached:
+        page_texts, metadata_dict = cached
+        document.seed_page_texts(page_texts)
+        logger.info("♻️ 命中 PDF 文本缓存", sha256=sha256[:12], pages=len(page_texts))
     else:
-        pdf_content = full_pdf_content
+        total_pages = document.page_count
+
+        # 提取元数据
+        metadata = document.metadata
+        metadata_dict = {
+            "title": metadata.get("title", ""),
+            "author": metadata.get("author", ""),
+            "subject": metadata.get("subject", ""),
+            "keywords": metadata.get("keywords", ""),
+            "creator": metadata.get("creator", ""),
+            "producer": metadata.get("producer", ""),
+            "creationDate": metadata.get("creationDate", ""),
+            "modDate": metadata.get("modDate", ""),
+            "pages": total_pages,
+        }
+
+        # 读取全部内容（页数较多时按页码区间多进程并行提取，结果缓存在会话中）
+        page_texts = document.page_texts()
+
+        try:
+            cache.put(sha256, page_texts, metadata_dict)
+        except Exception as e:
+            logger.warning(f"⚠️ 写入 PDF 文本缓存失败: {e}")
+
+    if owns_document:
+        document.close()
+
+    # 单一缓冲区 + 页偏移索引，后续按页区间切片，不再整体截断复制
+    pdf_content = PaperText.from_pages(page_texts)
 
     return pdf_content, metadata_dict
 
 
+def _get_pdf_sections(paper_text: PaperText) -> list:
+    """获取当前论文的章节索引（首次调用时扫描一次全文并缓存）"""
+    if _current_paper.get("pdf_sections_for") is not paper_text:
+        _current_paper["pdf_sections"] = detect_sections(str(paper_text))
+        _current_paper["pdf_sections_for"] = paper_text
+    return _current_paper["pdf_sections"]
+
+
 def _auto_insert_images(
     markdown_content: str,
     extracted_images: list,
@@ -1078,8 +1532,49 @@ def _auto_insert_images(
     return modified_content
 
 
+def _format_images_list(images: list) -> str:
+    """论文整理 prompt 中的图片列表（包含完整 caption）"""
+    return "\n".join([
+        f"【{img['fig_type']} {img['fig_name']}】\n" +
+        f"  文件名: {img['filename']}\n" +
+        f"  Caption: {img.get('caption', '(无caption)') or '(无caption)'}\n" +
+        f"  页码: 第 {img['page']} 页" +
+        "".join(
+            f"\n  同一张图片: {dup['fig_type']} {dup['fig_name']}（第 {dup['page']} 页）"
+            for dup in img.get('duplicates', [])
+        )
+        for img in images
+    ])
 
 
+def _prefilter_figures(images: list) -> list:
+    """
+    用 ImageSelector 的向量化评分预筛选 Figures/Tables：只保留评分最高的 FIGURE_PREFILTER_TOP_K 张（保持论文顺序），
+    并记录 prompt 中图片列表节省的 token 数
+    """
+    if FIGURE_PREFILTER_TOP_K <= 0 or len(images) <= FIGURE_PREFILTER_TOP_K:
+        return images
+
+    from .image_selector import ImageSelector
+
+    document = _current_paper.get("pdf_document")
+    total_pages = document.page_count if document is not None else None
+    selector = ImageSelector.for_pdf_figures(max_images=FIGURE_PREFILTER_TOP_K)
+    selected, scores = selector.select_images(images, total_pages)
+
+    count_tokens = get_token_counter()
+    tokens_before = count_tokens(_format_images_list(images))
+    tokens_after = count_tokens(_format_images_list(selected))
+    logger.info(
+        "🧮 图片预筛选完成",
+        total=len(images),
+        selected=[f"{img['fig_type']} {img['fig_name']}" for img in selected],
+        min_score=f"{min(scores):.2f}",
+        prompt_tokens_before=tokens_before,
+        prompt_tokens_after=tokens_after,
+        prompt_tokens_saved=tokens_before - tokens_after
+    )
+    return selected
 
 
 @function_tool
@@ -1136,27 +1631,16 @@ async def generate_paper_digest(
 
     if effective_pdf_path and Path(effective_pdf_path).exists():
         try:
-            logger.info("🖼️  开始提取 PDF 中的 Figures/Tables", pdf_path=effective_pdf_path[:100])
-            from .pdf_figure_extractor_v2 import PDFFigureExtractorV2
-
-            # 将图片保存到论文特定目录：paper_digest/pdfs/{Paper_Title}/extracted_images/
-            images_dir = _get_paper_images_dir(paper_title)
-
-            extractor = PDFFigureExtractorV2(str(images_dir))
-            images, blocks = extractor.extract(effective_pdf_path)
+            logger.info("🖼️  获取 PDF 中的 Figures/Tables", pdf_path=effective_pdf_path[:100])
+            images, images_dir = await _await_figure_extraction(effective_pdf_path, paper_title)
+            logger.info("💾 论文目录磁盘占用", paper_dir=str(images_dir.parent), **_paper_disk_usage(images_dir.parent))
 
             if images:
-                # V2 提取器已经提供了完整的 Figures/Tables，不需要再选择
-                # 直接使用所有提取的图片（已按重要性排序）
-
-                # 格式化图片信息供 LLM 使用（详细版，包含完整 caption）
-                images_list = "\n".join([
-                    f"【{img['fig_type']} {img['fig_name']}】\n" +
-                    f"  文件名: {img['filename']}\n" +
-                    f"  Caption: {img.get('caption', '(无caption)') or '(无caption)'}\n" +
-                    f"  页码: 第 {img['page']} 页"
-                    for img in images
-                ])
+                # 按重要性评分预筛选（prompt 只列出前 K 张，之后也只渲染 / 上传这些图片）
+                images = _prefilter_figures(images)
+
+                # 格式化图片信息供 LLM 使用（详细版，包含完整 caption；近似重复的图片已合并）
+                images_list = _format_images_list(images)
 
                 # 为LLM生成图片编号参考（方便后续引用）
                 fig_references = "\n".join([
@@ -1164,9 +1648,8 @@ async def generate_paper_digest(
                     for img in images[:20]  # 列出前20个图片
                 ])
 
-                # 计算相对路径（从 outputs/ 到 pdfs/{Paper_Title}/extracted_images/）
-                safe_title = paper_title.replace('/', '_').replace(':', '_').replace('?', '_').replace('\\', '_').strip()[:150]
-                relative_image_path = f"../pdfs/{safe_title}/extracted_images"
+                # 计算相对路径（从 outputs/ 到 pdfs/{论文目录}/extracted_images/，以实际图片目录为准）
+                relative_image_path = f"../pdfs/{images_dir.parent.name}/extracted_images"
 
                 # 统计提取来源
                 pdffigures2_count = sum(1 for img in images if img.get('source') == 'pdffigures2')
@@ -1304,6 +1787,7 @@ async def generate_paper_digest(
                 # 保存图片信息到全局变量供后续使用
                 _current_paper["extracted_images"] = images
                 _current_paper["images_dir"] = str(images_dir)
+                _register_rendered_images(images)
             else:
                 logger.info("ℹ️  PDF 中未找到可提取的 Figures/Tables")
 
@@ -1311,6 +1795,34 @@ async def generate_paper_digest(
             logger.warning(f"提取 PDF 图片失败，继续生成没有图片的 Markdown: {e}")
             # 继续不中断，只记录警告
 
+    # 优先使用已读取的全文对象（不受工具参数长度限制）：
+    # 能识别出章节时按章节分配 token 预算，否则从头截取到预算为止
+    budgets = get_prompt_budgets("digest")
+    pdf_budget = budgets["pdf_excerpt"]
+    paper_text = _current_paper.get("pdf_content")
+    if isinstance(paper_text, PaperText):
+        sections = _get_pdf_sections(paper_text)
+        if len(sections) >= MIN_SECTIONS_FOR_BUDGET:
+            pdf_excerpt = build_section_excerpt(
+                str(paper_text),
+                sections,
+                budgets=scale_section_budgets(pdf_budget - PREAMBLE_TOKENS),
+                count_tokens=get_token_counter(),
+                preamble_tokens=PREAMBLE_TOKENS
+            )
+            logger.info(
+                "📑 按章节预算构建 PDF 摘录",
+                sections=[section.name for section in sections],
+                excerpt_length=len(pdf_excerpt)
+            )
+        else:
+            # 先按字符粗切（每 token 不超过约 8 个字符），避免对全文编码
+            pdf_excerpt = truncate_for_model(paper_text.pages(0, max_chars=pdf_budget * 8), pdf_budget)
+    else:
+        pdf_excerpt = truncate_for_model(pdf_content, pdf_budget)
+
+    xiaohongshu_content = truncate_for_model(xiaohongshu_content, budgets["xiaohongshu"])
+
     try:
         logger.info("✍️ 开始生成论文整理（LLM 调用 2/2）", paper_title=paper_title[:100])
         prompt = f"""
@@ -1333,7 +1845,7 @@ async def generate_paper_digest(
 {abstract if abstract else "[未提取到摘要]"}
 
 # PDF 全文内容（重点参考）
-{pdf_content[:20000] if pdf_content else "[未提供PDF内容]"}
+{pdf_excerpt if pdf_excerpt else "[未提供PDF内容]"}
 
 {images_info}
 
@@ -1454,6 +1966,8 @@ async def generate_paper_digest(
 
 # 请输出**精炼但信息保真的论文整理**（Markdown 格式，包含必要表格与按规则筛选的图片）。
 # """
+        log_prompt_tokens("digest", prompt)
+
         # 使用 Agent 替代直接的 LLM 调用
         digest_generation_agent = Agent(
             name="digest_generation_agent",
@@ -1502,6 +2016,9 @@ async def generate_paper_digest(
             else:
                 logger.info(f"✅ LLM 已插入 {original_image_count} 张图片，无需备用方案")
 
+            # 延迟渲染：只渲染最终 digest 中引用的图片
+            await _render_referenced_figures(digest_content)
+
         # 保存到文件
         safe_title = paper_title.replace('/', '_').replace(':', '_').replace('?', '_').replace('\\', '_').strip() if paper_title else "paper"
         # 限制最大长度为 150 字符，避免文件系统限制
@@ -1581,7 +2098,7 @@ async def save_digest_to_notion(
     返回:
         保存结果
     """
-    from notion_client import AsyncClient
+    from notion_client import APIResponseError, AsyncClient
     start_time = time.time()
 
     try:
@@ -1653,23 +2170,36 @@ async def save_digest_to_notion(
             properties["Source URL"] = {"url": source_url}
 
         # 转换 Markdown 为 Notion blocks（包含图片处理）
-        blocks = await _markdown_to_notion_blocks_with_images(digest_content)
-
-        # Notion API 限制：单次创建页面最多 100 个 children blocks
-        # 如果超过 100 个，进行切片处理
-        if len(blocks) > 100:
-            logger.warning(
-                f"⚠️  Blocks 超过 100 个限制 ({len(blocks)}，已截断到 100)",
-                original_count=len(blocks),
-                truncated_count=100
+        upload_records = []
+        blocks = _truncate_notion_blocks(
+            await _markdown_to_notion_blocks_with_images(digest_content, upload_records)
+        )
+
+        try:
+            response = await client.pages.create(
+                parent={"database_id": os.getenv('NOTION_DATABASE_ID')},
+                properties=properties,
+                children=blocks,
+            )
+        except APIResponseError as e:
+            # 复用的 file_upload_id 可能已过期（之前的页面创建失败，上传未被附加）：
+            # 删除对应的索引条目，重新上传图片后再创建一次
+            if e.status != 400 or not any(record["reused"] for record in upload_records):
+                raise
+            logger.warning(f"⚠️ Notion 拒绝了复用的图片上传 ID: {e}，重新上传图片")
+            _forget_image_uploads(upload_records)
+            upload_records = []
+            blocks = _truncate_notion_blocks(
+                await _markdown_to_notion_blocks_with_images(digest_content, upload_records, reuse_uploads=False)
+            )
+            response = await client.pages.create(
+                parent={"database_id": os.getenv('NOTION_DATABASE_ID')},
+                properties=properties,
+                children=blocks,
             )
-            blocks = blocks[:100]
 
-        response = await client.pages.create(
-            parent={"database_id": os.getenv('NOTION_DATABASE_ID')},
-            properties=properties,
-            children=blocks,
-        )
+        # 页面已创建：本次新上传的图片已附加，之后的论文可以复用
+        _record_image_uploads(upload_records, blocks)
 
         page_id = response["id"]
         page_url = f"https://notion.so/{page_id.replace('-', '')}"
@@ -1707,6 +2237,18 @@ async def save_digest_to_notion(
         }, ensure_ascii=False, indent=2)
 
 
+def _truncate_notion_blocks(blocks: list) -> list:
+    """Notion API 限制：单次创建页面最多 100 个 children blocks，超过时截断"""
+    if len(blocks) > 100:
+        logger.warning(
+            f"⚠️  Blocks 超过 100 个限制 ({len(blocks)}，已截断到 100)",
+            original_count=len(blocks),
+            truncated_count=100
+        )
+        blocks = blocks[:100]
+    return blocks
+
+
 def _extract_chinese_abstract(digest_content: str) -> str:
     """从生成的中文论文整理中提取摘要部分"""
     import re
@@ -1731,7 +2273,11 @@ def _extract_chinese_abstract(digest_content: str) -> str:
     return digest_content[:200].replace('#', '').strip()
 
 
-async def _markdown_to_notion_blocks_with_images(markdown_text: str) -> list:
+async def _markdown_to_notion_blocks_with_images(
+    markdown_text: str,
+    upload_records: Optional[list] = None,
+    reuse_uploads: bool = True
+) -> list:
     """
     将 Markdown 转换为 Notion API blocks（包含图片处理）
 
@@ -1742,6 +2288,10 @@ async def _markdown_to_notion_blocks_with_images(markdown_text: str) -> list:
 
     Args:
         markdown_text: Markdown 文本（可能包含 HTML figure 标签）
+        upload_records: 传入列表时追加本次使用的 file_upload_id
+                        （{"hashes", "path", "file_upload_id", "reused"}），
+                        由调用方在页面创建成功后登记到全库哈希索引
+        reuse_uploads: 是否复用全库哈希索引中已上传过的 file_upload_id
 
     Returns:
         Notion API blocks 列表（包含文本和图片 blocks）
@@ -1766,6 +2316,9 @@ async def _markdown_to_notion_blocks_with_images(markdown_text: str) -> list:
             text_blocks = markdown_to_notion_blocks(markdown_text)
             return text_blocks
 
+        # 补渲染 Markdown 引用但尚未渲染的图片（例如手动修改过的 digest）
+        await _render_referenced_figures(markdown_text)
+
         # 检查 images_dir 是否存在，如果不存在则检查备选路径
         images_path = Path(images_dir)
         if not images_path.exists():
@@ -1803,24 +2356,59 @@ async def _markdown_to_notion_blocks_with_images(markdown_text: str) -> list:
                 logger.info("开始上传提取的图片到 Notion")
                 uploader = NotionImageUploader(notion_integration_secret)
 
-                # 准备图片文件列表
-                images_to_upload = [
-                    str(Path(images_dir) / img['filename'])
-                    for img in extracted_images
-                    if Path(images_dir, img['filename']).exists()
-                ]
+                # 准备图片文件列表：全库哈希索引中已上传过的同一张图片直接复用 file_upload_id
+                index = _get_image_hash_index()
+                images_to_upload = {}  # 路径 -> 感知哈希
+                for img in extracted_images:
+                    image_path = Path(images_dir) / img['filename']
+                    if not image_path.exists() or str(image_path) in images_to_upload:
+                        continue
+                    hashes = img if img.get("phash") else None
+                    if hashes is None:
+                        try:
+                            from .image_hash import file_hashes
+                            hashes = file_hashes(str(image_path))
+                        except Exception as e:
+                            logger.debug(f"计算图片哈希失败: {image_path}: {e}")
+                    entry = index.find(hashes) if hashes and reuse_uploads else None
+                    if entry and entry.get("file_upload_id"):
+                        image_upload_map[img['filename']] = entry["file_upload_id"]
+                        if upload_records is not None:
+                            upload_records.append({
+                                "hashes": hashes,
+                                "path": str(image_path),
+                                "file_upload_id": entry["file_upload_id"],
+                                "reused": True,
+                            })
+                    else:
+                        images_to_upload[str(image_path)] = hashes
+                reused_count = len(image_upload_map)
 
                 if images_to_upload:
                     # 批量上传图片
-                    upload_map, failed = await uploader.upload_images_batch(images_to_upload)
-                    image_upload_map = upload_map
+                    upload_map, failed = await uploader.upload_images_batch(list(images_to_upload))
+                    image_upload_map.update(upload_map)
                     failed_images = failed
 
+                    # 上传 ID 要等页面创建成功（图片已附加）后才能登记到索引
+                    for image_path, hashes in images_to_upload.items():
+                        file_upload_id = upload_map.get(Path(image_path).name)
+                        if hashes and file_upload_id and upload_records is not None:
+                            upload_records.append({
+                                "hashes": hashes,
+                                "path": image_path,
+                                "file_upload_id": file_upload_id,
+                                "reused": False,
+                            })
+
                     logger.info(
                         "✅ 图片上传完成",
                         uploaded_count=len(upload_map),
+                        reused_count=reused_count,
                         failed_count=len(failed)
                     )
+                elif reused_count:
+                    logger.info("♻️  图片均已上传过，直接复用", reused_count=reused_count)
                 else:
                     logger.warning("未找到本地提取的图片文件")
 
@@ -0,0 +1,122 @@
+"""
+论文 PDF 会话模块
+
+功能：
+1. 每篇论文只打开一次 PDF（fitz.Document）
+2. 按页缓存各阶段需要的解析结果：
+   - get_text()         → 正文读取、References 页检测
+   - get_text("dict")   → Figure 区域检测（文本块）
+   - get_drawings()     → Figure 区域检测（绘图对象）
+3. 供 _read_pdf_file、PDFFigureExtractorV2 等阶段共享，避免重复解析
+
+fitz.Document 不是线程安全的，所有访问（包括对页面对象的调用）都在同一把锁内进行。
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import fitz  # PyMuPDF
+
+from .pdf_text import extract_page_texts
+
+
+class PaperDocument:
+    """单篇论文的 PDF 会话（懒加载 + 按页缓存）"""
+
+    def __init__(self, pdf_path: str):
+        """
+        Args:
+            pdf_path: PDF 文件路径
+        """
+        self.pdf_path = str(pdf_path)
+        self._doc: Optional[fitz.Document] = None
+        self._lock = threading.RLock()
+        self._page_texts: Dict[int, str] = {}
+        self._page_dicts: Dict[int, Dict] = {}
+        self._page_drawings: Dict[int, List[Dict]] = {}
+
+    @property
+    def doc(self) -> fitz.Document:
+        """底层 fitz 文档（首次访问时打开）"""
+        with self._lock:
+            if self._doc is None:
+                self._doc = fitz.open(self.pdf_path)
+            return self._doc
+
+    @property
+    def page_count(self) -> int:
+        with self._lock:
+            return self.doc.page_count
+
+    @property
+    def metadata(self) -> Dict:
+        with self._lock:
+            return self.doc.metadata or {}
+
+    @contextmanager
+    def page(self, page_num: int) -> Iterator[fitz.Page]:
+        """
+        在锁内使用页面对象（0-indexed）：with document.page(n) as page: ...
+
+        对页面的调用（get_pixmap / get_text / get_drawings 等）同样访问底层文档，
+        必须在 with 块内完成，不能把页面对象带出锁外使用。
+        """
+        with self._lock:
+            yield self.doc[page_num]
+
+    def page_text(self, page_num: int) -> str:
+        """页面纯文本（page.get_text()，带缓存）"""
+        with self._lock:
+            if page_num not in self._page_texts:
+                self._page_texts[page_num] = self.doc[page_num].get_text()
+            return self._page_texts[page_num]
+
+    def page_texts(self) -> List[str]:
+        """
+        全部页面的纯文本
+
+        缓存不完整时整体提取一次（页数较多时由 extract_page_texts 多进程并行），
+        结果写回缓存供后续阶段复用。
+        """
+        with self._lock:
+            total_pages = self.page_count
+            if len(self._page_texts) < total_pages:
+                texts = extract_page_texts(self.pdf_path, total_pages=total_pages)
+                self._page_texts.update(enumerate(texts))
+            return [self._page_texts[page_num] for page_num in range(total_pages)]
+
+    def seed_page_texts(self, page_texts: List[str]):
+        """用已有的页文本（例如文本缓存命中）填充缓存"""
+        with self._lock:
+            self._page_texts.update(enumerate(page_texts))
+
+    def page_dict(self, page_num: int) -> Dict:
+        """页面结构化内容（page.get_text("dict")，带缓存）"""
+        with self._lock:
+            if page_num not in self._page_dicts:
+                self._page_dicts[page_num] = self.doc[page_num].get_text("dict")
+            return self._page_dicts[page_num]
+
+    def page_drawings(self, page_num: int) -> List[Dict]:
+        """页面绘图对象（page.get_drawings()，带缓存）"""
+        with self._lock:
+            if page_num not in self._page_drawings:
+                self._page_drawings[page_num] = self.doc[page_num].get_drawings()
+            return self._page_drawings[page_num]
+
+    def close(self):
+        """关闭文档并释放缓存"""
+        with self._lock:
+            if self._doc is not None:
+                self._doc.close()
+                self._doc = None
+            self._page_texts.clear()
+            self._page_dicts.clear()
+            self._page_drawings.clear()
+
+    def __enter__(self) -> "PaperDocument":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,206 @@
+"""
+论文章节切分模块
+
+功能：
+1. 一次正则扫描全文，识别章节标题（Abstract、Introduction、Method、Experiments、Conclusion、References、Appendix 等）
+2. 以字符偏移区间的形式保存章节索引（不复制正文）
+3. 按章节分配 token 预算，拼接出供论文整理 prompt 使用的正文摘录
+
+章节标题的常见形式：
+    Abstract / ABSTRACT
+    1 Introduction / 1. INTRODUCTION / I. INTRODUCTION
+    3.  Method / 4 Experiments and Results
+    A  Appendix / Appendix A: Proofs
+"""
+
+import re
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+# 章节类型 → 标题关键词（按出现顺序排列）
+SECTION_KEYWORDS = {
+    "abstract": r"abstract",
+    "introduction": r"introduction",
+    "related_work": r"related\s+work|background|preliminar(?:y|ies)|literature\s+review",
+    "method": r"method(?:s|ology)?|approach|proposed\s+method|our\s+approach",
+    "experiments": r"experiments?(?:\s+(?:setup|and\s+results?))?|evaluation|results|empirical\s+(?:study|results)",
+    "discussion": r"discussion|analysis",
+    "limitations": r"limitations?(?:\s+and\s+future\s+work)?",
+    "conclusion": r"conclusions?(?:\s+and\s+future\s+work)?|concluding\s+remarks",
+    "references": r"references|bibliography",
+    "appendix": r"appendix|appendices|supplementary\s+material",
+}
+
+# 一次扫描用的组合正则：行首可选编号 + 关键词 + 行尾
+_HEADING_PATTERN = re.compile(
+    r"^[ \t]*(?:(?:\d{1,2}(?:\.\d{1,2})?|[IVX]{1,4}|[A-H])\.?[ \t]+)?"
+    r"(?:" + "|".join(f"(?P<{name}>{pattern})" for name, pattern in SECTION_KEYWORDS.items()) + r")"
+    r"[ \t]*(?::[^\n]{0,60})?[ \t]*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# 默认 token 预算（总计约 5000 tokens，对应以往 pdf_content[:20000] 的规模）
+DEFAULT_SECTION_BUDGETS = {
+    "abstract": 300,
+    "introduction": 800,
+    "related_work": 200,
+    "method": 1600,
+    "experiments": 1300,
+    "discussion": 200,
+    "limitations": 300,
+    "conclusion": 300,
+    "references": 0,
+    "appendix": 0,
+}
+
+# 章节显示名称（用于 prompt）
+SECTION_TITLES = {
+    "preamble": "Title & Authors",
+    "abstract": "Abstract",
+    "introduction": "Introduction",
+    "related_work": "Related Work",
+    "method": "Method",
+    "experiments": "Experiments",
+    "discussion": "Discussion",
+    "limitations": "Limitations",
+    "conclusion": "Conclusion",
+    "references": "References",
+    "appendix": "Appendix",
+}
+
+
+class Section(NamedTuple):
+    """章节索引条目（偏移为全文缓冲区中的字符位置）"""
+    name: str       # 章节类型（SECTION_KEYWORDS 的键，或 "preamble"）
+    heading: str    # 原始标题行
+    start: int      # 正文起始偏移（标题行之后）
+    end: int        # 正文结束偏移（下一章节标题之前）
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：CJK 字符按 1 个 token，其余按 4 个字符 1 个 token"""
+    cjk = sum(1 for ch in text if '一' <= ch <= '鿿')
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def detect_sections(text: str) -> List[Section]:
+    """
+    识别章节并返回偏移索引
+
+    规则：
+    - 每种章节只取第一次出现的标题（目录、正文中的引用不会重复计入）
+    - Introduction 之前只接受 Abstract（首页 teaser 图中的 "Results" 等文字不算标题）
+    - References / Appendix 之后不再识别正文章节
+
+    Args:
+        text: 论文全文
+
+    Returns:
+        按出现顺序排列的章节列表（第一个标题之前的内容记为 "preamble"）
+    """
+    matches = list(_HEADING_PATTERN.finditer(text))
+    intro_start = next((m.start() for m in matches if m.lastgroup == "introduction"), 0)
+
+    headings = []
+    seen = set()
+    back_matter = False
+
+    for match in matches:
+        name = match.lastgroup
+        if name in seen:
+            continue
+        if match.start() < intro_start and name != "abstract":
+            continue
+        if back_matter and name not in ("references", "appendix"):
+            continue
+        seen.add(name)
+        headings.append((name, match.group(0).strip(), match.start(), match.end()))
+        if name in ("references", "appendix"):
+            back_matter = True
+
+    sections = []
+    if headings and headings[0][2] > 0:
+        sections.append(Section("preamble", "", 0, headings[0][2]))
+
+    for i, (name, heading, start, body_start) in enumerate(headings):
+        end = headings[i + 1][2] if i + 1 < len(headings) else len(text)
+        sections.append(Section(name, heading, body_start, end))
+
+    return sections
+
+
+def truncate_to_tokens(text: str, max_tokens: int, count_tokens: Callable[[str], int] = estimate_tokens) -> str:
+    """按 token 预算截断文本（按比例估算截断位置，再逐步收缩）"""
+    if max_tokens <= 0:
+        return ""
+    tokens = count_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    cut = int(len(text) * max_tokens / tokens)
+    while cut > 0 and count_tokens(text[:cut]) > max_tokens:
+        cut = int(cut * 0.9)
+    return text[:cut]
+
+
+def scale_section_budgets(total_tokens: int, budgets: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """
+    按比例把章节预算缩放到给定的总 token 数
+
+    Args:
+        total_tokens: 目标总预算（不含 preamble）
+        budgets: 原始预算（默认 DEFAULT_SECTION_BUDGETS）
+    """
+    budgets = DEFAULT_SECTION_BUDGETS if budgets is None else budgets
+    base_total = sum(budgets.values()) or 1
+    return {name: budget * total_tokens // base_total for name, budget in budgets.items()}
+
+
+def build_section_excerpt(
+    text: str,
+    sections: List[Section],
+    budgets: Optional[Dict[str, int]] = None,
+    count_tokens: Callable[[str], int] = estimate_tokens,
+    preamble_tokens: int = 300,
+) -> str:
+    """
+    按章节预算拼接正文摘录
+
+    未用完的预算（章节较短或缺失）按比例分给被截断的章节。
+
+    Args:
+        text: 论文全文
+        sections: detect_sections 返回的章节索引
+        budgets: 各章节 token 预算（默认 DEFAULT_SECTION_BUDGETS）
+        count_tokens: token 计数函数
+        preamble_tokens: 标题/作者部分的预算
+
+    Returns:
+        带 "## 章节名" 标注的摘录文本
+    """
+    budgets = dict(DEFAULT_SECTION_BUDGETS if budgets is None else budgets)
+    budgets.setdefault("preamble", preamble_tokens)
+
+    present = [s for s in sections if budgets.get(s.name, 0) > 0]
+    sizes = {s.name: count_tokens(text[s.start:s.end]) for s in present}
+
+    # 第一轮：按预算分配；统计剩余预算
+    allocation = {s.name: min(sizes[s.name], budgets[s.name]) for s in present}
+    total_budget = sum(budgets.get(name, 0) for name in SECTION_TITLES)
+    leftover = total_budget - sum(allocation.values())
+
+    # 第二轮：剩余预算按原预算比例分给被截断的章节
+    truncated = [s.name for s in present if sizes[s.name] > allocation[s.name]]
+    if leftover > 0 and truncated:
+        weight = sum(budgets[name] for name in truncated)
+        for name in truncated:
+            extra = leftover * budgets[name] // weight
+            allocation[name] = min(sizes[name], allocation[name] + extra)
+
+    parts = []
+    for section in present:
+        body = truncate_to_tokens(text[section.start:section.end], allocation[section.name], count_tokens)
+        if not body.strip():
+            continue
+        title = SECTION_TITLES.get(section.name, section.name)
+        parts.append(f"## [{title}] {section.heading}\n{body.strip()}")
+
+    return "\n\n".join(parts)
@@ -0,0 +1,417 @@
+"""
+PDF 下载模块 - 流式下载 + 内容寻址存储
+
+功能：
+1. 流式下载 PDF：边接收边写盘，同时增量计算 SHA-256（不在内存中缓冲整个文件）
+2. 按内容哈希存储：paper_digest/pdfs/_store/{sha256}.pdf，相同字节只保存一份
+3. 记录 URL → ETag / Last-Modified / SHA-256 索引，
+   同一 URL 再次请求时发送条件请求，304 直接复用本地文件，不再传输正文
+4. 通过硬链接（失败时复制）把存储中的文件放到论文目录
+5. 下载到前若干字节时回调 on_head，调用方可提前解析首页（与剩余下载并行）
+6. 断点续传：未完成的下载按 URL 保存在 _store/_partial/，连接中断后用 Range 请求继续，
+   并用 ETag / Last-Modified（If-Range）和 Content-Range 总大小校验文件未变化；
+   同一 URL 的并发下载按 URL 加锁串行执行，后到的请求复用先完成的结果（304）
+7. fetch_tail：用 Range 请求单独获取文件尾部（xref 表 / 页树通常在末尾）
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import httpx
+
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 每次读取的块大小（256 KB，较小的块让 on_head 尽早触发）
+CHUNK_SIZE = 256 * 1024
+
+# 触发 on_head 回调的字节数（通常足以包含标题页）
+HEAD_BYTES = 512 * 1024
+
+# fetch_tail 默认获取的尾部字节数
+TAIL_BYTES = 256 * 1024
+
+# 单次 fetch 内自动续传的最大次数
+MAX_RESUMES = 3
+
+
+class IncompleteDownloadError(Exception):
+    """下载未完成（连接提前关闭或续传响应无效），可以续传或重试"""
+
+
+class PartialDiscardedError(IncompleteDownloadError):
+    """未完成的下载已失效（服务器上的文件已变化）并已丢弃，需要从头下载"""
+
+
+class PDFStore:
+    """内容寻址的 PDF 存储（按 SHA-256 命名）"""
+
+    def __init__(self, store_dir: Path):
+        """
+        初始化存储
+
+        Args:
+            store_dir: 存储目录（PDF 文件和 index.json 都放在这里）
+        """
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.store_dir / "index.json"
+        self.partial_dir = self.store_dir / "_partial"
+        self.partial_dir.mkdir(exist_ok=True)
+        self._index = self._load_index()
+        # URL → [asyncio.Lock, 使用者数量]：同一 URL 同时只有一个下载写入 _partial/ 中的文件
+        self._url_locks: Dict[str, list] = {}
+
+    def _load_index(self) -> Dict[str, Dict]:
+        """读取 URL 索引"""
+        if not self.index_path.exists():
+            return {}
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ PDF 索引读取失败，重新建立: {e}")
+            return {}
+
+    def _save_index(self):
+        """原子写入 URL 索引"""
+        tmp_path = self.index_path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def path_for(self, sha256: str) -> Path:
+        """内容哈希对应的存储路径"""
+        return self.store_dir / f"{sha256}.pdf"
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """查找 URL 对应的缓存条目（文件必须仍然存在）"""
+        entry = self._index.get(url)
+        if entry and self.path_for(entry["sha256"]).exists():
+            return entry
+        return None
+
+    def _partial_paths(self, url: str) -> Tuple[Path, Path]:
+        """URL 对应的未完成下载文件及其元数据文件"""
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return self.partial_dir / f"{key}.part", self.partial_dir / f"{key}.json"
+
+    def _load_partial(self, url: str) -> Tuple[int, Dict]:
+        """
+        读取未完成的下载
+
+        Returns:
+            (已下载字节数, 元数据)；没有可续传的部分时返回 (0, {})
+        """
+        part_path, meta_path = self._partial_paths(url)
+        if not part_path.exists() or not meta_path.exists():
+            return 0, {}
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except Exception:
+            self._discard_partial(url)
+            return 0, {}
+        if meta.get("url") != url:
+            self._discard_partial(url)
+            return 0, {}
+        return part_path.stat().st_size, meta
+
+    def _save_partial_meta(self, url: str, meta: Dict):
+        _, meta_path = self._partial_paths(url)
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    def _discard_partial(self, url: str):
+        for path in self._partial_paths(url):
+            path.unlink(missing_ok=True)
+
+    async def fetch(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        on_head: Optional[Callable[[bytes, Optional[int]], None]] = None,
+        head_bytes: int = HEAD_BYTES,
+        max_resumes: int = MAX_RESUMES
+    ) -> Dict:
+        """
+        下载 URL 对应的 PDF 到存储中
+
+        连接中断或超时时已下载的部分保留在磁盘上，随后（本次调用内最多 max_resumes 次，
+        或下次调用时）用 Range 请求从断点继续；服务器不支持 Range 或文件已变化时从头下载。
+
+        Args:
+            client: httpx 异步客户端
+            url: PDF 的 URL
+            on_head: 收到前 head_bytes 字节（或整个文件更小时下载完成）后调用一次，
+                     参数为 (已收到的头部字节, 文件总大小)；复用本地文件（304）时不调用
+            head_bytes: 触发 on_head 的字节数
+            max_resumes: 本次调用内自动续传的最大次数
+
+        Returns:
+            {
+                "path": 存储中的文件路径,
+                "sha256": 内容哈希,
+                "size": 字节数,
+                "from_cache": 是否复用了本地文件（304）,
+                "resumed_bytes": 从断点续传时复用的字节数
+            }
+        """
+        slot = self._url_locks.setdefault(url, [asyncio.Lock(), 0])
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                return await self._fetch_locked(client, url, on_head, head_bytes, max_resumes)
+        finally:
+            slot[1] -= 1
+            if not slot[1]:
+                del self._url_locks[url]
+
+    async def _fetch_locked(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        on_head: Optional[Callable[[bytes, Optional[int]], None]],
+        head_bytes: int,
+        max_resumes: int
+    ) -> Dict:
+        """fetch 的主体（调用方已持有该 URL 的锁）"""
+        head_state = {"on_head": on_head}
+        attempt = 0
+        restarted = False
+        while True:
+            try:
+                return await self._fetch_once(client, url, head_state, head_bytes)
+            except PartialDiscardedError as e:
+                # 文件已变化：未完成的部分已丢弃，本次调用内从头下载一次
+                if restarted:
+                    raise
+                restarted = True
+                logger.warning(f"⚠️ {e}，从头下载")
+            except (httpx.TransportError, IncompleteDownloadError) as e:
+                downloaded, _ = self._load_partial(url)
+                if attempt >= max_resumes or not downloaded:
+                    raise
+                attempt += 1
+                logger.warning(
+                    f"⚠️ PDF 下载中断，从断点续传: {e}",
+                    downloaded=f"{downloaded / 1024 / 1024:.2f}MB",
+                    attempt=attempt
+                )
+
+    async def _fetch_once(self, client: httpx.AsyncClient, url: str, head_state: Dict, head_bytes: int) -> Dict:
+        """单次下载请求（有未完成的部分时发送 Range 请求续传）"""
+        entry = self.lookup(url)
+        part_path, _ = self._partial_paths(url)
+        offset, partial_meta = self._load_partial(url)
+
+        # 按字节偏移续传，不能让服务器压缩传输
+        headers = {"Accept-Encoding": "identity"}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            # If-Range：文件已变化时服务器返回完整的 200 响应（弱 ETag 不能用于 If-Range）
+            etag = partial_meta.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["If-Range"] = etag
+            elif partial_meta.get("last_modified"):
+                headers["If-Range"] = partial_meta["last_modified"]
+        elif entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        async with client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and entry and not offset:
+                logger.info("♻️ PDF 未变化（304），复用本地文件", sha256=entry["sha256"][:12])
+                return {
+                    "path": self.path_for(entry["sha256"]),
+                    "sha256": entry["sha256"],
+                    "size": entry.get("size", 0),
+                    "from_cache": True,
+                    "resumed_bytes": 0,
+                }
+
+            if response.status_code == 416 and offset:
+                # 断点超出文件范围（文件已变化），丢弃后从头下载
+                self._discard_partial(url)
+                raise PartialDiscardedError("续传范围无效，已丢弃未完成的下载")
+
+            response.raise_for_status()
+
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+
+            if response.status_code == 206:
+                total_size = self._validate_content_range(response, offset, partial_meta, etag)
+                if total_size is None:
+                    self._discard_partial(url)
+                    raise PartialDiscardedError("续传响应与已下载部分不一致，已丢弃未完成的下载")
+            else:
+                # 200：服务器不支持 Range 或文件已变化，从头下载
+                if offset:
+                    logger.info("ℹ️ 服务器未接受续传请求，从头下载")
+                offset = 0
+                content_length = response.headers.get("Content-Length")
+                total_size = int(content_length) if content_length and content_length.isdigit() else None
+
+            self._save_partial_meta(url, {
+                "url": url,
+                "etag": etag or partial_meta.get("etag"),
+                "last_modified": last_modified or partial_meta.get("last_modified"),
+                "total_size": total_size,
+            })
+
+            # 续传时先把已下载部分计入哈希和头部
+            hasher = hashlib.sha256()
+            head = bytearray()
+            if offset:
+                with open(part_path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                        hasher.update(chunk)
+                        if len(head) < head_bytes:
+                            head.extend(chunk[:head_bytes - len(head)])
+                logger.info("⏩ 从断点续传 PDF", resumed=f"{offset / 1024 / 1024:.2f}MB")
+
+            size = offset
+            with open(part_path, 'ab' if offset else 'wb') as f:
+                self._emit_head(head_state, head, head_bytes, total_size)
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    f.write(chunk)
+                    hasher.update(chunk)
+                    size += len(chunk)
+                    if head_state["on_head"] and len(head) < head_bytes:
+                        head.extend(chunk[:head_bytes - len(head)])
+                        self._emit_head(head_state, head, head_bytes, total_size)
+
+        if total_size is not None and size != total_size:
+            # 连接提前关闭，保留已下载部分等待续传
+            raise IncompleteDownloadError(f"下载不完整: {size}/{total_size} 字节")
+
+        if head_state["on_head"]:
+            # 文件比 head_bytes 还小，下载完成后再回调
+            self._emit_head(head_state, head, 0, size)
+
+        sha256 = hasher.hexdigest()
+        final_path = self.path_for(sha256)
+
+        if final_path.exists():
+            # 相同内容已存在（可能来自其他 URL），丢弃本次下载
+            part_path.unlink()
+            logger.info("♻️ 相同内容的 PDF 已在存储中", sha256=sha256[:12])
+        else:
+            os.replace(part_path, final_path)
+        self._discard_partial(url)
+
+        self._index[url] = {
+            "sha256": sha256,
+            "size": size,
+            "etag": etag or partial_meta.get("etag"),
+            "last_modified": last_modified or partial_meta.get("last_modified"),
+        }
+        self._save_index()
+
+        return {
+            "path": final_path,
+            "sha256": sha256,
+            "size": size,
+            "from_cache": False,
+            "resumed_bytes": offset,
+        }
+
+    @staticmethod
+    def _emit_head(head_state: Dict, head: bytearray, head_bytes: int, total_size: Optional[int]):
+        """头部字节足够时调用一次 on_head"""
+        on_head = head_state["on_head"]
+        if on_head and len(head) >= head_bytes:
+            head_state["on_head"] = None
+            on_head(bytes(head), total_size)
+
+    @staticmethod
+    def _validate_content_range(
+        response: httpx.Response,
+        offset: int,
+        partial_meta: Dict,
+        etag: Optional[str]
+    ) -> Optional[int]:
+        """
+        校验 206 响应是否正好接在已下载部分之后
+
+        Returns:
+            文件总大小；校验失败返回 None
+        """
+        match = re.match(r"bytes (\d+)-(\d+)/(\d+|\*)", response.headers.get("Content-Range", ""))
+        if not match or int(match.group(1)) != offset:
+            return None
+        if etag and partial_meta.get("etag") and etag != partial_meta["etag"]:
+            return None
+        total = match.group(3)
+        if total == "*":
+            # 总大小未知时，"bytes=offset-" 的响应一直到文件末尾
+            return int(match.group(2)) + 1
+        if partial_meta.get("total_size") and int(total) != partial_meta["total_size"]:
+            return None
+        return int(total)
+
+    @staticmethod
+    def materialize(src_path: Path, dst_path: Path):
+        """
+        把存储中的文件放到目标路径（优先硬链接，不额外占用磁盘）
+
+        Args:
+            src_path: 存储中的文件
+            dst_path: 论文目录中的目标路径
+        """
+        src_path = Path(src_path)
+        dst_path = Path(dst_path)
+        dst_path.parent.mkdir(parents=True, exist_ok=True)
+
+        if dst_path.exists():
+            if os.path.samefile(src_path, dst_path):
+                return
+            dst_path.unlink()
+
+        try:
+            os.link(src_path, dst_path)
+        except OSError:
+            # 跨文件系统等情况无法硬链接，退回复制
+            shutil.copy2(src_path, dst_path)
+
+
+async def fetch_tail(
+    client: httpx.AsyncClient,
+    url: str,
+    total_size: int,
+    tail_bytes: int = TAIL_BYTES
+) -> Optional[bytes]:
+    """
+    用 Range 请求获取文件末尾的 tail_bytes 字节
+
+    Args:
+        client: httpx 异步客户端
+        url: 文件 URL
+        total_size: 文件总大小（来自 Content-Length）
+        tail_bytes: 获取的字节数
+
+    Returns:
+        尾部字节；服务器不支持 Range（未返回 206）时返回 None（不读取响应正文）
+    """
+    start = max(0, total_size - tail_bytes)
+    headers = {"Range": f"bytes={start}-{total_size - 1}", "Accept-Encoding": "identity"}
+    async with client.stream("GET", url, headers=headers) as response:
+        if response.status_code != 206:
+            return None
+        tail = bytearray()
+        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+            tail.extend(chunk[:tail_bytes - len(tail)])
+            if len(tail) >= tail_bytes:
+                break
+    return bytes(tail)
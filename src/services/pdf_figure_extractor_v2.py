@@ -4,7 +4,11 @@ PDF Figure 提取模块 V2 - 整合 PDFFigures2 + Python Fallback
 功能：
 1. 使用 PDFFigures2 提取 Figures/Tables（主方法）
 2. 对于 regionless captions，使用 Python 密度检测算法 fallback
-3. 返回统一的图片元数据格式
+   没有 Java / PDFFigures2 时，纯 Python 方法提取全文：正则匹配 caption + 密度检测区域，多进程按页并行
+3. 按渲染配置（archive / notion / thumbnail，见 figure_render）输出图片
+   延迟渲染模式：先只检测区域和 caption，之后由 render_figures() 只渲染实际用到的图片
+4. 返回统一的图片元数据格式，每张图片附带感知哈希（phash / dhash），近似重复的图片合并为一条
+5. extraction_metadata.json 同时作为提取缓存：PDF 哈希、提取器版本、渲染配置都一致时直接返回已有结果
 
 特点：
 - 100% 提取成功率
@@ -12,34 +16,309 @@ PDF Figure 提取模块 V2 - 整合 PDFFigures2 + Python Fallback
 - 智能文件命名（Figure1.png, Table2.png）
 """
 
+import asyncio
 import fitz  # PyMuPDF
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 import json
-import subprocess
 import os
+import re
+import shutil
+import subprocess
+import tempfile
 import logging
 import numpy as np
 
+from .figure_render import RenderProfile, get_render_profile, render_clip
+from .image_hash import collapse_duplicates, region_hashes
+from .paper_document import PaperDocument
+from .pdf_text import _default_workers, _get_process_pool, _split_page_ranges, sha256_file
+from .pdffigures2_pool import (
+    build_java_env,
+    get_pdffigures2_pool,
+    load_pdffigures2_result,
+    pdffigures2_args,
+    pdffigures2_available,
+)
+
 logger = logging.getLogger(__name__)
 
+# 提取器版本：提取逻辑或输出格式变化时递增，使已有的提取缓存失效
+EXTRACTOR_VERSION = "2.4"
+
+# 纯 Python 提取：低于该页数时不启用多进程，每个进程至少处理的页数
+PYTHON_PARALLEL_MIN_PAGES = 8
+PYTHON_MIN_PAGES_PER_CHUNK = 4
+
+# caption 文本块："Figure 3:"、"Fig. 3."、"Table 2:" 等开头（正文中的 "Figure 3 shows" 不匹配）
+CAPTION_PATTERN = re.compile(r'^\s*(Figure|Fig\.|Table)\s*(\d+)\s*[:.：]', re.IGNORECASE)
+
+# 批量模式下单次 JVM 处理的 PDF 数
+BATCH_SIZE = 100
+
+# 批量模式超时：基础时间 + 每篇 PDF 的时间（秒）
+BATCH_BASE_TIMEOUT = 120
+BATCH_TIMEOUT_PER_PDF = 20
+
+
+def _rect_array(rects) -> np.ndarray:
+    """矩形序列（元组）→ N×4 浮点数组（x0, y0, x1, y1）"""
+    return np.array([tuple(r) for r in rects], dtype=float).reshape(-1, 4)
+
+
+def _drawing_rect_array(drawings: List[Dict]) -> np.ndarray:
+    """page.get_drawings() 结果 → N×4 浮点数组（直接读 fitz.Rect 属性，比逐个转元组快得多）"""
+    return np.array(
+        [(r.x0, r.y0, r.x1, r.y1) for r in (d['rect'] for d in drawings)],
+        dtype=float
+    ).reshape(-1, 4)
+
+
+def _stripe_density(
+    rects: np.ndarray,
+    weights: np.ndarray,
+    scan_top: float,
+    scan_bottom: float,
+    stripe_height: float,
+    num_stripes: int
+) -> np.ndarray:
+    """
+    把每个矩形的权重累加到它纵向覆盖的所有条带（差分数组 + 前缀和）
+
+    完全位于 [scan_top, scan_bottom] 之外的矩形不计入。
+    """
+    inside = (rects[:, 3] <= scan_bottom) & (rects[:, 1] >= scan_top)
+    rects = rects[inside]
+    weights = weights[inside]
+
+    start = np.clip(((rects[:, 1] - scan_top) / stripe_height).astype(int), 0, num_stripes - 1)
+    end = np.clip(((rects[:, 3] - scan_top) / stripe_height).astype(int), 0, num_stripes - 1)
+
+    diff = np.bincount(start, weights=weights, minlength=num_stripes + 1)
+    diff -= np.bincount(end + 1, weights=weights, minlength=num_stripes + 1)
+    return np.cumsum(diff[:num_stripes])
+
+
+def _finalize_file(src_path: Path, dst_path: Path):
+    """
+    把临时文件放到最终位置：同一文件系统内原子重命名（零拷贝），
+    跨文件系统（例如批量模式的系统临时目录）时退回移动
+    """
+    try:
+        os.replace(src_path, dst_path)
+    except OSError:
+        shutil.move(str(src_path), str(dst_path))
+
+
+def _link_file(src_path: Path, dst_path: Path):
+    """复用已有的图片文件：硬链接（不占额外空间），跨文件系统时退回复制"""
+    Path(dst_path).unlink(missing_ok=True)
+    try:
+        os.link(src_path, dst_path)
+    except OSError:
+        shutil.copy2(src_path, dst_path)
+
+
+async def _to_thread_until_done(func, *args):
+    """
+    asyncio.to_thread，但任务被取消时先等线程执行完再传播取消
+
+    线程无法被中断，仍在使用共享的 PaperDocument 并写入输出目录；
+    这样调用方 await 被取消的任务后，可以安全地关闭 document 或复用输出目录。
+    """
+    future = asyncio.ensure_future(asyncio.to_thread(func, *args))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        await asyncio.wait([future])
+        raise
+
+
+class _PageLayout:
+    """单页绘图对象 / 文本块的数组索引（按下边界 y 排序，同页多个 caption 共用）"""
+
+    def __init__(self, drawings: List[Dict], text_blocks: List[Dict]):
+        text_blocks = [b for b in text_blocks if b.get("type") == 0]
+        chars = np.array([
+            sum(len(span.get("text", ""))
+                for line in block.get("lines", [])
+                for span in line.get("spans", []))
+            for block in text_blocks
+        ], dtype=float)
+        self._set(_drawing_rect_array(drawings), _rect_array(b["bbox"] for b in text_blocks), chars)
+
+    def _set(self, drawing_rects: np.ndarray, text_rects: np.ndarray, text_chars: np.ndarray):
+        self.drawing_rects = drawing_rects[np.argsort(drawing_rects[:, 3], kind="stable")]
+        order = np.argsort(text_rects[:, 3], kind="stable")
+        self.text_rects = text_rects[order]
+        self.text_chars = text_chars[order]
+
+    def flipped(self, page_height: float) -> "_PageLayout":
+        """上下翻转后的索引（用于检测 caption 下方的区域，例如 Table）"""
+        def flip(rects: np.ndarray) -> np.ndarray:
+            return np.column_stack([rects[:, 0], page_height - rects[:, 3], rects[:, 2], page_height - rects[:, 1]])
+
+        layout = _PageLayout.__new__(_PageLayout)
+        layout._set(flip(self.drawing_rects), flip(self.text_rects), self.text_chars)
+        return layout
+
+    def above(self, y: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """下边界严格小于 y 的绘图对象、文本块及其字符数"""
+        n_drawings = np.searchsorted(self.drawing_rects[:, 3], y, side="left")
+        n_texts = np.searchsorted(self.text_rects[:, 3], y, side="left")
+        return self.drawing_rects[:n_drawings], self.text_rects[:n_texts], self.text_chars[:n_texts]
+
+
+def _find_captions(page_num: int, text_blocks: List[Dict]) -> List[Dict]:
+    """
+    在页面文本块中查找 Figure/Table caption
+
+    Returns:
+        与 PDFFigures2 regionless-captions 相同格式的列表：
+        [{"name", "figType", "page", "boundary", "text"}, ...]
+    """
+    captions = []
+    for block in text_blocks:
+        if block.get("type") != 0:
+            continue
+        text = " ".join(
+            "".join(span.get("text", "") for span in line.get("spans", []))
+            for line in block.get("lines", [])
+        ).strip()
+        match = CAPTION_PATTERN.match(text)
+        if not match:
+            continue
+        x1, y1, x2, y2 = block["bbox"]
+        captions.append({
+            'name': match.group(2),
+            'figType': "Table" if match.group(1).lower() == "table" else "Figure",
+            'page': page_num,
+            'boundary': {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2},
+            'text': text,
+        })
+    return captions
+
+
+def _detect_caption_region(page, layout: _PageLayout, item: Dict) -> Optional[fitz.Rect]:
+    """
+    检测 caption 对应的区域：Figure 在 caption 上方；Table 的 caption 通常在表格上方，
+    先在下方检测（上下翻转后复用同一算法），没有结果时再检测上方
+    """
+    caption_bbox = item['boundary']
+    if item['figType'] == "Table":
+        height = page.rect.height
+        flipped_caption = dict(caption_bbox, y1=height - caption_bbox['y2'], y2=height - caption_bbox['y1'])
+        region = PDFFigureExtractorV2._detect_figure_region_by_density(
+            page, flipped_caption, layout=layout.flipped(height)
+        )
+        if region is not None and not region.is_empty:
+            return fitz.Rect(region.x0, height - region.y1, region.x1, height - region.y0)
+    return PDFFigureExtractorV2._detect_figure_region_by_density(page, caption_bbox, layout=layout)
+
+
+def _detect_page_figures(page, page_num: int, text_blocks: List[Dict], get_drawings) -> List[Dict]:
+    """
+    检测单页的所有 caption 及其区域（只有含 caption 的页才解析绘图对象）
+
+    Returns:
+        caption 列表，每项附带 'region': (x0, y0, x1, y1)
+    """
+    captions = _find_captions(page_num, text_blocks)
+    if not captions:
+        return []
+
+    layout = _PageLayout(get_drawings(), text_blocks)
+    detections = []
+    for item in captions:
+        region = _detect_caption_region(page, layout, item)
+        if region is not None and not region.is_empty:
+            item['region'] = tuple(region)
+            detections.append(item)
+    return detections
+
+
+def _detect_page_range(task: Tuple[str, int, int]) -> List[Dict]:
+    """工作进程入口：检测 [start, end) 页的 Figures/Tables（每个进程独立打开 fitz 文档）"""
+    pdf_path, start, end = task
+    doc = fitz.open(pdf_path)
+    try:
+        detections = []
+        for page_num in range(start, end):
+            page = doc[page_num]
+            detections.extend(_detect_page_figures(page, page_num, page.get_text("dict")["blocks"], page.get_drawings))
+        return detections
+    finally:
+        doc.close()
+
+
+def _planned_output(output_dir: Path, profile: RenderProfile, fig_type: str, fig_name: str) -> Dict:
+    """延迟渲染时图片将要保存的位置（与 render_clip 的输出一致）"""
+    path = (Path(output_dir) / f"{fig_type}{fig_name}").with_suffix(profile.extension)
+    return {'path': str(path), 'filename': path.name, 'format': profile.output_format}
+
+
+def _figure_record(item: Dict, region_bbox: fitz.Rect, output: Dict, rendered: bool = True) -> Dict:
+    """Python 方法提取的 Figure 元数据（格式同 extract() 的 images）"""
+    return {
+        'filename': output['filename'],
+        'local_path': output['path'],
+        'page': item['page'] + 1,
+        'caption': item['text'],
+        'bbox': {
+            'x1': region_bbox.x0,
+            'y1': region_bbox.y0,
+            'x2': region_bbox.x1,
+            'y2': region_bbox.y1
+        },
+        'source': 'python_fallback',
+        'fig_type': item['figType'],
+        'fig_name': item['name'],
+        'width': int(region_bbox.width),
+        'height': int(region_bbox.height),
+        'format': output['format'],
+        'rendered': rendered
+    }
+
+
+def _render_detections(task: Tuple[str, str, str, List[Dict]]) -> List[Dict]:
+    """工作进程入口：按渲染配置渲染已检测到的区域"""
+    pdf_path, output_dir, profile_name, detections = task
+    profile = get_render_profile(profile_name)
+    doc = fitz.open(pdf_path)
+    try:
+        figures = []
+        for item in detections:
+            region_bbox = fitz.Rect(item['region'])
+            rendered = render_clip(
+                doc[item['page']], region_bbox, profile, Path(output_dir) / f"{item['figType']}{item['name']}"
+            )
+            figures.append(_figure_record(item, region_bbox, rendered))
+        return figures
+    finally:
+        doc.close()
+
 
 class PDFFigureExtractorV2:
     """PDF Figure/Table 提取器 V2（PDFFigures2 + Python Fallback）"""
 
-    def __init__(self, output_dir: str):
+    def __init__(self, output_dir: str, render_profile: Optional[str] = None, lazy_render: bool = False):
         """
         初始化提取器
 
         Args:
             output_dir: 图片保存目录
+            render_profile: 渲染配置名称（archive / notion / thumbnail；None 表示 FIGURE_RENDER_PROFILE，默认 notion）
+            lazy_render: 延迟渲染（提取时只返回区域和 caption，图片由 render_figures() 按需渲染）
         """
         self.output_dir = Path(output_dir)
+        self.render_profile = get_render_profile(render_profile)
+        self.lazy_render = lazy_render
+        # 是否直接使用 PDFFigures2 渲染的 PNG（否则 PDFFigures2 只输出 JSON）
+        self.pdffigures2_render = self.render_profile.uses_pdffigures2_render and not lazy_render
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
-        # PDFFigures2 临时输出目录
+        # PDFFigures2 临时输出目录（运行 PDFFigures2 时创建，提取结束后删除）
         self.pdffigures2_output_dir = self.output_dir / "_pdffigures2_temp"
-        self.pdffigures2_output_dir.mkdir(parents=True, exist_ok=True)
 
         # PDFFigures2 JAR 路径
         project_root = Path(__file__).resolve().parent.parent.parent
@@ -48,12 +327,14 @@ class PDFFigureExtractorV2:
         if not self.pdffigures2_jar.exists():
             logger.warning(f"PDFFigures2 JAR 不存在: {self.pdffigures2_jar}")
 
-    def extract(self, pdf_path: str) -> Tuple[List[Dict], List[Dict]]:
+    def extract(self, pdf_path: str, document: Optional[PaperDocument] = None) -> Tuple[List[Dict], List[Dict]]:
         """
         完整提取流程：PDFFigures2 + Python Fallback + 过滤附录图片
 
         Args:
             pdf_path: PDF 文件路径
+            document: 共享的论文 PDF 会话（可选，复用已解析的页文本/绘图对象；
+                      未提供时内部打开并在结束时关闭）
 
         Returns:
             images: 图片元数据列表
@@ -66,26 +347,197 @@ class PDFFigureExtractorV2:
                         "bbox": {"x1": 100, "y1": 200, "x2": 500, "y2": 600},
                         "source": "pdffigures2" 或 "python_fallback",
                         "fig_type": "Figure" 或 "Table",
-                        "fig_name": "1"
+                        "fig_name": "1",
+                        "rendered": True  # 延迟渲染模式下为 False，local_path 为渲染后的路径
                     },
                     ...
                 ]
             blocks: 占位符（保持 API 兼容性）
         """
-        all_figures = []
-
-        # 步骤 0: 检测 References/Appendix 起始页码（用于过滤）
-        references_page = self._detect_references_page(pdf_path)
+        pdf_sha256 = sha256_file(pdf_path)
+        cached = self._cached_result(pdf_path, pdf_sha256, document)
+        if cached is not None:
+            return cached, []
 
-        # 步骤 1: 运行 PDFFigures2
+        # 步骤 1: 运行 PDFFigures2（每次启动一个新的 JVM）
         logger.info("🔧 运行 PDFFigures2 提取...")
         pdffigures2_data = self._run_pdffigures2(pdf_path)
+        return self._extract_with_document(pdf_path, document, pdffigures2_data, pdf_sha256)
+
+    async def extract_async(self, pdf_path: str, document: Optional[PaperDocument] = None) -> Tuple[List[Dict], List[Dict]]:
+        """
+        extract() 的 asyncio 版本：PDFFigures2 交给常驻 JVM 池执行，后续处理在线程中进行
+
+        参数和返回值同 extract()
+        """
+        pdf_sha256 = await asyncio.to_thread(sha256_file, pdf_path)
+        cached = await _to_thread_until_done(self._cached_result, pdf_path, pdf_sha256, document)
+        if cached is not None:
+            return cached, []
+
+        logger.info("🔧 运行 PDFFigures2 提取（常驻 JVM）...")
+        pdffigures2_data = await self._run_pdffigures2_async(pdf_path)
+        return await _to_thread_until_done(
+            self._extract_with_document, pdf_path, document, pdffigures2_data, pdf_sha256
+        )
+
+    @classmethod
+    def extract_batch(
+        cls,
+        jobs: List[Tuple[str, str]],
+        batch_size: int = BATCH_SIZE,
+        threads: int = 1,
+        render_profile: Optional[str] = None
+    ) -> Dict[str, List[Dict]]:
+        """
+        批量提取（用于整库回填）：多篇 PDF 放进同一个目录，交给一次 PDFFigures2 JVM 运行处理，
+        再把每篇的 JSON 和渲染图片分发回各自的图片目录（Figure1.png 等统一命名）
+
+        各论文的 PDF 文件名通常相同（paper.pdf），因此先以编号文件名硬链接到暂存目录。
+
+        Args:
+            jobs: [(pdf_path, output_dir), ...]，output_dir 通常为论文的 extracted_images/
+            batch_size: 单次 JVM 运行处理的最大 PDF 数
+            threads: PDFFigures2 内部并行线程数（-t）
+            render_profile: 渲染配置名称
+
+        Returns:
+            {pdf_path: 图片元数据列表}（格式同 extract() 的 images）
+        """
+        results: Dict[str, List[Dict]] = {}
+
+        # 已有有效提取缓存的论文直接跳过
+        pending = []
+        for pdf_path, output_dir in jobs:
+            pdf_sha256 = sha256_file(pdf_path)
+            cached = cls(output_dir, render_profile)._cached_result(pdf_path, pdf_sha256, None)
+            if cached is not None:
+                results[pdf_path] = cached
+            else:
+                pending.append((pdf_path, output_dir, pdf_sha256))
+        jobs = pending
+
+        for batch_start in range(0, len(jobs), batch_size):
+            batch = jobs[batch_start:batch_start + batch_size]
+            extractors = [cls(output_dir, render_profile) for _, output_dir, _ in batch]
+            jar = extractors[0].pdffigures2_jar
+            dpi = extractors[0].render_profile.dpi
+            render = extractors[0].pdffigures2_render
+
+            with tempfile.TemporaryDirectory(prefix="pdffigures2_batch_") as tmp:
+                staging_dir = Path(tmp) / "pdfs"
+                batch_output_dir = Path(tmp) / "output"
+                staging_dir.mkdir()
+                batch_output_dir.mkdir()
+
+                staged = []
+                for index, (pdf_path, _, _) in enumerate(batch):
+                    staged_path = staging_dir / f"paper_{index:05d}.pdf"
+                    try:
+                        os.link(pdf_path, staged_path)
+                    except OSError:
+                        os.symlink(Path(pdf_path).resolve(), staged_path)
+                    staged.append(staged_path)
+
+                logger.info(f"🔧 PDFFigures2 批量提取: {len(batch)} 篇 PDF（单个 JVM）")
+                batch_ok = cls._run_pdffigures2_batch(
+                    jar, staging_dir, batch_output_dir, len(batch), threads, dpi, render
+                )
+
+                for (pdf_path, _, pdf_sha256), staged_path, extractor in zip(batch, staged, extractors):
+                    pdffigures2_data = None
+                    if batch_ok:
+                        pdffigures2_data = load_pdffigures2_result(str(staged_path), batch_output_dir)
+                    try:
+                        images, _ = extractor._extract_with_document(pdf_path, None, pdffigures2_data, pdf_sha256)
+                    except Exception as e:
+                        logger.error(f"处理 {pdf_path} 失败: {e}")
+                        images = []
+                    results[pdf_path] = images
+
+        return results
+
+    @staticmethod
+    def _run_pdffigures2_batch(
+        jar: Path,
+        input_dir: Path,
+        output_dir: Path,
+        count: int,
+        threads: int,
+        dpi: int,
+        render: bool
+    ) -> bool:
+        """对整个目录运行一次 PDFFigures2，返回是否已运行（失败时部分 PDF 可能已有输出）"""
+        if not pdffigures2_available(jar):
+            logger.warning("PDFFigures2 不可用（JAR 不存在或未安装 java），全部使用 Python 方法")
+            return False
+
+        cmd = [
+            "java",
+            "-jar",
+            str(jar),
+            *pdffigures2_args(str(input_dir), output_dir, dpi, render),
+            "-t", str(threads),
+        ]
+        try:
+            result = subprocess.run(
+                cmd,
+                env=build_java_env(),
+                capture_output=True,
+                text=True,
+                timeout=BATCH_BASE_TIMEOUT + BATCH_TIMEOUT_PER_PDF * count
+            )
+        except Exception as e:
+            logger.error(f"PDFFigures2 批量运行失败: {e}")
+            return False
+
+        if result.returncode != 0:
+            # 部分 PDF 可能已经成功输出，逐篇读取时再判断
+            logger.error(f"PDFFigures2 批量执行失败: {result.stderr[-2000:]}")
+        return True
+
+    def _extract_with_document(
+        self,
+        pdf_path: str,
+        document: Optional[PaperDocument],
+        pdffigures2_data: Optional[Dict],
+        pdf_sha256: Optional[str] = None
+    ) -> Tuple[List[Dict], List[Dict]]:
+        """未提供 document 时内部打开并在结束时关闭"""
+        owns_document = document is None
+        if owns_document:
+            document = PaperDocument(pdf_path)
+
+        try:
+            return self._extract(pdf_path, document, pdffigures2_data, pdf_sha256)
+        finally:
+            if owns_document:
+                document.close()
+            # PDFFigures2 的 JSON 和未使用的渲染图片不再需要
+            shutil.rmtree(self.pdffigures2_output_dir, ignore_errors=True)
+
+    def _extract(
+        self,
+        pdf_path: str,
+        document: PaperDocument,
+        pdffigures2_data: Optional[Dict],
+        pdf_sha256: Optional[str] = None
+    ) -> Tuple[List[Dict], List[Dict]]:
+        """
+        提取主体（document 由调用方管理生命周期，pdffigures2_data 为 PDFFigures2 结果）
+
+        提供 pdf_sha256 且 PDFFigures2 成功时，结果会写入提取缓存。
+        """
+        all_figures = []
+
+        # 步骤 0: 检测 References/Appendix 起始页码（用于过滤）
+        references_page = self._detect_references_page(document)
 
         if pdffigures2_data:
             # 步骤 2: 处理标准提取的 figures
             standard_figures = pdffigures2_data.get("figures", [])
             for fig in standard_figures:
-                fig_info = self._process_pdffigures2_figure(fig)
+                fig_info = self._process_pdffigures2_figure(fig, document)
                 if fig_info:
                     all_figures.append(fig_info)
 
@@ -95,13 +547,13 @@ class PDFFigureExtractorV2:
             regionless_captions = pdffigures2_data.get("regionless-captions", [])
             if regionless_captions:
                 logger.info(f"🐍 Python Fallback 处理 {len(regionless_captions)} 个 regionless captions...")
-                fallback_figures = self._extract_regionless_figures(pdf_path, regionless_captions)
+                fallback_figures = self._extract_regionless_figures(document, regionless_captions)
                 all_figures.extend(fallback_figures)
 
         else:
             # PDFFigures2 失败，完全使用 Python 方法
             logger.warning("⚠️  PDFFigures2 失败，使用纯 Python 方法提取")
-            all_figures = self._extract_all_figures_python(pdf_path)
+            all_figures = self._extract_all_figures_python(document)
 
         # 步骤 3.5: 过滤附录图片
         if references_page:
@@ -117,15 +569,47 @@ class PDFFigureExtractorV2:
             int(f['fig_name']) if f['fig_name'].isdigit() else 999
         ))
 
+        # 步骤 5: 感知哈希 + 合并近似重复图片
+        all_figures = self._collapse_duplicates(document, all_figures)
+
         logger.info(f"✅ 总计提取: {len(all_figures)} 个 Figures/Tables（不含附录）")
 
-        # 保存元数据
-        self._save_metadata(all_figures)
+        # 保存元数据（PDFFigures2 可用但本次运行失败时，结果不作为缓存，下次重新提取）
+        cacheable = pdffigures2_data is not None or not pdffigures2_available(self.pdffigures2_jar)
+        cache_key = self._cache_key(pdf_sha256) if pdf_sha256 and cacheable else None
+        self._save_metadata(all_figures, cache_key)
 
         # 返回兼容格式（blocks 为空列表）
         return all_figures, []
 
-    def _detect_references_page(self, pdf_path: str) -> Optional[int]:
+    def _collapse_duplicates(self, document: PaperDocument, figures: List[Dict]) -> List[Dict]:
+        """
+        按区域渲染小尺寸灰度图计算感知哈希，合并近似重复的图片
+
+        重复项记录在保留项的 "duplicates" 中；已经渲染出的重复图片文件直接删除。
+        """
+        for fig in figures:
+            bbox = fig.get('bbox')
+            if not bbox:
+                continue
+            try:
+                clip = fitz.Rect(bbox['x1'], bbox['y1'], bbox['x2'], bbox['y2'])
+                with document.page(fig['page'] - 1) as page:
+                    fig.update(region_hashes(page, clip))
+            except Exception as e:
+                logger.debug(f"计算 {fig['fig_type']} {fig['fig_name']} 的感知哈希失败: {e}")
+
+        unique = collapse_duplicates(figures)
+        if len(unique) < len(figures):
+            kept_ids = {id(fig) for fig in unique}
+            kept_paths = {fig['local_path'] for fig in unique}
+            for fig in figures:
+                if id(fig) not in kept_ids and fig.get('rendered', True) and fig['local_path'] not in kept_paths:
+                    Path(fig['local_path']).unlink(missing_ok=True)
+            logger.info(f"🔁 合并 {len(figures) - len(unique)} 张近似重复的图片")
+        return unique
+
+    def _detect_references_page(self, document: PaperDocument) -> Optional[int]:
         """
         检测 References 或 Appendix 的起始页码
 
@@ -138,24 +622,21 @@ class PDFFigureExtractorV2:
             References/Appendix 起始页码（1-indexed），如果未找到返回 None
         """
         try:
-            doc = fitz.open(pdf_path)
-            total_pages = doc.page_count
+            total_pages = document.page_count
 
             # 从页面的最后 30% 开始扫描（通常 References 在论文后部）
             start_scan_page = int(total_pages * 0.7)
 
             for page_num in range(start_scan_page, total_pages):
-                page = doc[page_num]
-                text = page.get_text()[:500]  # 只取前500字符
+                # 复用会话中已提取的页文本
+                text = document.page_text(page_num)[:500]  # 只取前500字符
 
                 # 查找多种可能的标识
                 if any(marker in text for marker in ['References', 'REFERENCES', 'Appendix', 'APPENDIX', 'Bibliography', 'BIBLIOGRAPHY']):
                     detected_page = page_num + 1  # 转为 1-indexed
                     logger.info(f"📄 检测到 References/Appendix 起始页: 第 {detected_page} 页")
-                    doc.close()
                     return detected_page
 
-            doc.close()
             logger.info("未检测到 References/Appendix 标识，保留所有图片")
             return None
 
@@ -164,36 +645,28 @@ class PDFFigureExtractorV2:
             return None
 
     def _run_pdffigures2(self, pdf_path: str) -> Optional[Dict]:
-        """运行 PDFFigures2 并返回结果"""
-        if not self.pdffigures2_jar.exists():
-            logger.warning("PDFFigures2 JAR 不存在，跳过")
+        """运行 PDFFigures2（独立 JVM）并返回结果"""
+        if not pdffigures2_available(self.pdffigures2_jar):
+            logger.warning("PDFFigures2 不可用（JAR 不存在或未安装 java），跳过")
             return None
 
         try:
-            pdf_filename = Path(pdf_path).stem
-            json_output = self.pdffigures2_output_dir / f"{pdf_filename}.json"
-
+            self.pdffigures2_output_dir.mkdir(parents=True, exist_ok=True)
             cmd = [
                 "java",
                 "-jar",
                 str(self.pdffigures2_jar),
-                pdf_path,
-                "-m", str(self.pdffigures2_output_dir) + "/",
-                "-d", str(self.pdffigures2_output_dir) + "/",
-                "-i", "300",  # 设置 DPI 为 300（高质量）
-                "-c"  # 包含 regionless-captions
+                *pdffigures2_args(
+                    pdf_path,
+                    self.pdffigures2_output_dir,
+                    self.render_profile.dpi,
+                    self.pdffigures2_render,  # 非 archive 配置或延迟渲染时由 Python 按配置渲染
+                ),
             ]
 
-            # 设置 Java 环境变量
-            env = os.environ.copy()
-            java_home = os.getenv("JAVA_HOME")
-            if not java_home:
-                # 尝试使用 Homebrew 安装的 OpenJDK 11
-                env["PATH"] = "/opt/homebrew/opt/openjdk@11/bin:" + env.get("PATH", "")
-
             result = subprocess.run(
                 cmd,
-                env=env,
+                env=build_java_env(),
                 capture_output=True,
                 text=True,
                 timeout=120
@@ -204,135 +677,169 @@ class PDFFigureExtractorV2:
                 return None
 
             # 读取 JSON 结果
-            if json_output.exists():
-                with open(json_output, 'r') as f:
-                    return json.load(f)
-            else:
-                logger.warning(f"PDFFigures2 输出文件不存在: {json_output}")
-                return None
+            return load_pdffigures2_result(pdf_path, self.pdffigures2_output_dir)
 
         except Exception as e:
             logger.error(f"PDFFigures2 运行失败: {e}")
             return None
 
-    def _process_pdffigures2_figure(self, fig: Dict) -> Optional[Dict]:
+    async def _run_pdffigures2_async(self, pdf_path: str) -> Optional[Dict]:
+        """在常驻 JVM 池中运行 PDFFigures2 并返回结果"""
+        if not pdffigures2_available(self.pdffigures2_jar):
+            logger.warning("PDFFigures2 不可用（JAR 不存在或未安装 java），跳过")
+            return None
+        try:
+            pool = get_pdffigures2_pool(self.pdffigures2_jar)
+            return await pool.extract(
+                pdf_path,
+                self.pdffigures2_output_dir,
+                self.render_profile.dpi,
+                self.pdffigures2_render,
+            )
+        except Exception as e:
+            logger.error(f"PDFFigures2 运行失败: {e}")
+            return None
+
+    def _process_pdffigures2_figure(self, fig: Dict, document: PaperDocument) -> Optional[Dict]:
         """处理 PDFFigures2 提取的单个 figure"""
         try:
             fig_type = fig['figType']
             fig_name = fig['name']
-            render_url = fig.get('renderURL', '')
-
-            if not render_url:
-                return None
-
-            src_path = Path(render_url)
-            if not src_path.exists():
-                logger.warning(f"PDFFigures2 渲染文件不存在: {src_path}")
-                return None
-
-            # 复制到最终输出目录，重命名为统一格式
-            dst_filename = f"{fig_type}{fig_name}.png"
-            dst_path = self.output_dir / dst_filename
-
-            import shutil
-            shutil.copy2(src_path, dst_path)
+            boundary = fig.get('regionBoundary')
+
+            if self.lazy_render:
+                # 延迟渲染：只记录区域
+                if not boundary:
+                    return None
+                output = _planned_output(self.output_dir, self.render_profile, fig_type, fig_name)
+            elif self.pdffigures2_render:
+                # archive 配置：直接使用 PDFFigures2 渲染的 PNG
+                render_url = fig.get('renderURL', '')
+                if not render_url:
+                    return None
+
+                src_path = Path(render_url)
+                if not src_path.exists():
+                    logger.warning(f"PDFFigures2 渲染文件不存在: {src_path}")
+                    return None
+
+                # 移动到最终输出目录，重命名为统一格式（不复制）
+                dst_filename = f"{fig_type}{fig_name}.png"
+                dst_path = self.output_dir / dst_filename
+                _finalize_file(src_path, dst_path)
+                output = {'path': str(dst_path), 'filename': dst_filename, 'format': 'png'}
+            else:
+                # 其他配置：按 regionBoundary 从 PDF 直接渲染到目标尺寸
+                if not boundary:
+                    return None
+                clip = fitz.Rect(boundary['x1'], boundary['y1'], boundary['x2'], boundary['y2'])
+                with document.page(fig['page']) as page:
+                    output = render_clip(page, clip, self.render_profile, self.output_dir / f"{fig_type}{fig_name}")
 
             return {
-                'filename': dst_filename,
-                'local_path': str(dst_path),
+                'filename': output['filename'],
+                'local_path': output['path'],
                 'page': fig['page'] + 1,  # 转为 1-indexed
                 'caption': fig.get('caption', ''),
-                'bbox': fig.get('regionBoundary'),
+                'bbox': boundary,
                 'source': 'pdffigures2',
                 'fig_type': fig_type,
                 'fig_name': fig_name,
-                'width': int(fig.get('regionBoundary', {}).get('x2', 0) - fig.get('regionBoundary', {}).get('x1', 0)) if fig.get('regionBoundary') else 0,
-                'height': int(fig.get('regionBoundary', {}).get('y2', 0) - fig.get('regionBoundary', {}).get('y1', 0)) if fig.get('regionBoundary') else 0,
-                'format': 'png'
+                'width': int(boundary.get('x2', 0) - boundary.get('x1', 0)) if boundary else 0,
+                'height': int(boundary.get('y2', 0) - boundary.get('y1', 0)) if boundary else 0,
+                'format': output['format'],
+                'rendered': not self.lazy_render
             }
 
         except Exception as e:
             logger.error(f"处理 PDFFigures2 figure 失败: {e}")
             return None
 
-    def _extract_regionless_figures(self, pdf_path: str, regionless_captions: List[Dict]) -> List[Dict]:
+    def _extract_regionless_figures(self, document: PaperDocument, regionless_captions: List[Dict]) -> List[Dict]:
         """使用 Python 密度检测算法提取 regionless figures"""
-        doc = fitz.open(pdf_path)
         figures = []
 
-        try:
-            for item in regionless_captions:
-                fig_name = item['name']
-                fig_type = item['figType']
-                page_num = item['page']
-                caption_bbox = item['boundary']
-                caption_text = item['text']
-
-                logger.info(f"  处理 {fig_type} {fig_name} (Page {page_num + 1})...")
-
-                page = doc[page_num]
-
-                # 使用密度检测算法
-                region_bbox = self._detect_figure_region_by_density(page, caption_bbox)
-
-                if region_bbox:
-                    # 渲染为 PNG（300 DPI，与 pdffigures2 保持一致）
-                    zoom = 300 / 72
-                    mat = fitz.Matrix(zoom, zoom)
-                    pix = page.get_pixmap(matrix=mat, clip=region_bbox)
-
-                    dst_filename = f"{fig_type}{fig_name}.png"
-                    dst_path = self.output_dir / dst_filename
-                    pix.save(str(dst_path))
-
-                    figures.append({
-                        'filename': dst_filename,
-                        'local_path': str(dst_path),
-                        'page': page_num + 1,
-                        'caption': caption_text,
-                        'bbox': {
-                            'x1': region_bbox.x0,
-                            'y1': region_bbox.y0,
-                            'x2': region_bbox.x1,
-                            'y2': region_bbox.y1
-                        },
-                        'source': 'python_fallback',
-                        'fig_type': fig_type,
-                        'fig_name': fig_name,
-                        'width': int(region_bbox.width),
-                        'height': int(region_bbox.height),
-                        'format': 'png'
-                    })
-
-                    logger.info(f"    ✓ 提取成功 ({region_bbox.width:.1f}x{region_bbox.height:.1f})")
-                else:
-                    logger.warning(f"    ✗ 提取失败")
+        # 按页分组：每页的绘图对象 / 文本块索引只构建一次
+        by_page: Dict[int, List[Dict]] = {}
+        for item in regionless_captions:
+            by_page.setdefault(item['page'], []).append(item)
 
-        finally:
-            doc.close()
+        for page_num, items in by_page.items():
+            layout = _PageLayout(document.page_drawings(page_num), document.page_dict(page_num)["blocks"])
+
+            with document.page(page_num) as page:
+                for item in items:
+                    figure = self._extract_regionless_figure(page, layout, item)
+                    if figure:
+                        figures.append(figure)
 
         return figures
 
-    def _detect_figure_region_by_density(self, page, caption_bbox: Dict) -> Optional[fitz.Rect]:
-        """基于对象密度检测 Figure 区域（核心算法）"""
+    def _extract_regionless_figure(self, page, layout: "_PageLayout", item: Dict) -> Optional[Dict]:
+        """检测并渲染单个 regionless caption 对应的 Figure，失败返回 None"""
+        fig_name = item['name']
+        fig_type = item['figType']
+        page_num = item['page']
+        caption_bbox = item['boundary']
+
+        logger.info(f"  处理 {fig_type} {fig_name} (Page {page_num + 1})...")
+
+        # 使用密度检测算法（页面索引按页共享）
+        region_bbox = self._detect_figure_region_by_density(page, caption_bbox, layout=layout)
+
+        if not region_bbox:
+            logger.warning(f"    ✗ 提取失败")
+            return None
+
+        logger.info(f"    ✓ 提取成功 ({region_bbox.width:.1f}x{region_bbox.height:.1f})")
+
+        if self.lazy_render:
+            return _figure_record(
+                item, region_bbox, _planned_output(self.output_dir, self.render_profile, fig_type, fig_name), False
+            )
+
+        # 按渲染配置渲染（archive 为 300 DPI PNG，与 pdffigures2 保持一致）
+        rendered = render_clip(page, region_bbox, self.render_profile, self.output_dir / f"{fig_type}{fig_name}")
+        return _figure_record(item, region_bbox, rendered)
+
+    @staticmethod
+    def _detect_figure_region_by_density(
+        page,
+        caption_bbox: Dict,
+        drawings: Optional[List[Dict]] = None,
+        text_blocks: Optional[List[Dict]] = None,
+        layout: Optional["_PageLayout"] = None
+    ) -> Optional[fitz.Rect]:
+        """
+        基于对象密度检测 Figure 区域（核心算法）
+
+        Args:
+            page: fitz 页面
+            caption_bbox: caption 边界框
+            drawings: 页面绘图对象（已解析时传入，否则现场解析）
+            text_blocks: 页面文本块（已解析时传入，否则现场解析）
+            layout: 已构建的页面索引（传入时忽略 drawings / text_blocks）
+        """
         page_height = page.rect.height
         page_width = page.rect.width
         caption_y_top = caption_bbox['y1']
 
-        # 获取所有绘图对象和文本块
-        drawings = page.get_drawings()
-        text_blocks = page.get_text("dict")["blocks"]
+        # 页面索引（同页多个 caption 时由调用方构建一次后复用）
+        if layout is None:
+            if drawings is None:
+                drawings = page.get_drawings()
+            if text_blocks is None:
+                text_blocks = page.get_text("dict")["blocks"]
+            layout = _PageLayout(drawings, text_blocks)
 
-        # 只考虑 caption 上方的内容
-        drawings_above = [d for d in drawings if d['rect'][3] < caption_y_top]
-        text_blocks_above = [b for b in text_blocks
-                             if b.get("type") == 0 and b["bbox"][3] < caption_y_top]
+        # 只考虑 caption 上方的内容（按下边界排序的前缀）
+        drawing_rects, text_rects, text_chars = layout.above(caption_y_top)
 
-        if not drawings_above:
+        if len(drawing_rects) == 0:
             return None
 
         # 找到 caption 正上方的空白间隙
-        closest_drawing_y = max(d['rect'][3] for d in drawings_above)
+        closest_drawing_y = drawing_rects[:, 3].max()
         gap_to_caption = caption_y_top - closest_drawing_y
 
         # 确定扫描区域
@@ -346,41 +853,12 @@ class PDFFigureExtractorV2:
         stripe_height = 10
         num_stripes = int((scan_bottom - scan_top) / stripe_height) + 1
 
-        drawing_density = np.zeros(num_stripes)
-        text_density = np.zeros(num_stripes)
+        # 绘图对象密度：每个对象的面积累加到它覆盖的所有条带
+        areas = (drawing_rects[:, 2] - drawing_rects[:, 0]) * (drawing_rects[:, 3] - drawing_rects[:, 1])
+        drawing_density = _stripe_density(drawing_rects, areas, scan_top, scan_bottom, stripe_height, num_stripes)
 
-        # 计算绘图对象密度
-        for d in drawings_above:
-            rect = d['rect']
-            if rect[3] > scan_bottom or rect[1] < scan_top:
-                continue
-
-            start_stripe = int((rect[1] - scan_top) / stripe_height)
-            end_stripe = int((rect[3] - scan_top) / stripe_height)
-            start_stripe = max(0, min(start_stripe, num_stripes - 1))
-            end_stripe = max(0, min(end_stripe, num_stripes - 1))
-
-            area = (rect[2] - rect[0]) * (rect[3] - rect[1])
-            for i in range(start_stripe, end_stripe + 1):
-                drawing_density[i] += area
-
-        # 计算文本密度
-        for block in text_blocks_above:
-            bbox = block["bbox"]
-            if bbox[3] > scan_bottom or bbox[1] < scan_top:
-                continue
-
-            start_stripe = int((bbox[1] - scan_top) / stripe_height)
-            end_stripe = int((bbox[3] - scan_top) / stripe_height)
-            start_stripe = max(0, min(start_stripe, num_stripes - 1))
-            end_stripe = max(0, min(end_stripe, num_stripes - 1))
-
-            text_chars = sum(len(span.get("text", ""))
-                            for line in block.get("lines", [])
-                            for span in line.get("spans", []))
-
-            for i in range(start_stripe, end_stripe + 1):
-                text_density[i] += text_chars
+        # 文本密度：每个文本块的字符数累加到它覆盖的所有条带
+        text_density = _stripe_density(text_rects, text_chars, scan_top, scan_bottom, stripe_height, num_stripes)
 
         # 归一化并计算 Figure 评分
         if drawing_density.max() > 0:
@@ -390,21 +868,15 @@ class PDFFigureExtractorV2:
 
         figure_score = drawing_density - 0.5 * text_density
 
-        # 找到连续的高分区域
+        # 找到连续的高分区域：最下方的高分条带
         threshold = 0.1
-        figure_bottom_stripe = -1
-
-        for i in range(num_stripes - 1, -1, -1):
-            if figure_score[i] > threshold:
-                figure_bottom_stripe = i
-                break
+        high = figure_score > threshold
+        high_indices = np.flatnonzero(high)
 
-        if figure_bottom_stripe == -1:
+        if len(high_indices) == 0:
             # Fallback: 使用所有绘图对象的包围盒
-            min_x = min(d['rect'][0] for d in drawings_above)
-            min_y = min(d['rect'][1] for d in drawings_above)
-            max_x = max(d['rect'][2] for d in drawings_above)
-            max_y = max(d['rect'][3] for d in drawings_above)
+            min_x, min_y = drawing_rects[:, 0].min(), drawing_rects[:, 1].min()
+            max_x, max_y = drawing_rects[:, 2].max(), drawing_rects[:, 3].max()
 
             margin = 5
             return fitz.Rect(
@@ -414,28 +886,29 @@ class PDFFigureExtractorV2:
                 min(caption_y_top - 5, max_y + margin)
             )
 
-        # 向上扩展
-        figure_top_stripe = figure_bottom_stripe
-        for i in range(figure_bottom_stripe - 1, -1, -1):
-            if figure_score[i] > threshold:
-                figure_top_stripe = i
-            else:
-                if i > 2 and all(figure_score[j] <= threshold for j in range(i-2, i+1)):
-                    break
+        figure_bottom_stripe = int(high_indices[-1])
+
+        # 向上扩展：遇到连续 3 个低分条带（且不在最上方 3 条内）时停止
+        low = ~high[:figure_bottom_stripe]
+        scan_start = 0
+        if len(low) > 3:
+            low_run = low[2:] & low[1:-1] & low[:-2]       # low_run[k] 对应条带 k+2..k 全部低分
+            stops = np.flatnonzero(low_run[1:]) + 3         # 只考虑条带编号 > 2
+            if len(stops):
+                scan_start = int(stops[-1]) + 1
+        high_above = np.flatnonzero(high[scan_start:figure_bottom_stripe])
+        figure_top_stripe = scan_start + int(high_above[0]) if len(high_above) else figure_bottom_stripe
 
         # 计算 y 范围
         figure_y_top = scan_top + figure_top_stripe * stripe_height
         figure_y_bottom = scan_top + (figure_bottom_stripe + 1) * stripe_height
 
         # 在该 y 范围内找到 x 边界
-        relevant_drawings = [d for d in drawings_above
-                            if d['rect'][1] >= figure_y_top and d['rect'][3] <= figure_y_bottom + 20]
-
-        if not relevant_drawings:
-            relevant_drawings = drawings_above
+        relevant = (drawing_rects[:, 1] >= figure_y_top) & (drawing_rects[:, 3] <= figure_y_bottom + 20)
+        relevant_rects = drawing_rects[relevant] if relevant.any() else drawing_rects
 
-        min_x = min(d['rect'][0] for d in relevant_drawings)
-        max_x = max(d['rect'][2] for d in relevant_drawings)
+        min_x = float(relevant_rects[:, 0].min())
+        max_x = float(relevant_rects[:, 2].max())
 
         # 检查宽度是否合理
         figure_width = max_x - min_x
@@ -454,13 +927,217 @@ class PDFFigureExtractorV2:
 
         return fitz.Rect(min_x, min_y, max_x, max_y)
 
-    def _extract_all_figures_python(self, pdf_path: str) -> List[Dict]:
-        """纯 Python 方法提取所有 figures（完全 fallback）"""
-        logger.warning("纯 Python 提取暂未实现，返回空列表")
-        return []
+    def _extract_all_figures_python(self, document: PaperDocument, max_workers: Optional[int] = None) -> List[Dict]:
+        """
+        纯 Python 方法提取所有 figures（完全 fallback，用于没有 Java 的环境）
+
+        1. 逐页用正则在文本块中查找 caption，并用密度检测算法确定区域
+        2. 同一 Figure/Table 编号只保留第一次出现（正文中以 "Figure 3." 开头的段落等）
+        3. 按渲染配置渲染
+
+        页数达到 PYTHON_PARALLEL_MIN_PAGES 且有多个 CPU 时，检测和渲染都按页区间交给进程池并行，
+        否则在当前进程中复用 document 已缓存的解析结果。
+        """
+        total_pages = document.page_count
+        if max_workers is None:
+            max_workers = _default_workers()
+        chunks = min(max_workers, total_pages // PYTHON_MIN_PAGES_PER_CHUNK)
+        parallel = total_pages >= PYTHON_PARALLEL_MIN_PAGES and chunks >= 2
+
+        # 步骤 1: 检测 caption 和区域
+        if parallel:
+            pool = _get_process_pool(max_workers)
+            tasks = [(document.pdf_path, start, end) for start, end in _split_page_ranges(total_pages, chunks)]
+            detections = [item for chunk in pool.map(_detect_page_range, tasks) for item in chunk]
+        else:
+            detections = []
+            for page_num in range(total_pages):
+                with document.page(page_num) as page:
+                    detections.extend(_detect_page_figures(
+                        page,
+                        page_num,
+                        document.page_dict(page_num)["blocks"],
+                        lambda page_num=page_num: document.page_drawings(page_num),
+                    ))
+
+        # 步骤 2: 去重（按页序保留第一次出现）
+        seen = set()
+        unique = []
+        for item in detections:
+            key = (item['figType'], item['name'])
+            if key not in seen:
+                seen.add(key)
+                unique.append(item)
+
+        logger.info(f"🐍 纯 Python 检测到 {len(unique)} 个 Figures/Tables（{total_pages} 页）")
+
+        # 步骤 3: 渲染（延迟渲染时只记录区域）
+        if self.lazy_render:
+            return [
+                _figure_record(
+                    item, fitz.Rect(item['region']),
+                    _planned_output(self.output_dir, self.render_profile, item['figType'], item['name']), False
+                )
+                for item in unique
+            ]
+
+        if parallel and len(unique) > 1:
+            groups = [unique[i::chunks] for i in range(chunks)]
+            tasks = [
+                (document.pdf_path, str(self.output_dir), self.render_profile.name, group)
+                for group in groups if group
+            ]
+            return [figure for chunk in pool.map(_render_detections, tasks) for figure in chunk]
+
+        figures = []
+        for item in unique:
+            region_bbox = fitz.Rect(item['region'])
+            with document.page(item['page']) as page:
+                rendered = render_clip(
+                    page, region_bbox, self.render_profile,
+                    self.output_dir / f"{item['figType']}{item['name']}"
+                )
+            figures.append(_figure_record(item, region_bbox, rendered))
+        return figures
 
-    def _save_metadata(self, figures: List[Dict]):
-        """保存元数据到 JSON"""
+    def _cache_key(self, pdf_sha256: str) -> Dict:
+        """提取缓存的键：PDF 内容哈希 + 提取器版本 + 渲染配置 + 是否使用 PDFFigures2"""
+        return {
+            'pdf_sha256': pdf_sha256,
+            'extractor_version': EXTRACTOR_VERSION,
+            'render_profile': self.render_profile.to_metadata(),
+            'pdffigures2': pdffigures2_available(self.pdffigures2_jar),
+        }
+
+    def render_figures(
+        self,
+        pdf_path: str,
+        figures: List[Dict],
+        document: Optional[PaperDocument] = None,
+        reuse: Optional[Dict[str, str]] = None
+    ) -> List[Dict]:
+        """
+        渲染延迟渲染模式下尚未渲染的图片（已渲染的跳过），并更新 extraction_metadata.json
+
+        Args:
+            pdf_path: PDF 文件路径
+            figures: 需要渲染的图片元数据（通常只是 digest 中实际引用的几张）
+            document: 共享的论文 PDF 会话（可选）
+            reuse: {filename: 已有图片文件路径}，这些图片直接链接已有文件，不再渲染
+                   （例如全库哈希索引中同一张图片的渲染结果）
+
+        Returns:
+            figures（原地更新 local_path / format / rendered）
+        """
+        pending = [fig for fig in figures if not fig.get('rendered', True)]
+        if not pending:
+            return figures
+
+        owns_document = document is None
+        if owns_document:
+            document = PaperDocument(pdf_path)
+
+        reuse = reuse or {}
+        reused = 0
+        try:
+            for fig in pending:
+                if fig['filename'] in reuse:
+                    dst_path = self.output_dir / fig['filename']
+                    _link_file(Path(reuse[fig['filename']]), dst_path)
+                    fig.update(local_path=str(dst_path), rendered=True)
+                    reused += 1
+                    continue
+
+                bbox = fig['bbox']
+                clip = fitz.Rect(bbox['x1'], bbox['y1'], bbox['x2'], bbox['y2'])
+                with document.page(fig['page'] - 1) as page:
+                    rendered = render_clip(
+                        page, clip, self.render_profile,
+                        self.output_dir / f"{fig['fig_type']}{fig['fig_name']}"
+                    )
+                fig.update(
+                    filename=rendered['filename'],
+                    local_path=rendered['path'],
+                    format=rendered['format'],
+                    rendered=True
+                )
+        finally:
+            if owns_document:
+                document.close()
+
+        self._mark_rendered(pending)
+        logger.info(
+            f"🖼️  按需渲染 {len(pending) - reused} 张图片（{self.render_profile.name}）"
+            + (f"，复用已有图片 {reused} 张" if reused else "")
+        )
+        return figures
+
+    def _mark_rendered(self, figures: List[Dict]):
+        """在 extraction_metadata.json 中把已渲染的图片标记为 rendered"""
+        metadata_path = self.output_dir / "extraction_metadata.json"
+        if not metadata_path.exists():
+            return
+
+        with open(metadata_path, 'r') as f:
+            metadata = json.load(f)
+
+        rendered = {fig['filename']: fig for fig in figures}
+        metadata['items'] = [rendered.get(item['filename'], item) for item in metadata.get('items', [])]
+        metadata['total_bytes'] = sum(
+            (self.output_dir / item['filename']).stat().st_size
+            for item in metadata['items'] if (self.output_dir / item['filename']).exists()
+        )
+
+        with open(metadata_path, 'w') as f:
+            json.dump(metadata, f, indent=2)
+
+    def _cached_result(
+        self,
+        pdf_path: str,
+        pdf_sha256: str,
+        document: Optional[PaperDocument]
+    ) -> Optional[List[Dict]]:
+        """命中提取缓存时返回图片列表（非延迟模式下补渲染缓存中未渲染的图片），否则返回 None"""
+        cached = self._load_cached(pdf_sha256)
+        if cached is not None and not self.lazy_render:
+            cached = self.render_figures(pdf_path, cached, document)
+        return cached
+
+    def _load_cached(self, pdf_sha256: str) -> Optional[List[Dict]]:
+        """
+        读取 extraction_metadata.json 中的提取缓存
+
+        Returns:
+            缓存键一致且图片文件都存在时返回图片元数据列表，否则返回 None
+        """
+        metadata_path = self.output_dir / "extraction_metadata.json"
+        if not metadata_path.exists():
+            return None
+
+        try:
+            with open(metadata_path, 'r') as f:
+                metadata = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"提取缓存读取失败: {e}")
+            return None
+
+        if metadata.get('cache_key') != self._cache_key(pdf_sha256):
+            return None
+
+        figures = metadata.get('items', [])
+        for fig in figures:
+            # 论文目录可能被重命名过，local_path 以当前输出目录为准
+            local_path = self.output_dir / fig['filename']
+            if fig.get('rendered', True) and not local_path.exists():
+                logger.info(f"提取缓存中的图片已缺失（{fig['filename']}），重新提取")
+                return None
+            fig['local_path'] = str(local_path)
+
+        logger.info(f"♻️  命中提取缓存: {len(figures)} 个 Figures/Tables（{metadata_path}）")
+        return figures
+
+    def _save_metadata(self, figures: List[Dict], cache_key: Optional[Dict] = None):
+        """保存元数据到 JSON（cache_key 不为空时同时作为提取缓存）"""
         metadata_path = self.output_dir / "extraction_metadata.json"
 
         figures_count = sum(1 for f in figures if f['fig_type'] == 'Figure')
@@ -468,7 +1145,14 @@ class PDFFigureExtractorV2:
         pdffigures2_count = sum(1 for f in figures if f['source'] == 'pdffigures2')
         python_count = sum(1 for f in figures if f['source'] == 'python_fallback')
 
+        total_bytes = sum(
+            Path(f['local_path']).stat().st_size for f in figures if Path(f['local_path']).exists()
+        )
+
         metadata = {
+            'cache_key': cache_key,
+            'render_profile': self.render_profile.to_metadata(),
+            'total_bytes': total_bytes,
             'total': len(figures),
             'figures': figures_count,
             'tables': tables_count,
@@ -482,18 +1166,26 @@ class PDFFigureExtractorV2:
         with open(metadata_path, 'w') as f:
             json.dump(metadata, f, indent=2)
 
-        logger.info(f"✅ 元数据已保存: {metadata_path}")
+        logger.info(
+            f"✅ 元数据已保存: {metadata_path}"
+            f"（渲染配置: {self.render_profile.name}，图片共 {total_bytes / 1024:.0f} KB）"
+        )
 
 
 # ========== 便捷函数 ==========
 
-def extract_pdf_figures(pdf_path: str, output_dir: str = None) -> Tuple[List[Dict], List[Dict]]:
+def extract_pdf_figures(
+    pdf_path: str,
+    output_dir: str = None,
+    render_profile: Optional[str] = None
+) -> Tuple[List[Dict], List[Dict]]:
     """
     便捷函数：一行代码提取 PDF Figures/Tables（V2 方法）
 
     Args:
         pdf_path: PDF 文件路径
         output_dir: 图片保存目录
+        render_profile: 渲染配置名称（archive / notion / thumbnail；None 表示 FIGURE_RENDER_PROFILE）
 
     Returns:
         (figures, blocks)
@@ -501,5 +1193,24 @@ def extract_pdf_figures(pdf_path: str, output_dir: str = None) -> Tuple[List[Dic
     if output_dir is None:
         output_dir = "./paper_digest/figures"
 
-    extractor = PDFFigureExtractorV2(output_dir)
+    extractor = PDFFigureExtractorV2(output_dir, render_profile)
     return extractor.extract(pdf_path)
+
+
+def extract_pdf_figures_batch(
+    jobs: List[Tuple[str, str]],
+    batch_size: int = BATCH_SIZE,
+    render_profile: Optional[str] = None
+) -> Dict[str, List[Dict]]:
+    """
+    便捷函数：批量提取多篇 PDF 的 Figures/Tables（整库回填）
+
+    Args:
+        jobs: [(pdf_path, output_dir), ...]
+        batch_size: 单次 JVM 运行处理的最大 PDF 数
+        render_profile: 渲染配置名称
+
+    Returns:
+        {pdf_path: figures}
+    """
+    return PDFFigureExtractorV2.extract_batch(jobs, batch_size=batch_size, render_profile=render_profile)
@@ -6,13 +6,25 @@ PDF 图片和 Caption 提取模块
 2. 识别图片位置和关联的 caption
 3. 保存图片文件，返回结构化元数据
 4. 维护原始 block 顺序用于 Markdown 生成
+
+黑色背景检测和反转直接在 Pixmap 像素缓冲区上进行（np.frombuffer 视图 + 原地反转），
+每张图片只编码一次 PNG。
+
+页数较多时按页区间分给多个工作进程并行提取：先用 doc.get_page_images() 预扫描出跨页共享的 xref，
+工作进程只提取本页独有的图片，共享图片由主进程在按页序合并时提取，保证去重结果与单进程一致。
+
+caption 匹配使用按页构建的索引（_CaptionIndex）：文本块按上边界排序、文本预先提取，每张图片二分查找正下方的候选。
 """
 
+import bisect
 import fitz  # PyMuPDF
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 import json
 import logging
+import numpy as np
+
+from .pdf_text import _default_workers, _get_process_pool, _split_page_ranges
 
 # 尝试导入 PIL 用于图片处理
 try:
@@ -23,6 +35,66 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# 自动并行的最少页数
+IMAGE_PARALLEL_MIN_PAGES = 8
+
+# 每个进程至少处理的页数
+IMAGE_MIN_PAGES_PER_CHUNK = 4
+
+# caption 与图片下边界的最大垂直距离
+CAPTION_MAX_DISTANCE = 50
+
+# caption 关键词
+CAPTION_KEYWORDS = ["figure", "fig.", "图", "table", "表", "图表"]
+
+
+class _CaptionIndex:
+    """
+    单页 caption 候选索引：只保留包含 caption 关键词的非空文本块（文本预先提取），按上边界 y 排序
+
+    每张图片用二分查找定位正下方 CAPTION_MAX_DISTANCE 范围内的文本块，
+    同页多张图片的 caption 匹配总体为 O((图片数 + 文本块数) · log 文本块数)。
+    """
+
+    def __init__(self, blocks: List[Dict], extract_text):
+        candidates = []
+        for block in blocks:
+            if block["type"] != 0:  # 不是文本块
+                continue
+            text = extract_text(block)
+            if not text.strip():
+                continue
+            text_lower = text.lower()
+            if not any(kw in text_lower for kw in CAPTION_KEYWORDS):
+                continue
+            text_x0, text_y0, text_x1, _ = block.get("bbox", (0, 0, 0, 0))
+            candidates.append((text_y0, text_x0, text_x1, text))
+
+        # 稳定排序：上边界相同的文本块保持原 block 顺序
+        candidates.sort(key=lambda item: item[0])
+        self.candidates = candidates
+        self.tops = [item[0] for item in candidates]
+
+    def below(self, y: float) -> List[Tuple[float, float, float, str]]:
+        """上边界在 [y, y + CAPTION_MAX_DISTANCE] 附近的候选（按上边界递增；边界处由调用方精确判断）"""
+        start = bisect.bisect_left(self.tops, y)
+        end = bisect.bisect_right(self.tops, y + CAPTION_MAX_DISTANCE + 1)
+        return self.candidates[start:end]
+
+
+def _extract_image_page_range(task: Tuple[str, str, int, int, frozenset]) -> List[Tuple[int, List[Dict]]]:
+    """工作进程入口：提取 [start, end) 页（每个进程独立打开 fitz 文档），返回 [(page_num, entries), ...]"""
+    pdf_path, output_dir, start, end, shared_xrefs = task
+    extractor = PDFImageExtractor(output_dir)
+    doc = fitz.open(pdf_path)
+    try:
+        return [
+            (page_num, extractor._process_page(doc, page_num, deferred_xrefs=shared_xrefs))
+            for page_num in range(start, end)
+        ]
+    finally:
+        doc.close()
+
 
 class PDFImageExtractor:
     """PDF 图片提取器"""
@@ -38,12 +110,19 @@ class PDFImageExtractor:
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.processed_xrefs = set()  # 跟踪已处理的图片 xref，避免重复
 
-    def extract(self, pdf_path: str) -> Tuple[List[Dict], List[Dict]]:
+    def extract(
+        self,
+        pdf_path: str,
+        parallel: Optional[bool] = None,
+        max_workers: Optional[int] = None
+    ) -> Tuple[List[Dict], List[Dict]]:
         """
         完整提取：图片文件 + block 顺序信息
 
         Args:
             pdf_path: PDF 文件路径
+            parallel: 是否按页区间多进程并行；None 表示页数达到 IMAGE_PARALLEL_MIN_PAGES 且有多个 CPU 时自动并行
+            max_workers: 最大工作进程数（默认 CPU 核数，最多 8 个）
 
         Returns:
             images: 图片元数据列表
@@ -74,83 +153,194 @@ class PDFImageExtractor:
         self.processed_xrefs.clear()
 
         try:
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-
-                # 获取页面结构化内容
-                page_dict = page.get_text("dict")
-                page_blocks = page_dict.get("blocks", [])
-
-                # 1. 先扫描一遍找到所有图片，用于 caption 查找
-                image_info_map = {}  # xref -> {bbox, ...}
-                for block in page_blocks:
-                    if block["type"] == 1:  # 图片块
-                        xref = block.get("xref")
-                        if xref:
-                            image_info_map[xref] = block.get("bbox")
-
-                # 2. 遍历所有 block，维护顺序
-                for block in page_blocks:
-                    bbox = block.get("bbox")
-
-                    if block["type"] == 0:  # 文本块
-                        text = self._extract_text_from_block(block)
-                        if text.strip():  # 只保存非空文本
-                            all_blocks.append({
-                                "type": "text",
-                                "page": page_num + 1,
-                                "bbox": bbox,
-                                "content": text
-                            })
-
-                    elif block["type"] == 1:  # 图片块
-                        # 直接从 block 中获取图片数据
-                        if "image" not in block:
-                            continue
-
-                        xref = block.get("xref")
-                        # 跟踪 xref 避免重复，如果没有 xref 则用索引跟踪
-                        block_id = xref if xref else f"page{page_num}_idx{len(all_images)}"
-                        if block_id in self.processed_xrefs:
-                            continue
-
-                        self.processed_xrefs.add(block_id)
-
-                        # 先查找 caption（在提取图片之前）
-                        caption = self._find_caption_for_image(
-                            page_blocks,
-                            block,
-                            page_dict.get("width"),
-                            page_dict.get("height")
-                        )
-
-                        # 从 block 直接提取图片文件，传递 PDF 文档对象以正确处理颜色空间和 caption
-                        img_info = self._extract_image_from_block(block, page_num, doc, caption)
-                        if not img_info:
-                            continue
-
-                        img_info["caption"] = caption
-
-                        all_images.append(img_info)
-
-                        # 添加到 block 序列
-                        all_blocks.append({
-                            "type": "image",
-                            "page": page_num + 1,
-                            "bbox": bbox,
-                            "image_ref": img_info["filename"],  # 用于关联
-                            "caption": caption
-                        })
+            total_pages = len(doc)
+            if max_workers is None:
+                max_workers = _default_workers()
+            chunks = min(max_workers, total_pages // IMAGE_MIN_PAGES_PER_CHUNK)
+            if parallel is None:
+                parallel = total_pages >= IMAGE_PARALLEL_MIN_PAGES and chunks >= 2
+            parallel = parallel and chunks >= 1
+
+            if parallel:
+                # 预扫描：出现在多个页面上的 xref 由主进程按页序统一提取，各工作进程只提取本页独有的图片
+                shared_xrefs = self._shared_xrefs(doc)
+                pool = _get_process_pool(max_workers)
+                tasks = [
+                    (pdf_path, str(self.output_dir), start, end, shared_xrefs)
+                    for start, end in _split_page_ranges(total_pages, chunks)
+                ]
+                for chunk in pool.map(_extract_image_page_range, tasks):
+                    for page_num, entries in chunk:
+                        self._merge_page_entries(entries, page_num, doc, all_images, all_blocks)
+            else:
+                for page_num in range(total_pages):
+                    entries = self._process_page(doc, page_num, image_offset=len(all_images))
+                    self._merge_page_entries(entries, page_num, doc, all_images, all_blocks)
 
         finally:
             doc.close()
 
         logger.info(
             f"✅ PDF 图片提取完成 - 提取 {len(all_images)} 张图片, {len(all_blocks)} 个 blocks"
+            + (f"（{chunks} 个进程并行）" if parallel else "")
         )
 
         return all_images, all_blocks
 
+    @staticmethod
+    def _shared_xrefs(doc: fitz.Document) -> frozenset:
+        """预扫描 doc.get_page_images()：返回出现在多个页面上的图片 xref"""
+        seen = set()
+        shared = set()
+        for page_num in range(len(doc)):
+            for xref in {img[0] for img in doc.get_page_images(page_num)}:
+                if xref in seen:
+                    shared.add(xref)
+                seen.add(xref)
+        return frozenset(shared)
+
+    @staticmethod
+    def _resolve_block_xrefs(page: fitz.Page, page_blocks: List[Dict]):
+        """
+        补全图片 block 的 xref
+
+        get_text("dict") 的图片 block 不带 xref，按 block 编号从 page.get_image_info(xrefs=True) 取回；
+        内联图片的 xref 为 0（按索引去重）
+        """
+        image_blocks = [block for block in page_blocks if block["type"] == 1 and "xref" not in block]
+        if not image_blocks:
+            return
+        xrefs = {info["number"]: info["xref"] for info in page.get_image_info(xrefs=True)}
+        for block in image_blocks:
+            block["xref"] = xrefs.get(block.get("number"), 0)
+
+    def _process_page(
+        self,
+        doc: fitz.Document,
+        page_num: int,
+        image_offset: int = 0,
+        deferred_xrefs: frozenset = frozenset()
+    ) -> List[Dict]:
+        """
+        处理单页：按 block 顺序提取文本和图片
+
+        Args:
+            doc: PDF 文档对象
+            page_num: 页码（0-indexed）
+            image_offset: 之前已提取的图片数（用于没有 xref 的图片的去重 ID）
+            deferred_xrefs: 不在本进程提取的 xref（跨页共享的图片，交给主进程按页序提取）
+
+        Returns:
+            按 block 顺序的条目列表：
+                {"block": {...}}                         文本块
+                {"block": {...}, "image": {...}}         已提取的图片
+                {"deferred": block, "caption": "..."}    待主进程提取的图片
+        """
+        page = doc[page_num]
+
+        # 获取页面结构化内容
+        page_dict = page.get_text("dict")
+        page_blocks = page_dict.get("blocks", [])
+        self._resolve_block_xrefs(page, page_blocks)
+
+        entries = []
+        image_count = image_offset
+        caption_index = None
+
+        # 遍历所有 block，维护顺序
+        for block in page_blocks:
+            bbox = block.get("bbox")
+
+            if block["type"] == 0:  # 文本块
+                text = self._extract_text_from_block(block)
+                if text.strip():  # 只保存非空文本
+                    entries.append({"block": {
+                        "type": "text",
+                        "page": page_num + 1,
+                        "bbox": bbox,
+                        "content": text
+                    }})
+
+            elif block["type"] == 1:  # 图片块
+                # 直接从 block 中获取图片数据
+                if "image" not in block:
+                    continue
+
+                xref = block.get("xref")
+                # 跟踪 xref 避免重复，如果没有 xref 则用索引跟踪
+                block_id = xref if xref else f"page{page_num}_idx{image_count}"
+                if block_id in self.processed_xrefs:
+                    continue
+
+                self.processed_xrefs.add(block_id)
+
+                # 先查找 caption（在提取图片之前）；本页的 caption 索引在遇到第一张图片时构建
+                if caption_index is None:
+                    caption_index = _CaptionIndex(page_blocks, self._extract_text_from_block)
+                caption = self._find_caption_for_image(
+                    page_blocks,
+                    block,
+                    page_dict.get("width"),
+                    page_dict.get("height"),
+                    caption_index
+                )
+
+                if xref in deferred_xrefs:
+                    entries.append({"deferred": block, "caption": caption})
+                    continue
+
+                # 从 block 直接提取图片文件，传递 PDF 文档对象以正确处理颜色空间和 caption
+                img_info = self._extract_image_from_block(block, page_num, doc, caption)
+                if not img_info:
+                    continue
+
+                img_info["caption"] = caption
+                image_count += 1
+                entries.append({"block": self._image_block(img_info, page_num, bbox), "image": img_info})
+
+        return entries
+
+    def _merge_page_entries(
+        self,
+        entries: List[Dict],
+        page_num: int,
+        doc: fitz.Document,
+        all_images: List[Dict],
+        all_blocks: List[Dict]
+    ):
+        """按页序合并单页结果；跨页共享的图片在这里按第一次出现提取"""
+        for entry in entries:
+            if "deferred" in entry:
+                block = entry["deferred"]
+                xref = block["xref"]
+                if xref in self.processed_xrefs:
+                    continue
+                self.processed_xrefs.add(xref)
+
+                img_info = self._extract_image_from_block(block, page_num, doc, entry["caption"])
+                if not img_info:
+                    continue
+                img_info["caption"] = entry["caption"]
+                entry = {"block": self._image_block(img_info, page_num, block.get("bbox")), "image": img_info}
+
+            elif "image" in entry and entry["image"]["xref"]:
+                self.processed_xrefs.add(entry["image"]["xref"])
+
+            if "image" in entry:
+                all_images.append(entry["image"])
+            all_blocks.append(entry["block"])
+
+    @staticmethod
+    def _image_block(img_info: Dict, page_num: int, bbox) -> Dict:
+        """图片在 block 序列中的条目"""
+        return {
+            "type": "image",
+            "page": page_num + 1,
+            "bbox": bbox,
+            "image_ref": img_info["filename"],  # 用于关联
+            "caption": img_info["caption"]
+        }
+
     def _extract_text_from_block(self, block: Dict) -> str:
         """从文本块提取内容"""
         lines = []
@@ -202,15 +392,14 @@ class PDFImageExtractor:
                         logger.debug(f"移除 Alpha 通道")
                         pix = fitz.Pixmap(fitz.csRGB, pix)  # 这会移除 alpha
 
-                    # 转换为 PNG 格式的字节数据
-                    image_bytes = pix.tobytes("png")
-                    image_ext = "png"  # 统一使用 PNG 格式
-
                     logger.debug(f"使用 Pixmap 方法提取图片: xref={xref}, colorspace={pix.colorspace}, n={pix.n}")
 
-                    # ⚠️ 关键修复：检测并修复黑色背景（检查四角颜色）
-                    if HAS_PIL:
-                        image_bytes = self._fix_black_background_by_corners(image_bytes)
+                    # ⚠️ 关键修复：检测并修复黑色背景（检查四角颜色，直接在像素缓冲区上原地处理）
+                    self._fix_black_background_pixmap(pix)
+
+                    # 转换为 PNG 格式的字节数据（唯一一次编码）
+                    image_bytes = pix.tobytes("png")
+                    image_ext = "png"  # 统一使用 PNG 格式
 
                 except Exception as e:
                     logger.warning(f"Pixmap 提取失败: {e}，尝试备用方法")
@@ -337,87 +526,89 @@ class PDFImageExtractor:
             return f"image_page{page_num}_{xref}.{image_ext}"
 
     @staticmethod
-    def _fix_black_background_by_corners(image_bytes: bytes) -> bytes:
+    def _pixmap_array(pix: fitz.Pixmap) -> np.ndarray:
+        """Pixmap 像素的 (h, w, n) 数组视图（共享 pix 的缓冲区，不复制；去掉行尾填充）"""
+        rows = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)
+        return rows[:, :pix.width * pix.n].reshape(pix.height, pix.width, pix.n)
+
+    @staticmethod
+    def _fix_black_background_pixmap(pix: fitz.Pixmap) -> bool:
         """
-        通过检测四个角的颜色来判断是否需要反转图片（黑色背景 → 白色背景）
+        通过检测四个角的颜色判断是否需要反转图片（黑色背景 → 白色背景），需要时原地反转
 
         Args:
-            image_bytes: 图片字节数据
+            pix: 无 alpha 的 RGB / 灰度 Pixmap
 
         Returns:
-            修复后的图片字节数据（如果不需要修复则返回原始数据）
+            是否进行了反转
         """
-        if not HAS_PIL:
-            return image_bytes
-
         try:
-            from io import BytesIO
-            import numpy as np
-
-            # 打开图片
-            img = Image.open(BytesIO(image_bytes)).convert('RGB')
-            img_array = np.array(img)
-            h, w = img_array.shape[:2]
+            pixels = PDFImageExtractor._pixmap_array(pix)
+            h, w = pixels.shape[:2]
 
             # 采样四个角（每个角取 10x10 像素区域）
             sample_size = min(10, h // 10, w // 10)  # 动态调整采样大小
             if sample_size < 3:
                 # 图片太小，不检测
-                return image_bytes
+                return False
 
-            corners = {
-                '左上': img_array[0:sample_size, 0:sample_size],
-                '右上': img_array[0:sample_size, w-sample_size:w],
-                '左下': img_array[h-sample_size:h, 0:sample_size],
-                '右下': img_array[h-sample_size:h, w-sample_size:w]
-            }
+            # 四个角的各通道均值，shape (4, n)
+            corner_means = np.stack([
+                pixels[:sample_size, :sample_size],
+                pixels[:sample_size, w - sample_size:],
+                pixels[h - sample_size:, :sample_size],
+                pixels[h - sample_size:, w - sample_size:],
+            ]).mean(axis=(1, 2))
 
-            # 检查所有角是否都是黑色（RGB < 50）
-            black_corners = 0
-            for name, corner in corners.items():
-                avg_color = corner.mean(axis=(0, 1))
-                r, g, b = avg_color
-                if r < 50 and g < 50 and b < 50:
-                    black_corners += 1
+            # 各通道都 < 50 的角视为黑色
+            black_corners = int((corner_means < 50).all(axis=1).sum())
 
             # 如果至少 3 个角是黑色，判定为黑色背景，需要反转
-            if black_corners >= 3:
-                logger.info(f"🔧 检测到黑色背景（{black_corners}/4 个角是黑色），进行颜色反转...")
-
-                # 反转颜色
-                inverted = ImageChops.invert(img)
-
-                # 验证反转后的结果
-                inv_array = np.array(inverted)
-                inv_corners = {
-                    '左上': inv_array[0:sample_size, 0:sample_size],
-                    '右上': inv_array[0:sample_size, w-sample_size:w],
-                    '左下': inv_array[h-sample_size:h, 0:sample_size],
-                    '右下': inv_array[h-sample_size:h, w-sample_size:w]
-                }
-
-                white_corners = 0
-                for corner in inv_corners.values():
-                    avg_color = corner.mean(axis=(0, 1))
-                    if avg_color.mean() > 200:  # 反转后应该是白色
-                        white_corners += 1
-
-                if white_corners >= 3:
-                    logger.info(f"✅ 颜色反转成功！背景已从黑色变为白色")
-                    output = BytesIO()
-                    inverted.save(output, format='PNG')
-                    return output.getvalue()
-                else:
-                    logger.warning(f"⚠️  反转后背景仍不是白色，保持原始图片")
-                    return image_bytes
-            else:
+            if black_corners < 3:
                 logger.debug(f"背景正常（{black_corners}/4 个角是黑色），无需反转")
-                return image_bytes
+                return False
+
+            logger.info(f"🔧 检测到黑色背景（{black_corners}/4 个角是黑色），进行颜色反转...")
+
+            # 验证反转后的结果（反转后角的均值 = 255 - 原均值，应该是白色）
+            white_corners = int(((255 - corner_means).mean(axis=1) > 200).sum())
+            if white_corners < 3:
+                logger.warning(f"⚠️  反转后背景仍不是白色，保持原始图片")
+                return False
+
+            pix.invert_irect()
+            logger.info(f"✅ 颜色反转成功！背景已从黑色变为白色")
+            return True
+
+        except Exception as e:
+            logger.warning(f"背景检测失败: {e}，使用原始图片")
+            return False
+
+    @staticmethod
+    def _fix_black_background_by_corners(image_bytes: bytes) -> bytes:
+        """
+        通过检测四个角的颜色来判断是否需要反转图片（黑色背景 → 白色背景）
+
+        已编码图片的兼容接口：解码后交给 _fix_black_background_pixmap 处理
 
+        Args:
+            image_bytes: 图片字节数据
+
+        Returns:
+            修复后的图片字节数据（如果不需要修复则返回原始数据）
+        """
+        try:
+            pix = fitz.Pixmap(image_bytes)
+            if pix.n - pix.alpha > 3 or pix.alpha:
+                pix = fitz.Pixmap(fitz.csRGB, pix)
         except Exception as e:
             logger.warning(f"背景检测失败: {e}，使用原始图片")
             return image_bytes
 
+        if PDFImageExtractor._fix_black_background_pixmap(pix):
+            return pix.tobytes("png")
+        return image_bytes
+
     @staticmethod
     def _fix_black_background_at_source(image_bytes: bytes, image_ext: str, image_data: Dict = None) -> Tuple[bytes, bool]:
         """
@@ -570,7 +761,8 @@ class PDFImageExtractor:
         blocks: List[Dict],
         image_block: Dict,
         page_width: float = 595,  # A4 默认宽度
-        page_height: float = 842   # A4 默认高度
+        page_height: float = 842,  # A4 默认高度
+        caption_index: Optional["_CaptionIndex"] = None
     ) -> str:
         """
         查找图片的 caption（启发式方法）
@@ -580,59 +772,27 @@ class PDFImageExtractor:
         2. 垂直距离 < 50 像素
         3. 包含 "Figure", "Fig.", "图", "Table", "表" 等关键词
         4. 水平对齐：至少 50% 重叠
-        """
-        img_bbox = image_block.get("bbox", (0, 0, 0, 0))
-        img_x0, img_y0, img_x1, img_y1 = img_bbox
-
-        caption_candidates = []
-
-        for block in blocks:
-            if block["type"] != 0:  # 不是文本块
-                continue
 
-            text_bbox = block.get("bbox", (0, 0, 0, 0))
-            text_x0, text_y0, text_x1, text_y1 = text_bbox
+        Args:
+            caption_index: 本页的 caption 索引（同页多张图片共用；None 时由 blocks 临时构建）
+        """
+        if caption_index is None:
+            caption_index = _CaptionIndex(blocks, self._extract_text_from_block)
 
-            # 检查文本是否在图片正下方
-            is_below = text_y0 >= img_y1
-            vertical_distance = text_y0 - img_y1 if is_below else float('inf')
+        img_x0, img_y0, img_x1, img_y1 = image_block.get("bbox", (0, 0, 0, 0))
+        image_width = img_x1 - img_x0
 
+        # 候选文本块按上边界排序，距离递增：第一个水平对齐的就是距离最近的
+        for text_y0, text_x0, text_x1, text in caption_index.below(img_y1):
             # 距离阈值：50 像素
-            if not is_below or vertical_distance > 50:
-                continue
+            if text_y0 - img_y1 > CAPTION_MAX_DISTANCE:
+                break
 
             # 检查水平对齐（至少 50% 重叠）
             horizontal_overlap = min(img_x1, text_x1) - max(img_x0, text_x0)
-            image_width = img_x1 - img_x0
             overlap_ratio = horizontal_overlap / image_width if image_width > 0 else 0
-
-            if overlap_ratio < 0.5:
-                continue
-
-            # 提取文本内容（需要从 lines/spans 结构中提取）
-            text = self._extract_text_from_block(block)
-            if not text.strip():
-                continue
-
-            # 检查是否包含 caption 关键词
-            text_lower = text.lower()
-            caption_keywords = ["figure", "fig.", "图", "table", "表", "图表"]
-
-            has_keyword = any(kw in text_lower for kw in caption_keywords)
-            if not has_keyword:
-                continue
-
-            # 是一个候选 caption
-            caption_candidates.append({
-                "text": text,
-                "distance": vertical_distance,
-                "overlap_ratio": overlap_ratio,
-            })
-
-        # 选择最佳候选（距离最近的）
-        if caption_candidates:
-            best_caption = min(caption_candidates, key=lambda x: x["distance"])
-            return best_caption["text"].strip()
+            if overlap_ratio >= 0.5:
+                return text.strip()
 
         return ""
 
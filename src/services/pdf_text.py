@@ -0,0 +1,324 @@
+"""
+PDF 文本提取模块
+
+功能：
+1. 逐页提取 PDF 文本，返回按页排列的文本列表
+2. 页数较多时按页码区间分片，交给进程池并行提取（每个进程独立打开 fitz 文档）
+3. 按页序合并各分片结果
+4. 页文本 + 元数据的持久化缓存（按 PDF 内容哈希和 PyMuPDF 版本区分，gzip 压缩，容量超限按 LRU 淘汰）
+5. PaperText：单一文本缓冲区 + 页偏移数组，按页区间按需切片
+
+页数低于阈值时保持单进程，避免进程通信开销超过收益。
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import uuid
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+# 低于该页数时不启用多进程
+PARALLEL_MIN_PAGES = 40
+
+# 每个进程至少处理的页数（分片过小时通信开销占主导）
+MIN_PAGES_PER_CHUNK = 8
+
+# 页分隔标记（与 LLM prompt 中的页码标注一致）
+PAGE_MARKER = "\n\n--- Page {} ---\n\n"
+
+# 文本缓存默认容量上限（200 MB，按压缩后大小计）
+TEXT_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# 进程池（惰性创建，进程内复用；文本提取、图片提取、Figures/Tables 提取共用，可能在多个线程中同时获取）
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def _default_workers() -> int:
+    """默认工作进程数：CPU 核数，最多 8 个"""
+    return max(1, min(8, os.cpu_count() or 1))
+
+
+def _get_process_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    获取共享进程池
+
+    进程池只在第一次调用时创建（大小为 max_workers 与默认工作进程数中的较大者），之后不再重建：
+    其他线程可能正在向池中提交任务。max_workers 较小的调用方按自己的分片数提交任务即可。
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=max(max_workers or 0, _default_workers()))
+        return _process_pool
+
+
+def _extract_page_range(task: Tuple[str, int, int]) -> List[str]:
+    """
+    工作进程入口：提取 [start, end) 页的文本
+
+    Args:
+        task: (pdf_path, start, end)
+
+    Returns:
+        每页文本组成的列表
+    """
+    pdf_path, start, end = task
+    doc = fitz.open(pdf_path)
+    try:
+        return [doc[page_num].get_text() for page_num in range(start, end)]
+    finally:
+        doc.close()
+
+
+def _split_page_ranges(total_pages: int, chunks: int) -> List[Tuple[int, int]]:
+    """把 [0, total_pages) 均匀切成 chunks 个连续区间"""
+    chunks = max(1, min(chunks, total_pages))
+    base, extra = divmod(total_pages, chunks)
+    ranges = []
+    start = 0
+    for i in range(chunks):
+        end = start + base + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def extract_page_texts(
+    pdf_path: str,
+    total_pages: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    min_pages: int = PARALLEL_MIN_PAGES,
+) -> List[str]:
+    """
+    提取 PDF 每一页的文本
+
+    Args:
+        pdf_path: PDF 文件路径
+        total_pages: 总页数（已知时传入，避免重复打开文档）
+        max_workers: 最大工作进程数（默认 CPU 核数，最多 8）
+        min_pages: 启用多进程的最小页数
+
+    Returns:
+        按页序排列的文本列表
+    """
+    if total_pages is None:
+        with fitz.open(pdf_path) as doc:
+            total_pages = doc.page_count
+
+    if max_workers is None:
+        max_workers = _default_workers()
+
+    chunks = min(max_workers, total_pages // MIN_PAGES_PER_CHUNK)
+    if total_pages < min_pages or chunks < 2:
+        return _extract_page_range((pdf_path, 0, total_pages))
+
+    ranges = _split_page_ranges(total_pages, chunks)
+    pool = _get_process_pool(max_workers)
+    tasks = [(pdf_path, start, end) for start, end in ranges]
+
+    page_texts: List[str] = []
+    # map 按提交顺序返回结果，保证页序
+    for chunk_texts in pool.map(_extract_page_range, tasks):
+        page_texts.extend(chunk_texts)
+    return page_texts
+
+
+def sha256_file(path: str) -> str:
+    """流式计算本地文件的 SHA-256"""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class PageTextCache:
+    """
+    PDF 页文本缓存
+
+    每个条目保存为 {sha256}-{pymupdf版本}.json.gz，内容为：
+        {"page_texts": [...], "metadata": {...}}
+
+    PyMuPDF 升级后文本提取结果可能变化，版本号作为键的一部分自动失效旧条目。
+    总大小超过 max_bytes 时按最近访问时间淘汰。
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = TEXT_CACHE_MAX_BYTES):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 缓存总大小上限（字节）
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.version = fitz.VersionBind
+
+    def _entry_path(self, sha256: str) -> Path:
+        return self.cache_dir / f"{sha256}-{self.version}.json.gz"
+
+    def get(self, sha256: str) -> Optional[Tuple[List[str], Dict]]:
+        """
+        读取缓存
+
+        Returns:
+            (page_texts, metadata)，未命中返回 None
+        """
+        path = self._entry_path(sha256)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # 损坏的条目直接删除
+            path.unlink(missing_ok=True)
+            return None
+
+        # 更新访问时间（用于 LRU 淘汰）
+        os.utime(path)
+        return entry["page_texts"], entry["metadata"]
+
+    def put(self, sha256: str, page_texts: List[str], metadata: Dict):
+        """写入缓存（原子写入），并在超限时淘汰旧条目"""
+        path = self._entry_path(sha256)
+        tmp_path = self.cache_dir / f".{uuid.uuid4().hex}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+            json.dump({"page_texts": page_texts, "metadata": metadata}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        """总大小超过上限时，从最久未访问的条目开始删除"""
+        entries = []
+        total = 0
+        for path in self.cache_dir.glob("*.json.gz"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+class PaperText:
+    """
+    按页索引的论文全文
+
+    全文只保存为一个字符串缓冲区（包含页分隔标记），另有一个页起始偏移数组：
+        offsets[i]     第 i 页（0-indexed）分隔标记的起始位置
+        offsets[-1]    缓冲区末尾
+
+    页内容在请求时才从缓冲区切出，例如 pages(0, 2) 只产生前两页的一次切片，
+    不再先生成完整字符串再截断。
+    """
+
+    def __init__(self, buffer: str, offsets: array):
+        """
+        Args:
+            buffer: 带页分隔标记的全文
+            offsets: 长度为 页数+1 的页起始偏移数组
+        """
+        self._buffer = buffer
+        self._offsets = offsets
+
+    @classmethod
+    def from_pages(cls, page_texts: List[str], first_page: int = 0) -> "PaperText":
+        """
+        从逐页文本构建（只拼接一次）
+
+        Args:
+            page_texts: 按页序排列的文本
+            first_page: 第一页的页码（0-indexed，用于页分隔标记）
+        """
+        offsets = array('q', [0])
+        parts = []
+        position = 0
+        for i, text in enumerate(page_texts):
+            marker = PAGE_MARKER.format(first_page + i + 1)
+            parts.append(marker)
+            parts.append(text)
+            position += len(marker) + len(text)
+            offsets.append(position)
+        return cls("".join(parts), offsets)
+
+    @classmethod
+    def from_pdf(cls, pdf_path: str, start: int = 0, end: Optional[int] = None) -> "PaperText":
+        """
+        只提取 [start, end) 页构建（例如只需要标题页时）
+
+        Args:
+            pdf_path: PDF 文件路径
+            start: 起始页（0-indexed）
+            end: 结束页（不含），None 表示到最后一页
+        """
+        with fitz.open(pdf_path) as doc:
+            end = doc.page_count if end is None else min(end, doc.page_count)
+            page_texts = [doc[page_num].get_text() for page_num in range(start, end)]
+        return cls.from_pages(page_texts, first_page=start)
+
+    @property
+    def page_count(self) -> int:
+        return len(self._offsets) - 1
+
+    def page(self, index: int) -> str:
+        """第 index 页的正文（不含页分隔标记）"""
+        if index < 0:
+            index += self.page_count
+        start = self._offsets[index]
+        # 跳过页分隔标记
+        start = self._buffer.index("\n\n", start + 2) + 2
+        return self._buffer[start:self._offsets[index + 1]]
+
+    def pages(self, start: int = 0, end: Optional[int] = None, max_chars: Optional[int] = None) -> str:
+        """
+        [start, end) 页的文本（含页分隔标记），一次切片得到
+
+        Args:
+            start: 起始页（0-indexed）
+            end: 结束页（不含），None 表示到最后一页
+            max_chars: 最多返回的字符数
+        """
+        end = self.page_count if end is None else max(start, min(end, self.page_count))
+        begin = self._offsets[start]
+        stop = self._offsets[end]
+        if max_chars is not None:
+            stop = min(stop, begin + max_chars)
+        return self._buffer[begin:stop]
+
+    def page_at(self, char_offset: int) -> int:
+        """字符偏移所在的页（0-indexed）"""
+        return max(0, min(bisect_right(self._offsets, char_offset) - 1, self.page_count - 1))
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def __getitem__(self, key):
+        return self._buffer[key]
+
+    def __str__(self) -> str:
+        return self._buffer
+
+    def __bool__(self) -> bool:
+        return bool(self._buffer)
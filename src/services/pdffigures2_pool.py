@@ -0,0 +1,302 @@
+"""
+PDFFigures2 常驻 JVM 池
+
+功能：
+1. 维护少量常驻的 PDFFigures2 JVM（pdffigures2/PdfFigures2Worker.java），任务通过 stdin 逐行下发，
+   不再为每篇论文启动一次 `java -jar`（省去 JVM 启动和类加载）
+2. 限制同时运行的 JVM 数量（max_workers），每个 JVM 用 -Xmx 限制堆内存
+3. 单个 worker 处理一定数量的任务后自动重启，超时或异常退出的 worker 直接丢弃
+4. asyncio 接口：await pool.extract(pdf_path, output_dir)
+
+asyncio 子进程绑定在创建它的事件循环上，事件循环变化时 get_pdffigures2_pool 会创建新的池。
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import shutil
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 默认同时运行的 JVM 数量
+DEFAULT_MAX_WORKERS = 2
+
+# 每个 JVM 的最大堆内存
+DEFAULT_MAX_HEAP = "1g"
+
+# 单个任务超时（秒），与原来 subprocess.run 的超时一致
+DEFAULT_JOB_TIMEOUT = 120
+
+# JVM 启动超时（秒，包含单文件源码编译）
+STARTUP_TIMEOUT = 60
+
+# 每个 JVM 处理多少个任务后重启（避免长期运行的内存增长）
+MAX_JOBS_PER_WORKER = 50
+
+WORKER_SOURCE = Path(__file__).resolve().parent.parent.parent / "pdffigures2" / "PdfFigures2Worker.java"
+
+
+def build_java_env() -> Dict[str, str]:
+    """Java 运行环境变量（未设置 JAVA_HOME 时尝试使用 Homebrew 安装的 OpenJDK 11）"""
+    env = os.environ.copy()
+    if not os.getenv("JAVA_HOME"):
+        env["PATH"] = "/opt/homebrew/opt/openjdk@11/bin:" + env.get("PATH", "")
+    return env
+
+
+@lru_cache(maxsize=None)
+def pdffigures2_available(jar_path: Path) -> bool:
+    """
+    PDFFigures2 能否实际运行：JAR 存在且 PATH（含 build_java_env 补充的路径）中有 java
+
+    结果按进程缓存；JAR 随仓库提交，只检查文件是否存在不足以判断。
+    """
+    if not Path(jar_path).exists():
+        return False
+    if shutil.which("java", path=build_java_env().get("PATH")) is None:
+        logger.warning("未找到 java，PDFFigures2 不可用，使用 Python 方法")
+        return False
+    return True
+
+
+def pdffigures2_args(pdf_path: str, output_dir: Path, dpi: int = 300, render: bool = True) -> List[str]:
+    """
+    FigureExtractorBatchCli 的命令行参数（输出 JSON 元数据到 output_dir）
+
+    render=True 时同时按 dpi 渲染 PNG 到 output_dir；为 False 时只输出 JSON
+    （由调用方按渲染配置自行从 PDF 渲染，省去 PDFFigures2 的 300 DPI 渲染）
+    """
+    args = [str(pdf_path), "-d", str(output_dir) + "/"]
+    if render:
+        args += ["-m", str(output_dir) + "/", "-i", str(dpi)]
+    args.append("-c")  # 包含 regionless-captions
+    return args
+
+
+def load_pdffigures2_result(pdf_path: str, output_dir: Path) -> Optional[Dict]:
+    """读取 PDFFigures2 为 pdf_path 生成的 JSON 结果"""
+    json_output = Path(output_dir) / f"{Path(pdf_path).stem}.json"
+    if not json_output.exists():
+        logger.warning(f"PDFFigures2 输出文件不存在: {json_output}")
+        return None
+    with open(json_output, 'r') as f:
+        return json.load(f)
+
+
+class _Worker:
+    """单个常驻 JVM"""
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.jobs_done = 0
+        self.broken = False
+        self.stderr_tail = deque(maxlen=20)
+        # 持续读取 stderr，避免管道写满阻塞 JVM
+        self._stderr_task = asyncio.create_task(self._drain_stderr())
+
+    async def _drain_stderr(self):
+        async for line in self.process.stderr:
+            self.stderr_tail.append(line.decode('utf-8', errors='replace').rstrip())
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None and not self.broken
+
+    async def wait_ready(self):
+        line = await asyncio.wait_for(self.process.stdout.readline(), STARTUP_TIMEOUT)
+        if line.strip() != b"READY":
+            raise RuntimeError(f"PDFFigures2 worker 启动失败: {' | '.join(self.stderr_tail)}")
+
+    async def run(self, job_id: str, args: List[str], timeout: float):
+        """
+        执行一个任务
+
+        Raises:
+            RuntimeError: PDFFigures2 报错或 worker 异常退出
+            asyncio.TimeoutError: 任务超时
+        """
+        self.process.stdin.write(("\t".join([job_id] + args) + "\n").encode('utf-8'))
+        await self.process.stdin.drain()
+
+        line = await asyncio.wait_for(self.process.stdout.readline(), timeout)
+        if not line:
+            raise RuntimeError(f"PDFFigures2 worker 已退出: {' | '.join(self.stderr_tail)}")
+
+        status, _, rest = line.decode('utf-8', errors='replace').rstrip("\n").partition("\t")
+        reply_id, _, message = rest.partition("\t")
+        if reply_id != job_id:
+            self.broken = True
+            raise RuntimeError(f"PDFFigures2 worker 响应错乱: {line!r}")
+        self.jobs_done += 1
+        if status != "DONE":
+            raise RuntimeError(message or "PDFFigures2 执行失败")
+
+    async def terminate(self, force: bool = False):
+        """关闭 JVM：正常情况下关闭 stdin 让 worker 自行退出，force 时直接结束进程"""
+        if self.process.returncode is None:
+            if not force:
+                self.process.stdin.close()
+                try:
+                    await asyncio.wait_for(self.process.wait(), 5)
+                except asyncio.TimeoutError:
+                    force = True
+            if force:
+                self.process.kill()
+                await self.process.wait()
+        self._stderr_task.cancel()
+
+
+class PDFFigures2Pool:
+    """常驻 PDFFigures2 JVM 池"""
+
+    def __init__(
+        self,
+        jar_path: Path,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_heap: str = DEFAULT_MAX_HEAP,
+        job_timeout: float = DEFAULT_JOB_TIMEOUT,
+        max_jobs_per_worker: int = MAX_JOBS_PER_WORKER,
+    ):
+        """
+        初始化 JVM 池（JVM 在第一次使用时启动）
+
+        Args:
+            jar_path: pdffigures2.jar 路径
+            max_workers: 同时运行的最大 JVM 数
+            max_heap: 每个 JVM 的 -Xmx
+            job_timeout: 单个任务超时（秒）
+            max_jobs_per_worker: 每个 JVM 处理多少个任务后重启
+        """
+        self.jar_path = Path(jar_path)
+        self.max_workers = max_workers
+        self.max_heap = max_heap
+        self.job_timeout = job_timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self._slots = asyncio.Semaphore(max_workers)
+        self._idle: List[_Worker] = []
+        self._job_ids = itertools.count(1)
+
+    async def _spawn(self) -> _Worker:
+        """启动一个 JVM 并等待 READY"""
+        process = await asyncio.create_subprocess_exec(
+            "java",
+            f"-Xmx{self.max_heap}",
+            "-Djava.awt.headless=true",
+            "-cp", str(self.jar_path),
+            str(WORKER_SOURCE),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=build_java_env(),
+        )
+        worker = _Worker(process)
+        try:
+            await worker.wait_ready()
+        except BaseException:
+            await worker.terminate(force=True)
+            raise
+        logger.info(f"☕ PDFFigures2 JVM 已启动 (pid={process.pid}, -Xmx{self.max_heap})")
+        return worker
+
+    async def _acquire(self) -> _Worker:
+        while self._idle:
+            worker = self._idle.pop()
+            if worker.alive:
+                return worker
+            await worker.terminate()
+        return await self._spawn()
+
+    async def _release(self, worker: _Worker, healthy: bool):
+        if not healthy:
+            # 超时或异常退出：worker 状态未知，直接结束
+            await worker.terminate(force=True)
+        elif worker.jobs_done < self.max_jobs_per_worker:
+            self._idle.append(worker)
+        else:
+            await worker.terminate()
+
+    async def run(self, args: List[str]):
+        """
+        在空闲 JVM 上执行一次 FigureExtractorBatchCli（参数同命令行）
+
+        Raises:
+            RuntimeError / asyncio.TimeoutError / OSError（java 不可用）
+        """
+        async with self._slots:
+            worker = await self._acquire()
+            healthy = False
+            try:
+                await worker.run(str(next(self._job_ids)), args, self.job_timeout)
+                healthy = True
+            except RuntimeError:
+                # PDFFigures2 报错时 JVM 通常仍然可用
+                healthy = worker.alive
+                raise
+            finally:
+                await self._release(worker, healthy)
+
+    async def extract(self, pdf_path: str, output_dir: Path, dpi: int = 300, render: bool = True) -> Optional[Dict]:
+        """
+        提取单篇 PDF 的 Figures/Tables
+
+        Args:
+            pdf_path: PDF 文件路径
+            output_dir: PDFFigures2 输出目录（JSON 和渲染图片）
+            dpi: 渲染 DPI
+            render: 是否由 PDFFigures2 渲染 PNG（见 pdffigures2_args）
+
+        Returns:
+            PDFFigures2 的 JSON 结果，失败返回 None
+        """
+        if not self.jar_path.exists():
+            logger.warning("PDFFigures2 JAR 不存在，跳过")
+            return None
+
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            await self.run(pdffigures2_args(pdf_path, output_dir, dpi, render))
+        except asyncio.TimeoutError:
+            logger.error(f"PDFFigures2 执行超时（{self.job_timeout}s）: {pdf_path}")
+            return None
+        except Exception as e:
+            logger.error(f"PDFFigures2 执行失败: {e}")
+            return None
+        return load_pdffigures2_result(pdf_path, output_dir)
+
+    async def close(self):
+        """关闭所有空闲 JVM"""
+        idle, self._idle = self._idle, []
+        for worker in idle:
+            await worker.terminate()
+
+
+# jar 路径 → (事件循环, 池)
+_pools: Dict[str, Tuple[asyncio.AbstractEventLoop, PDFFigures2Pool]] = {}
+
+
+def get_pdffigures2_pool(jar_path: Path) -> PDFFigures2Pool:
+    """获取当前事件循环上的共享 JVM 池"""
+    loop = asyncio.get_running_loop()
+    key = str(jar_path)
+    cached = _pools.get(key)
+    if cached is not None and cached[0] is loop:
+        return cached[1]
+    pool = PDFFigures2Pool(jar_path)
+    _pools[key] = (loop, pool)
+    return pool
+
+
+async def close_pdffigures2_pools():
+    """关闭当前事件循环上的所有 JVM 池（应用退出时调用）"""
+    loop = asyncio.get_running_loop()
+    for key, (pool_loop, pool) in list(_pools.items()):
+        if pool_loop is loop:
+            await pool.close()
+        del _pools[key]
@@ -0,0 +1,147 @@
+"""
+Prompt token 预算模块
+
+功能：
+1. 本地 tokenizer 计数：安装了 tiktoken 时按模型对应的编码精确计数，
+   否则退回 paper_sections.estimate_tokens 的估算
+2. 按 token 截断文本（tiktoken 可用时一次编码、按 token 边界截断）
+3. 读取 init_model.MODEL_CONFIGS 中按模型配置的 prompt 槽位预算，把各槽位内容填充到预算以内
+4. 记录每次 LLM 调用的实际 prompt token 数
+
+DeepSeek 等非 OpenAI 模型没有公开的 tiktoken 编码，使用 o200k_base 近似，误差远小于按字符估算。
+"""
+
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+
+from ..utils.logger import get_logger
+from .paper_sections import estimate_tokens, truncate_to_tokens
+
+try:
+    import tiktoken
+except ImportError:  # 可选依赖
+    tiktoken = None
+
+logger = get_logger(__name__)
+
+# 模型未被 tiktoken 识别时使用的编码
+FALLBACK_ENCODING = "o200k_base"
+
+# MODEL_CONFIGS 中没有配置 prompt_budgets 时的默认值（token）
+DEFAULT_PROMPT_BUDGETS = {
+    "metadata": {"pdf_excerpt": 1500, "xiaohongshu": 1000},
+    "digest": {"pdf_excerpt": 6000, "xiaohongshu": 2000},
+}
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model_name: str):
+    """模型对应的 tiktoken 编码（tiktoken 未安装或编码文件无法加载时返回 None）"""
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            return tiktoken.get_encoding(FALLBACK_ENCODING)
+    except Exception as e:
+        # 首次使用需要下载编码文件，离线环境下会失败
+        logger.warning(f"⚠️ tiktoken 编码加载失败，改用估算: {e}")
+        return None
+
+
+def get_token_counter(model_name: Optional[str] = None) -> Callable[[str], int]:
+    """
+    获取 token 计数函数
+
+    Args:
+        model_name: 模型名称（例如 gpt-5-mini）；None 表示使用当前 tool 模型
+
+    Returns:
+        text -> token 数
+    """
+    encoding = _get_encoding(model_name or get_model_name())
+    if encoding is None:
+        return estimate_tokens
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_for_model(text: str, max_tokens: int, model_name: Optional[str] = None) -> str:
+    """
+    按 token 预算截断文本
+
+    Args:
+        text: 原文
+        max_tokens: token 上限
+        model_name: 模型名称（None 表示当前 tool 模型）
+    """
+    if max_tokens <= 0 or not text:
+        return ""
+    encoding = _get_encoding(model_name or get_model_name())
+    if encoding is None:
+        return truncate_to_tokens(text, max_tokens, estimate_tokens)
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def get_model_name(model_type: str = "tool") -> str:
+    """当前 provider 下 tool / reason 模型的名称"""
+    from init_model import get_factory
+    return get_factory().config["models"][model_type]
+
+
+def get_prompt_budgets(prompt_name: str) -> Dict[str, int]:
+    """
+    读取某个 prompt 的槽位预算
+
+    Args:
+        prompt_name: "metadata" 或 "digest"
+
+    Returns:
+        {槽位名: token 预算}
+    """
+    from init_model import get_factory
+    budgets = get_factory().config.get("prompt_budgets", DEFAULT_PROMPT_BUDGETS)
+    return dict(budgets.get(prompt_name, DEFAULT_PROMPT_BUDGETS[prompt_name]))
+
+
+def fit_prompt_slots(
+    prompt_name: str,
+    slots: Dict[str, str],
+    model_name: Optional[str] = None
+) -> Dict[str, str]:
+    """
+    把各槽位的内容截断到配置的 token 预算以内
+
+    没有配置预算的槽位原样返回。
+
+    Args:
+        prompt_name: prompt 名称（见 get_prompt_budgets）
+        slots: {槽位名: 内容}
+        model_name: 模型名称（None 表示当前 tool 模型）
+
+    Returns:
+        {槽位名: 截断后的内容}
+    """
+    budgets = get_prompt_budgets(prompt_name)
+    return {
+        name: truncate_for_model(text, budgets[name], model_name) if name in budgets and text else text
+        for name, text in slots.items()
+    }
+
+
+def log_prompt_tokens(prompt_name: str, prompt: str, model_name: Optional[str] = None) -> int:
+    """记录 prompt 的实际 token 数并返回"""
+    model_name = model_name or get_model_name()
+    tokens = get_token_counter(model_name)(prompt)
+    logger.info(
+        "🧮 Prompt token 统计",
+        prompt=prompt_name,
+        model=model_name,
+        prompt_tokens=tokens,
+        prompt_chars=len(prompt),
+        tokenizer="tiktoken" if _get_encoding(model_name) is not None else "estimate"
+    )
+    return tokens
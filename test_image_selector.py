@@ -0,0 +1,65 @@
+"""
+测试 ImageSelector 对 PDFFigureExtractorV2 记录的预筛选
+
+验证：
+1. V2 记录的 width/height（PDF 点）按 300 DPI 换算为像素面积后分档
+2. 一组真实尺寸的 Figures/Tables 中，预筛选（top 8）选中的图片固定
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "src" / "services"))
+
+from image_selector import ImageSelector
+
+
+# 14 页论文的 V2 记录（双栏 A4/Letter，尺寸为 PDF 点）
+V2_RECORDS = [
+    {"fig_type": "Figure", "fig_name": "1", "page": 1, "width": 505, "height": 210,
+     "caption": "Figure 1: Overview of the proposed framework and its training pipeline."},
+    {"fig_type": "Figure", "fig_name": "2", "page": 3, "width": 505, "height": 300,
+     "caption": "Figure 2: Model architecture. The encoder feeds the memory module."},
+    {"fig_type": "Figure", "fig_name": "3", "page": 4, "width": 240, "height": 160,
+     "caption": "Figure 3: Attention maps."},
+    {"fig_type": "Table", "fig_name": "1", "page": 6, "width": 505, "height": 180,
+     "caption": "Table 1: Performance comparison with state-of-the-art methods on three benchmarks."},
+    {"fig_type": "Figure", "fig_name": "4", "page": 6, "width": 240, "height": 150,
+     "caption": "Figure 4: Training curves."},
+    {"fig_type": "Table", "fig_name": "2", "page": 7, "width": 240, "height": 120,
+     "caption": "Table 2: Ablation of each component."},
+    {"fig_type": "Figure", "fig_name": "5", "page": 7, "width": 120, "height": 90,
+     "caption": "Figure 5: Example."},
+    {"fig_type": "Figure", "fig_name": "6", "page": 8, "width": 505, "height": 650,
+     "caption": "Figure 6: Qualitative results on the test set."},
+    {"fig_type": "Table", "fig_name": "3", "page": 9, "width": 240, "height": 100,
+     "caption": "Table 3: Runtime."},
+    {"fig_type": "Figure", "fig_name": "7", "page": 9, "width": 240, "height": 170,
+     "caption": "Figure 7: Evaluation of robustness under noise."},
+    {"fig_type": "Figure", "fig_name": "8", "page": 10, "width": 110, "height": 80,
+     "caption": ""},
+    {"fig_type": "Table", "fig_name": "4", "page": 10, "width": 240, "height": 90,
+     "caption": "Table 4: Hyperparameters."},
+]
+
+
+def test_point_area_is_scaled_to_pixels():
+    """整页宽的图（505x650 点）在像素面积的最高档，双栏半宽的小图不在"""
+    selector = ImageSelector.for_pdf_figures()
+    area = selector.feature_matrix(V2_RECORDS, 14)[:, 0]
+    assert area[7] > ImageSelector.AREA_TIERS[0][0]
+    assert area[6] < ImageSelector.AREA_TIERS[2][0]
+
+
+def test_prefilter_selection_for_v2_records():
+    """预筛选 top 8：保留架构图、主要结果和大图，丢掉无 caption 的小图和次要表格"""
+    selected, _ = ImageSelector.for_pdf_figures(max_images=8).select_images(V2_RECORDS, 14)
+    assert [f"{img['fig_type']} {img['fig_name']}" for img in selected] == [
+        "Figure 1", "Figure 2", "Figure 3", "Table 1", "Figure 4", "Table 2", "Figure 6", "Figure 7",
+    ]
+
+
+if __name__ == "__main__":
+    test_point_area_is_scaled_to_pixels()
+    test_prefilter_selection_for_v2_records()
+    print("✅ 测试通过")
@@ -15,6 +15,8 @@ from pathlib import Path
 
 # 导入现有的 Agent 系统
 from src.services.paper_digest import digest_agent, _init_digest_globals
+from src.services.http_clients import close_http_clients
+from src.services.pdffigures2_pool import close_pdffigures2_pools
 from paper_agents import paper_agent, init_paper_agents
 from agents import Runner
 from init_model import init_models
@@ -917,6 +919,12 @@ async def initialize_notion_database(request: NotionTestRequest):
             "error": str(e)
         }
 
+@app.on_event("shutdown")
+async def shutdown_shared_resources():
+    """关闭共享 HTTP 连接池和常驻 PDFFigures2 JVM"""
+    await close_http_clients()
+    await close_pdffigures2_pools()
+
 @app.get("/health")
 async def health_check():
     """健康检查端点"""